@@ -15,6 +15,7 @@ import timeit
 from jaxl.constants import *
 from jaxl.datasets import get_dataset
 from jaxl.models import load_config, iterate_models
+from jaxl.models.transformers import InputEmbeddingCache
 from jaxl.utils import parse_dict, get_device
 
 from utils import *
@@ -171,6 +172,8 @@ def main(args: SimpleNamespace):
     test_data_seed = args.test_data_seed
     num_workers = args.num_workers
     num_visualize = args.num_visualize
+    checkpoint_batch_size = args.checkpoint_batch_size
+    use_input_embedding_cache = args.input_embedding_cache
 
     ablation_name = os.path.basename(runs_dir)
 
@@ -230,31 +233,162 @@ def main(args: SimpleNamespace):
 
         accuracies = {eval_name: [] for eval_name in datasets}
         auxes = {eval_name: [] for eval_name in datasets}
+        prefix_auxes = {}
         checkpoint_steps = []
+        all_params = []
         for params, model, checkpoint_step in iterate_models(
-            train_dataset.input_dim, train_dataset.output_dim, learner_path
+            train_dataset.input_dim,
+            train_dataset.output_dim,
+            learner_path,
+            keys=[f"{CONST_MODEL_DICT}/{CONST_MODEL}"],
         ):
             checkpoint_steps.append(checkpoint_step)
+            all_params.append(params[CONST_MODEL_DICT][CONST_MODEL])
+
+        if len(all_params):
+            # Datasets sampled by exemplar index share the input embeddings
+            cached_eval_names = []
+            if use_input_embedding_cache:
+                assert hasattr(
+                    train_dataset, "num_exemplars"
+                ), f"{type(train_dataset).__name__} does not provide exemplar indices"
+                assert not getattr(
+                    getattr(
+                        config.learner_config.dataset_config.dataset_kwargs,
+                        "task_config",
+                        None,
+                    ),
+                    "augmentation",
+                    False,
+                ), "input embedding cache does not support augmentation"
+                cached_eval_names = [
+                    eval_name
+                    for eval_name in datasets
+                    if hasattr(datasets[eval_name][0], "num_exemplars")
+                ]
+
+            # The accuracy of every prefix of complete contexts comes from one
+            # incremental pass, when the dataset can sample them directly
+            # NOTE: The prefixes start at the first position, unlike the left-padded
+            #       contexts, hence they are reported separately from auxes
+            prefix_eval_names = []
+            if not fixed_length and hasattr(model, "forward_prefixes"):
+                prefix_eval_names = [
+                    eval_name
+                    for eval_name in datasets
+                    if hasattr(datasets[eval_name][0]._dataset, "sample_batch")
+                ]
+            prefix_data = {
+                eval_name: materialize_prefix_data(
+                    datasets[eval_name][0],
+                    (num_train_tasks if eval_name == "pretraining" else num_test_tasks),
+                    config.learner_config.batch_size,
+                    context_len,
+                    test_data_seed,
+                    use_exemplar_idxes=eval_name in cached_eval_names,
+                )
+                for eval_name in prefix_eval_names
+            }
+            prefix_auxes = {eval_name: [] for eval_name in prefix_data}
+
+            # Evaluate all checkpoints together, each dataset is only loaded once
+            stacked_forward = make_stacked_forward(model)
             for eval_name in datasets:
+                if eval_name in cached_eval_names:
+                    continue
                 tic = timeit.default_timer()
-                print(curr_run_path, checkpoint_step, eval_name)
+                print(curr_run_path, len(checkpoint_steps), eval_name)
                 dataset, data_loader = datasets[eval_name]
-                acc, aux = evaluate(
-                    model=model,
-                    params=params,
-                    dataset=dataset,
-                    data_loader=data_loader,
-                    num_tasks=(
-                        num_train_tasks
-                        if eval_name == "pretraining"
-                        else num_test_tasks
+                data = materialize_data(
+                    data_loader,
+                    (num_train_tasks if eval_name == "pretraining" else num_test_tasks),
+                )
+                max_label = 2 if eval_name.endswith("2_way") else None
+                for params, (acc, aux) in zip(
+                    all_params,
+                    evaluate_checkpoints(
+                        stacked_forward=stacked_forward,
+                        all_params=all_params,
+                        dataset=dataset,
+                        data=data,
+                        max_label=max_label,
+                        context_len=context_len,
+                        fixed_length=fixed_length,
+                        checkpoint_batch_size=checkpoint_batch_size,
                     ),
-                    max_label=2 if eval_name.endswith("2_way") else None,
-                    context_len=context_len,
-                    fixed_length=fixed_length,
+                ):
+                    if eval_name in prefix_data:
+                        prefix_auxes[eval_name].append(
+                            evaluate_context_lengths(
+                                model, params, prefix_data[eval_name], max_label
+                            )
+                        )
+                    accuracies[eval_name].append(acc)
+                    auxes[eval_name].append(aux)
+                toc = timeit.default_timer()
+                print("Takes {}s".format(toc - tic))
+
+            if len(cached_eval_names):
+                tic = timeit.default_timer()
+                print(curr_run_path, len(checkpoint_steps), cached_eval_names)
+                cached_data = {
+                    eval_name: materialize_exemplar_data(
+                        datasets[eval_name][0],
+                        (
+                            num_train_tasks
+                            if eval_name == "pretraining"
+                            else num_test_tasks
+                        ),
+                        config.learner_config.batch_size,
+                        test_data_seed,
+                    )
+                    for eval_name in cached_eval_names
+                }
+                input_embedding_cache = InputEmbeddingCache(
+                    model, train_dataset.get_exemplars, train_dataset.num_exemplars
                 )
-                accuracies[eval_name].append(acc)
-                auxes[eval_name].append(aux)
+                stacked_cached_forward = make_stacked_cached_forward(model)
+                chunk_size = checkpoint_batch_size or len(all_params)
+                for chunk_start in range(0, len(all_params), chunk_size):
+                    # The embeddings are computed once per checkpoint version
+                    chunk_params_and_embeddings = [
+                        (
+                            params,
+                            input_embedding_cache.get_embeddings(
+                                params, version=checkpoint_step
+                            ),
+                        )
+                        for params, checkpoint_step in zip(
+                            all_params[chunk_start : chunk_start + chunk_size],
+                            checkpoint_steps[chunk_start : chunk_start + chunk_size],
+                        )
+                    ]
+                    for eval_name in cached_eval_names:
+                        max_label = 2 if eval_name.endswith("2_way") else None
+                        for (params, input_embeddings), (acc, aux) in zip(
+                            chunk_params_and_embeddings,
+                            evaluate_checkpoints(
+                                stacked_forward=stacked_cached_forward,
+                                all_params=chunk_params_and_embeddings,
+                                dataset=datasets[eval_name][0],
+                                data=cached_data[eval_name],
+                                max_label=max_label,
+                                context_len=context_len,
+                                fixed_length=fixed_length,
+                            ),
+                        ):
+                            if eval_name in prefix_data:
+                                prefix_auxes[eval_name].append(
+                                    evaluate_context_lengths(
+                                        model,
+                                        params,
+                                        prefix_data[eval_name],
+                                        max_label,
+                                        input_embeddings,
+                                    )
+                                )
+                            accuracies[eval_name].append(acc)
+                            auxes[eval_name].append(aux)
                 toc = timeit.default_timer()
                 print("Takes {}s".format(toc - tic))
 
@@ -262,6 +396,7 @@ def main(args: SimpleNamespace):
             "checkpoint_steps": checkpoint_steps,
             "accuracies": accuracies,
             "auxes": auxes,
+            "prefix_auxes": prefix_auxes,
         }
     pickle.dump(
         all_results,
@@ -316,6 +451,17 @@ if __name__ == "__main__":
         default=0,
         help="Visualize the examples per dataset",
     )
+    parser.add_argument(
+        "--checkpoint_batch_size",
+        type=int,
+        default=0,
+        help="The number of checkpoints to evaluate at once, all checkpoints if 0",
+    )
+    parser.add_argument(
+        "--input_embedding_cache",
+        action="store_true",
+        help="Precompute the input embeddings of every exemplar once per checkpoint",
+    )
     args = parser.parse_args()
 
     main(args)
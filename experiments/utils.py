@@ -2,6 +2,7 @@ from jaxl.constants import *
 from jaxl.datasets import get_dataset
 from jaxl.plot_utils import set_size
 
+import jax
 import matplotlib.pyplot as plt
 import numpy as np
 import os
@@ -199,3 +200,244 @@ def evaluate(
         fixed_length,
     )
     return auxes["all"]["accuracy"], auxes
+
+
+# Load the evaluation data once such that it can be reused across checkpoints
+def materialize_data(data_loader, num_tasks):
+    batches = []
+    all_labels = []
+    num_query_class_in_context = []
+
+    for batch_i, data in enumerate(data_loader):
+        if batch_i >= num_tasks:
+            break
+
+        context_inputs = data["context_inputs"]
+        context_outputs = data["context_outputs"]
+        queries = data["queries"]
+        one_hot_labels = data["outputs"]
+
+        if hasattr(context_inputs, "numpy"):
+            context_inputs = context_inputs.numpy()
+            context_outputs = context_outputs.numpy()
+            queries = queries.numpy()
+            one_hot_labels = one_hot_labels.numpy()
+
+        labels = np.argmax(one_hot_labels, axis=-1)
+        all_labels.append(labels)
+        num_query_class_in_context.append(
+            np.max(np.argmax(context_outputs, axis=-1) == labels[:, None], axis=-1)
+        )
+        batches.append(
+            jax.device_put(
+                (
+                    queries,
+                    {
+                        CONST_CONTEXT_INPUT: context_inputs,
+                        CONST_CONTEXT_OUTPUT: context_outputs,
+                    },
+                )
+            )
+        )
+
+    return (
+        batches,
+        np.concatenate(all_labels),
+        np.concatenate(num_query_class_in_context),
+    )
+
+
+# Sample the evaluation data as exemplar indices, for use with an input embedding cache
+def materialize_exemplar_data(dataset, num_tasks, batch_size, seed):
+    sample_rng = np.random.RandomState(seed)
+    num_classes = dataset.output_dim[0]
+    batches = []
+    all_labels = []
+    num_query_class_in_context = []
+
+    for _ in range(num_tasks):
+        data = dataset.sample_batch(
+            sample_rng.randint(len(dataset), size=batch_size), include_inputs=False
+        )
+        labels = data["labels"]
+        all_labels.append(labels)
+        num_query_class_in_context.append(
+            np.max(data["context_labels"] == labels[:, None], axis=-1)
+        )
+        batches.append(
+            jax.device_put(
+                (
+                    data["query_exemplar_idxes"],
+                    {
+                        CONST_CONTEXT_INPUT: data["context_exemplar_idxes"],
+                        CONST_CONTEXT_OUTPUT: jax.nn.one_hot(
+                            data["context_labels"], num_classes
+                        ),
+                    },
+                )
+            )
+        )
+
+    return (
+        batches,
+        np.concatenate(all_labels),
+        np.concatenate(num_query_class_in_context),
+    )
+
+
+# Forward call over parameters stacked along the leading axis
+def make_stacked_forward(model):
+    def forward(params, queries, contexts):
+        outputs, _, _ = model.forward(params, queries, contexts, eval=True)
+        return outputs
+
+    return jax.jit(jax.vmap(forward, in_axes=(0, None, None)))
+
+
+# Forward call over (parameters, input embeddings) pairs stacked along the leading axis,
+# where the queries and the context inputs are exemplar indices
+def make_stacked_cached_forward(model):
+    def forward(params_and_embeddings, queries, contexts):
+        params, input_embeddings = params_and_embeddings
+        outputs, _, _ = model.forward(
+            params,
+            queries,
+            {**contexts, CONST_INPUT_EMBEDDINGS: input_embeddings},
+            eval=True,
+        )
+        return outputs
+
+    return jax.jit(jax.vmap(forward, in_axes=(0, None, None)))
+
+
+# Get model predictions of multiple checkpoints at once
+def get_stacked_preds(stacked_forward, stacked_params, batches, max_label=None):
+    all_preds = []
+    for queries, contexts in batches:
+        outputs = stacked_forward(stacked_params, queries, contexts)
+        if max_label is not None:
+            outputs = outputs[..., :max_label]
+        all_preds.append(np.asarray(jax.numpy.argmax(outputs, axis=-1)))
+    return np.concatenate(all_preds, axis=1)
+
+
+# Complete evaluation of multiple checkpoints, with one pass over the data per chunk
+def evaluate_checkpoints(
+    stacked_forward,
+    all_params,
+    dataset,
+    data,
+    max_label,
+    context_len,
+    fixed_length=True,
+    checkpoint_batch_size=None,
+):
+    assert max_label is None or isinstance(
+        max_label, int
+    ), f"max_label {max_label} needs to be None or an integer"
+    batches, labels, num_query_class_in_context = data
+    if not checkpoint_batch_size:
+        checkpoint_batch_size = len(all_params)
+
+    results = []
+    for chunk_start in range(0, len(all_params), checkpoint_batch_size):
+        stacked_params = jax.tree_util.tree_map(
+            lambda *leaves: np.stack(leaves),
+            *all_params[chunk_start : chunk_start + checkpoint_batch_size],
+        )
+        all_preds = get_stacked_preds(
+            stacked_forward, stacked_params, batches, max_label
+        )
+        for preds in all_preds:
+            auxes, _ = print_performance_with_aux(
+                preds,
+                labels,
+                num_query_class_in_context,
+                dataset.output_dim[0],
+                context_len,
+                fixed_length,
+            )
+            results.append((auxes["all"]["accuracy"], auxes))
+    return results
+
+
+# Sample the evaluation data with complete contexts, such that the prefixes of each
+# context cover every context length, optionally as exemplar indices
+def materialize_prefix_data(
+    dataset, num_tasks, batch_size, context_len, seed, use_exemplar_idxes=False
+):
+    # The last timestep of each sequence is the only one with an unpadded context
+    num_timesteps = dataset.sequence_length - 1
+    assert (
+        num_timesteps >= context_len
+    ), f"{num_timesteps} context pairs cannot fill context length {context_len}"
+    sample_rng = np.random.RandomState(seed)
+    num_classes = dataset.output_dim[0]
+    batches = []
+    all_labels = []
+    query_class_in_prefix = []
+
+    for _ in range(num_tasks):
+        seq_idxes = sample_rng.randint(len(dataset) // num_timesteps, size=batch_size)
+        batch_idxes = (seq_idxes + 1) * num_timesteps - 1
+        if use_exemplar_idxes:
+            data = dataset.sample_batch(batch_idxes, include_inputs=False)
+            queries = data["query_exemplar_idxes"]
+            context_inputs = data["context_exemplar_idxes"]
+        else:
+            data = dataset.sample_batch(batch_idxes)
+            queries = data["queries"]
+            context_inputs = data["context_inputs"]
+
+        labels = data["labels"]
+        all_labels.append(labels)
+        query_class_in_prefix.append(
+            np.logical_or.accumulate(data["context_labels"] == labels[:, None], axis=1)
+        )
+        batches.append(
+            jax.device_put(
+                (
+                    queries,
+                    {
+                        CONST_CONTEXT_INPUT: context_inputs,
+                        CONST_CONTEXT_OUTPUT: jax.nn.one_hot(
+                            data["context_labels"], num_classes
+                        ),
+                    },
+                )
+            )
+        )
+
+    return (
+        batches,
+        np.concatenate(all_labels),
+        np.concatenate(query_class_in_prefix),
+    )
+
+
+# Accuracy for every prefix of the contexts, with one incremental pass over each batch
+# NOTE: Assumes the contexts are not padded (e.g. from materialize_prefix_data).
+#       The prefixes start at the first position, unlike the left-padded contexts
+#       of ContextDataset, hence the accuracies differ from print_performance_with_aux.
+def evaluate_context_lengths(
+    model, params, data, max_label=None, input_embeddings=None
+):
+    batches, labels, query_class_in_prefix = data
+
+    all_preds = []
+    for queries, contexts in batches:
+        if input_embeddings is not None:
+            contexts = {**contexts, CONST_INPUT_EMBEDDINGS: input_embeddings}
+        outputs = model.forward_prefixes(params, queries, contexts, eval=True)
+        if max_label is not None:
+            outputs = outputs[..., :max_label]
+        all_preds.append(np.asarray(jax.numpy.argmax(outputs, axis=-1)))
+    all_preds = np.concatenate(all_preds)
+
+    auxes = {}
+    for len_i in range(all_preds.shape[1]):
+        auxes[len_i + 1] = {
+            "accuracy": np.mean(all_preds[:, len_i] == labels) * 100,
+            "query_class_in_context_ratio": np.mean(query_class_in_prefix[:, len_i]),
+        }
+    return auxes
@@ -7,19 +7,22 @@ from absl import app, flags
 from absl.flags import FlagValues
 from gymnasium import Env
 from gymnasium.experimental.wrappers import RecordVideoV0
-from typing import Any, Dict, Tuple, Union
+from typing import Any, Dict, List, Sequence, Tuple, Union
 
 import _pickle as pickle
-import dill
 import jax
 import json
 import logging
+import math
+import multiprocessing
 import numpy as np
 import os
+import tempfile
 import timeit
 
+from jaxl.checkpoint_utils import list_checkpoints, load_checkpoint
 from jaxl.constants import *
-from jaxl.buffers import get_buffer, ReplayBuffer
+from jaxl.buffers import get_buffer, NextStateNumPyBuffer, ReplayBuffer
 from jaxl.envs import get_environment
 from jaxl.envs.rollouts import EvaluationRollout
 from jaxl.models import get_model, get_policy, policy_output_dim, Policy
@@ -68,6 +71,12 @@ flags.DEFINE_integer(
     help="Maximum episode length",
     required=False,
 )
+flags.DEFINE_integer(
+    "num_workers",
+    default=1,
+    help="Number of worker processes that gather the samples in parallel",
+    required=False,
+)
 flags.DEFINE_string(
     "device",
     default=CONST_CPU,
@@ -137,12 +146,11 @@ def load_evaluation_components(
     )
     policy = get_policy(model, agent_config.learner_config)
 
-    all_steps = sorted(os.listdir(os.path.join(run_path, "models")))
-    params = dill.load(
-        open(
-            os.path.join(run_path, "models", all_steps[-1]),
-            "rb",
-        )
+    all_steps = list_checkpoints(os.path.join(run_path, "models"))
+    params = load_checkpoint(
+        os.path.join(run_path, "models", all_steps[-1]),
+        [f"{CONST_MODEL_DICT}/{CONST_MODEL}/{CONST_POLICY}", CONST_OBS_RMS],
+        mmap_mode="r",
     )
     model_dict = params[CONST_MODEL_DICT]
     policy_params = model_dict[CONST_MODEL][CONST_POLICY]
@@ -153,6 +161,163 @@ def load_evaluation_components(
     return policy, policy_params, obs_rms, buffer, env, env_seed
 
 
+def gather_shard(
+    run_path: str,
+    device: str,
+    run_seed: int,
+    env_seed: int,
+    num_samples: int,
+    subsampling_length: int,
+    max_episode_length: int,
+    save_path: str,
+) -> Tuple[List[float], List[int]]:
+    """
+    Gathers a shard of the samples in a worker process and saves it into its own buffer file.
+
+    :param run_path: the saved run
+    :param device: the JAX device to use
+    :param run_seed: the seed for the run
+    :param env_seed: the environment seed for resetting episodes
+    :param num_samples: the number of samples in the shard
+    :param subsampling_length: the length of subtrajectories to gather per episode
+    :param max_episode_length: the maximum episode length
+    :param save_path: the file name to save the shard into
+    :type run_path: str
+    :type device: str
+    :type run_seed: int
+    :type env_seed: int
+    :type num_samples: int
+    :type subsampling_length: int
+    :type max_episode_length: int
+    :type save_path: str
+    :return: the episodic returns and the episode lengths
+    :rtype: Tuple[List[float], List[int]]
+
+    """
+    get_device(device)
+    set_seed(run_seed)
+    policy, policy_params, obs_rms, buffer, env, _ = load_evaluation_components(
+        run_path, num_samples
+    )
+    rollout = EvaluationRollout(env, seed=env_seed)
+    rollout.rollout_with_subsampling(
+        policy_params,
+        policy,
+        obs_rms,
+        buffer,
+        num_samples,
+        subsampling_length,
+        max_episode_length,
+        use_tqdm=False,
+    )
+    buffer.save(save_path, end_with_done=False)
+    return rollout.episodic_returns, rollout.episode_lengths
+
+
+def merge_shards(buffer: ReplayBuffer, shard_paths: Sequence[str]):
+    """
+    Pushes the samples of the shards into the buffer, in order.
+
+    :param buffer: the buffer to push the samples into
+    :param shard_paths: the file names of the shards
+    :type buffer: ReplayBuffer
+    :type shard_paths: Sequence[str]
+
+    """
+    for shard_path in shard_paths:
+        shard = NextStateNumPyBuffer(
+            **DEFAULT_LOAD_BUFFER_KWARGS, load_buffer=shard_path
+        )
+
+        # Each shard is filled from the start and never wraps around.
+        num_transitions = len(shard)
+        buffer.push_batch(
+            shard.observations[:num_transitions],
+            shard.hidden_states[:num_transitions],
+            shard.actions[:num_transitions],
+            shard.rewards[:num_transitions],
+            shard.terminateds[:num_transitions],
+            shard.truncateds[:num_transitions],
+            {
+                info_name: info_value[:num_transitions]
+                for info_name, info_value in shard.infos.items()
+            },
+            next_obs=shard.next_observations[:num_transitions],
+            next_h_state=shard.next_hidden_states[:num_transitions],
+        )
+
+
+def gather_in_parallel(
+    config: FlagValues, buffer: ReplayBuffer, env_seed: int
+) -> Tuple[List[float], List[int]]:
+    """
+    Shards the samples across worker processes by episodes.
+    Each worker has its own environment seed stream and saves its shard into
+    its own buffer file, and the shards are merged into the buffer in order.
+
+    :param config: the configuration
+    :param buffer: the buffer to merge the shards into
+    :param env_seed: the environment seed to derive the workers' seeds from
+    :type config: FlagValues
+    :type buffer: ReplayBuffer
+    :type env_seed: int
+    :return: the episodic returns and the episode lengths
+    :rtype: Tuple[List[float], List[int]]
+
+    """
+    num_episodes = math.ceil(config.num_samples / config.subsampling_length)
+    num_workers = min(config.num_workers, num_episodes)
+    shard_num_samples = [
+        len(episodes) * config.subsampling_length
+        for episodes in np.array_split(np.arange(num_episodes), num_workers)
+    ]
+    shard_num_samples[-1] = config.num_samples - sum(shard_num_samples[:-1])
+    worker_env_seeds = [
+        int(seed_seq.generate_state(1)[0] % 2**31)
+        for seed_seq in np.random.SeedSequence(env_seed).spawn(num_workers)
+    ]
+
+    with tempfile.TemporaryDirectory() as shard_dir:
+        shard_paths = [
+            os.path.join(shard_dir, f"shard_{worker_i}.gzip")
+            for worker_i in range(num_workers)
+        ]
+
+        # JAX is not fork-safe, hence the workers are spawned
+        with multiprocessing.get_context("spawn").Pool(num_workers) as pool:
+            shard_stats = pool.starmap(
+                gather_shard,
+                [
+                    (
+                        config.run_path,
+                        config.device,
+                        config.run_seed,
+                        worker_env_seed,
+                        num_samples,
+                        config.subsampling_length,
+                        config.max_episode_length,
+                        shard_path,
+                    )
+                    for worker_env_seed, num_samples, shard_path in zip(
+                        worker_env_seeds, shard_num_samples, shard_paths
+                    )
+                ],
+            )
+        merge_shards(buffer, shard_paths)
+
+    episodic_returns = [
+        episodic_return
+        for shard_episodic_returns, _ in shard_stats
+        for episodic_return in shard_episodic_returns
+    ]
+    episode_lengths = [
+        episode_length
+        for _, shard_episode_lengths in shard_stats
+        for episode_length in shard_episode_lengths
+    ]
+    return episodic_returns, episode_lengths
+
+
 """
 This function constructs the model and executes evaluation.
 """
@@ -175,6 +340,12 @@ def main(
     assert (
         config.max_episode_length is None or config.max_episode_length > 0
     ), f"max_episode_length should be at least 1, got {config.max_episode_length}"
+    assert (
+        config.num_workers > 0
+    ), f"num_workers should be at least 1, got {config.num_workers}"
+    assert not (
+        config.record_video and config.num_workers > 1
+    ), "record_video is only supported with a single worker"
 
     policy, policy_params, obs_rms, buffer, env, env_seed = load_evaluation_components(
         config.run_path, config.num_samples
@@ -188,16 +359,21 @@ def main(
             env, f"{os.path.dirname(config.save_stats)}/videos", disable_logger=True
         )
 
-    rollout = EvaluationRollout(env, seed=env_seed)
-    rollout.rollout_with_subsampling(
-        policy_params,
-        policy,
-        obs_rms,
-        buffer,
-        config.num_samples,
-        config.subsampling_length,
-        config.max_episode_length,
-    )
+    if config.num_workers > 1:
+        episodic_returns, episode_lengths = gather_in_parallel(config, buffer, env_seed)
+    else:
+        rollout = EvaluationRollout(env, seed=env_seed)
+        rollout.rollout_with_subsampling(
+            policy_params,
+            policy,
+            obs_rms,
+            buffer,
+            config.num_samples,
+            config.subsampling_length,
+            config.max_episode_length,
+        )
+        episodic_returns = rollout.episodic_returns
+        episode_lengths = rollout.episode_lengths
     if config.save_buffer:
         print("Saving buffer with {} transitions".format(len(buffer)))
         buffer.save(config.save_buffer, end_with_done=False)
@@ -207,8 +383,8 @@ def main(
         with open(config.save_stats, "wb") as f:
             pickle.dump(
                 {
-                    CONST_EPISODIC_RETURNS: rollout.episodic_returns,
-                    CONST_EPISODE_LENGTHS: rollout.episode_lengths,
+                    CONST_EPISODIC_RETURNS: episodic_returns,
+                    CONST_EPISODE_LENGTHS: episode_lengths,
                     CONST_RUN_PATH: config.run_path,
                     CONST_BUFFER_PATH: config.save_buffer,
                 },
@@ -218,7 +394,7 @@ def main(
     toc = timeit.default_timer()
     print(
         "Expected return: {} -- Expected episode length: {}".format(
-            np.mean(rollout.episodic_returns), np.mean(rollout.episode_lengths)
+            np.mean(episodic_returns), np.mean(episode_lengths)
         )
     )
     print(f"Evaluation Time: {toc - tic}s")
@@ -1,10 +1,15 @@
 import chex
+import jax.numpy as jnp
 import numpy as np
 
 from copy import deepcopy
 from types import SimpleNamespace
 
 from jaxl.buffers.buffers import ReplayBuffer
+from jaxl.buffers.disk_buffers import MemoryMappedNumPyBuffer
+from jaxl.buffers.jax_buffers import NextStateJAXBuffer
+from jaxl.buffers.multitask_buffers import MultitaskNumPyBuffer
+from jaxl.buffers.prioritized_buffers import PrioritizedReplayBuffer
 from jaxl.buffers.ram_buffers import (
     MemoryEfficientNumPyBuffer,
     NextStateNumPyBuffer,
@@ -51,12 +56,29 @@ def get_buffer(
         buffer_kwargs["h_state_dim"] = h_state_dim
         buffer_kwargs["rng"] = np.random.RandomState(buffer_seed)
 
+        # Observations and hidden states can be stored in reduced precision
+        dtype = getattr(buffer_config, "dtype", CONST_FLOAT32)
+        assert (
+            dtype in VALID_STORAGE_DTYPE
+        ), f"{dtype} is not supported (one of {VALID_STORAGE_DTYPE})"
+        assert not (
+            buffer_config.buffer_type == CONST_MEMORY_MAPPED and dtype == CONST_BFLOAT16
+        ), f"{CONST_MEMORY_MAPPED} buffer cannot store {CONST_BFLOAT16} in .npy files"
+        buffer_kwargs["dtype"] = jnp.dtype(dtype)
+
     if buffer_config.buffer_type == CONST_DEFAULT:
         buffer_constructor = NextStateNumPyBuffer
     elif buffer_config.buffer_type == CONST_MEMORY_EFFICIENT:
         buffer_constructor = MemoryEfficientNumPyBuffer
     elif buffer_config.buffer_type == CONST_TRAJECTORY:
         buffer_constructor = TrajectoryNumPyBuffer
+    elif buffer_config.buffer_type == CONST_JAX:
+        buffer_constructor = NextStateJAXBuffer
+    elif buffer_config.buffer_type == CONST_MEMORY_MAPPED:
+        buffer_constructor = MemoryMappedNumPyBuffer
+        buffer_kwargs["mmap_mode"] = getattr(buffer_config, "mmap_mode", "r")
+        if not hasattr(buffer_config, "load_buffer"):
+            buffer_kwargs["buffer_dir"] = getattr(buffer_config, "buffer_dir", None)
     else:
         raise NotImplementedError
 
@@ -66,4 +88,15 @@ def get_buffer(
     if buffer_size:
         buffer.set_size(buffer_size)
 
+    prioritized_config = getattr(buffer_config, CONST_PRIORITIZED, None)
+    if prioritized_config:
+        buffer = PrioritizedReplayBuffer(
+            buffer,
+            alpha=getattr(prioritized_config, "alpha", 0.6),
+            beta=getattr(prioritized_config, "beta", 0.4),
+            beta_final=getattr(prioritized_config, "beta_final", 1.0),
+            beta_annealing_steps=getattr(prioritized_config, "beta_annealing_steps", 0),
+            epsilon=getattr(prioritized_config, "epsilon", 1e-6),
+        )
+
     return buffer
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod, abstractproperty
-from typing import Optional, Any
+from typing import Any, Dict, Optional
 
 import chex
 
@@ -75,6 +75,55 @@ class ReplayBuffer(ABC):
         """
         raise NotImplementedError
 
+    def push_batch(
+        self,
+        obss: chex.Array,
+        h_states: chex.Array,
+        acts: chex.Array,
+        rews: chex.Array,
+        terminateds: chex.Array,
+        truncateds: chex.Array,
+        infos: Dict[str, chex.Array],
+        **kwargs
+    ) -> bool:
+        """
+        Push a batch of data into buffer.
+        By default, this pushes the samples one at a time.
+        Every array, including the ones in ``infos`` and ``kwargs``,
+        has the batch dimension as its leading axis.
+
+        :param obss: the observations
+        :param h_states: the hidden states
+        :param acts: the actions taken
+        :param rews: the rewards
+        :param terminateds: end of the episodes
+        :param truncateds: early truncations due to time limit
+        :param infos: environment information
+        :param **kwargs:
+        :type obss: chex.Array
+        :type h_states: chex.Array
+        :type acts: chex.Array
+        :type rews: chex.Array
+        :type terminateds: chex.Array
+        :type truncateds: chex.Array
+        :type infos: Dict[str, chex.Array]
+        :return: whether the samples are pushed successfully
+        :rtype: bool
+
+        """
+        for sample_i in range(len(obss)):
+            self.push(
+                obss[sample_i],
+                h_states[sample_i],
+                acts[sample_i],
+                rews[sample_i],
+                terminateds[sample_i],
+                truncateds[sample_i],
+                {info_name: info[sample_i] for info_name, info in infos.items()},
+                **{kwarg_name: kwarg[sample_i] for kwarg_name, kwarg in kwargs.items()}
+            )
+        return True
+
     @abstractmethod
     def clear(self, **kwargs):
         """
@@ -0,0 +1,313 @@
+from typing import Any, Dict, Sequence, Optional
+
+import _pickle as pickle
+import gzip
+import numpy as np
+import os
+import tempfile
+
+from jaxl.buffers.ram_buffers import NextStateNumPyBuffer
+import jaxl.constants.buffers as c
+
+
+"""
+On-disk replay buffers.
+- MemoryMappedNumPyBuffer stores every field as an uncompressed ``.npy`` file
+  that is opened with ``np.memmap``. Loading only reads the metadata and
+  the samples are paged in lazily, such that datasets larger than the RAM
+  can be used and the page cache is shared across processes.
+"""
+
+METADATA_FILE = "metadata.pkl"
+ARRAY_FIELDS = [
+    c.OBSERVATIONS,
+    c.HIDDEN_STATES,
+    c.ACTIONS,
+    c.REWARDS,
+    c.DONES,
+    c.TERMINATEDS,
+    c.TRUNCATEDS,
+    c.NEXT_OBSERVATIONS,
+    c.NEXT_HIDDEN_STATES,
+]
+
+
+def _get_array_path(buffer_dir: str, field: str) -> str:
+    return os.path.join(buffer_dir, f"{field}.npy")
+
+
+def _get_info_path(buffer_dir: str, info_name: str) -> str:
+    return os.path.join(buffer_dir, c.INFOS, f"{info_name}.npy")
+
+
+def _save_metadata(buffer_dir: str, buffer_dict: Dict[str, Any]):
+    with open(os.path.join(buffer_dir, METADATA_FILE), "wb") as f:
+        pickle.dump(
+            {
+                c.BUFFER_SIZE: buffer_dict[c.BUFFER_SIZE],
+                c.DTYPE: buffer_dict[c.DTYPE],
+                c.RNG: buffer_dict[c.RNG],
+                c.ACT_DIM: buffer_dict[c.ACT_DIM],
+                c.POINTER: buffer_dict[c.POINTER],
+                c.COUNT: buffer_dict[c.COUNT],
+                c.INFOS: list(buffer_dict[c.INFOS].keys()),
+            },
+            f,
+        )
+
+
+def save_buffer_dict(buffer_dict: Dict[str, Any], save_dir: str):
+    """
+    Saves a buffer dictionary with next observations in the memory-mapped format.
+
+    :param buffer_dict: buffer dictionary
+    :param save_dir: the directory to save the buffer into
+    :type buffer_dict: Dict[str, Any]
+    :type save_dir: str
+
+    """
+    assert (
+        c.NEXT_OBSERVATIONS in buffer_dict
+    ), "only buffers that keep track of next observations are supported"
+    os.makedirs(os.path.join(save_dir, c.INFOS), exist_ok=True)
+    for field in ARRAY_FIELDS:
+        np.save(_get_array_path(save_dir, field), buffer_dict[field])
+    for info_name, info_value in buffer_dict[c.INFOS].items():
+        np.save(_get_info_path(save_dir, info_name), info_value)
+    _save_metadata(save_dir, buffer_dict)
+
+
+def convert_to_memory_mapped(load_path: str, save_dir: str):
+    """
+    Converts a gzipped ``NextStateNumPyBuffer`` into the memory-mapped format.
+
+    :param load_path: the file name of the gzipped replay buffer
+    :param save_dir: the directory to save the buffer into
+    :type load_path: str
+    :type save_dir: str
+
+    """
+    with gzip.open(load_path, "rb") as f:
+        buffer_dict = pickle.load(f)
+    save_buffer_dict(buffer_dict, save_dir)
+
+
+class MemoryMappedNumPyBuffer(NextStateNumPyBuffer):
+    """
+    A version of a ``NextStateNumPyBuffer`` that keeps its storage in
+    memory-mapped ``.npy`` files within a directory.
+    When no directory is provided, the files are kept in a temporary directory
+    that is removed once the buffer is closed.
+    """
+
+    #: The temporary directory holding the files, if no directory is provided.
+    _tmp_dir: Optional[tempfile.TemporaryDirectory] = None
+
+    def __init__(
+        self,
+        buffer_size: int,
+        obs_dim: Sequence[int],
+        h_state_dim: Sequence[int],
+        act_dim: Sequence[int],
+        rew_dim: Sequence[int],
+        infos: dict = dict(),
+        buffer_dir: Optional[str] = None,
+        mmap_mode: str = "r",
+        rng: np.random.RandomState = np.random.RandomState(),
+        dtype: np.dtype = np.float32,
+        load_buffer: str = None,
+    ):
+        self._mmap_mode = mmap_mode
+        if load_buffer is None:
+            if buffer_dir is None:
+                self._tmp_dir = tempfile.TemporaryDirectory()
+                buffer_dir = self._tmp_dir.name
+            self._create_files(
+                buffer_dir,
+                buffer_size,
+                obs_dim,
+                h_state_dim,
+                act_dim,
+                rew_dim,
+                infos,
+                rng,
+                dtype,
+            )
+            load_buffer = buffer_dir
+            self._mmap_mode = "r+"
+
+        super().__init__(
+            **c.DEFAULT_LOAD_BUFFER_KWARGS,
+            load_buffer=load_buffer,
+        )
+
+    @staticmethod
+    def _create_files(
+        buffer_dir: str,
+        buffer_size: int,
+        obs_dim: Sequence[int],
+        h_state_dim: Sequence[int],
+        act_dim: Sequence[int],
+        rew_dim: Sequence[int],
+        infos: dict,
+        rng: np.random.RandomState,
+        dtype: np.dtype,
+    ):
+        """
+        Creates the empty files of the buffer.
+
+        :param buffer_dir: the directory to store the buffer
+        :param buffer_size: the buffer size
+        :param obs_dim: the observation dimension
+        :param h_state_dim: the hidden state dimension
+        :param act_dim: the action dimension
+        :param rew_dim: the reward dimension
+        :param infos: the environment information to keep track of
+        :param rng: the random number generator for sampling
+        :param dtype: the observation and hidden state data type
+        :type buffer_dir: str
+        :type buffer_size: int
+        :type obs_dim: Sequence[int]
+        :type h_state_dim: Sequence[int]
+        :type act_dim: Sequence[int]
+        :type rew_dim: Sequence[int]
+        :type infos: dict
+        :type rng: np.random.RandomState
+        :type dtype: np.dtype
+
+        """
+        os.makedirs(os.path.join(buffer_dir, c.INFOS), exist_ok=True)
+        specs = {
+            c.OBSERVATIONS: ((buffer_size, *obs_dim), dtype),
+            c.HIDDEN_STATES: ((buffer_size, *h_state_dim), dtype),
+            c.ACTIONS: ((buffer_size, *act_dim[:-1]), np.float32),
+            c.REWARDS: ((buffer_size, *rew_dim), np.float32),
+            c.DONES: ((buffer_size, 1), np.float32),
+            c.TERMINATEDS: ((buffer_size, 1), np.float32),
+            c.TRUNCATEDS: ((buffer_size, 1), np.float32),
+            c.NEXT_OBSERVATIONS: ((buffer_size, *obs_dim), dtype),
+            c.NEXT_HIDDEN_STATES: ((buffer_size, *h_state_dim), dtype),
+        }
+
+        # The files are sparse until they are written to.
+        for field, (shape, field_dtype) in specs.items():
+            np.lib.format.open_memmap(
+                _get_array_path(buffer_dir, field),
+                mode="w+",
+                dtype=field_dtype,
+                shape=shape,
+            ).flush()
+        for info_name, (info_shape, info_dtype) in infos.items():
+            np.lib.format.open_memmap(
+                _get_info_path(buffer_dir, info_name),
+                mode="w+",
+                dtype=info_dtype,
+                shape=(buffer_size, *info_shape),
+            ).flush()
+
+        _save_metadata(
+            buffer_dir,
+            {
+                c.BUFFER_SIZE: buffer_size,
+                c.DTYPE: dtype,
+                c.RNG: rng,
+                c.ACT_DIM: act_dim,
+                c.POINTER: 0,
+                c.COUNT: 0,
+                c.INFOS: infos,
+            },
+        )
+
+    @property
+    def buffer_dir(self) -> str:
+        """The directory of the buffer."""
+        return self._buffer_dir
+
+    def set_size(self, size: int):
+        """
+        Change the buffer size without moving data.
+        The buffer size cannot exceed the size of the files.
+
+        :param size: new buffer size
+        :type size: int
+
+        """
+        assert size <= len(
+            self.observations
+        ), f"cannot grow the buffer from {len(self.observations)} to {size}"
+        super().set_size(size)
+
+    def flush(self):
+        """Writes the pending changes to the files."""
+        for field in ARRAY_FIELDS:
+            buffer = getattr(self, field)
+            if isinstance(buffer, np.memmap):
+                buffer.flush()
+        for info_value in self.infos.values():
+            if isinstance(info_value, np.memmap):
+                info_value.flush()
+
+    def close(self):
+        """Removes the temporary directory of the buffer, if any."""
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+            self._tmp_dir = None
+
+    def __del__(self):
+        self.close()
+
+    def save(self, save_path: str, end_with_done: bool = True, **kwargs):
+        """
+        Saves the replay buffer.
+        If the buffer is saved into its own directory, only the metadata is written.
+
+        :param save_path: the directory to save the replay buffer into
+        :param end_with_done: whether or not to keep unfinished episodes
+        :param **kwargs:
+        :type save_path: str
+        :type end_with_done: bool:  (Default value = True)
+
+        """
+        pointer_and_count = self._get_save_pointer_and_count(end_with_done)
+        if pointer_and_count is None:
+            return
+        pointer, count = pointer_and_count
+
+        buffer_dict = self.get_buffer_dict()
+        buffer_dict[c.POINTER] = pointer
+        buffer_dict[c.COUNT] = count
+
+        if os.path.abspath(save_path) == os.path.abspath(self._buffer_dir):
+            self.flush()
+            _save_metadata(save_path, buffer_dict)
+        else:
+            save_buffer_dict(buffer_dict, save_path)
+
+    def load(self, load_path: str, **kwargs):
+        """
+        Loads a replay buffer.
+        Only the metadata is read, the samples are paged in when accessed.
+
+        :param load_path: the directory of the replay buffer
+        :param **kwargs:
+        :type load_path: str
+
+        """
+        with open(os.path.join(load_path, METADATA_FILE), "rb") as f:
+            buffer_dict = pickle.load(f)
+
+        for field in ARRAY_FIELDS:
+            buffer_dict[field] = np.load(
+                _get_array_path(load_path, field), mmap_mode=self._mmap_mode
+            )
+        buffer_dict[c.INFOS] = {
+            info_name: np.load(
+                _get_info_path(load_path, info_name), mmap_mode=self._mmap_mode
+            )
+            for info_name in buffer_dict[c.INFOS]
+        }
+        buffer_dict[c.BURN_IN_WINDOW] = {
+            c.BURN_IN_WINDOW: 0,
+        }
+        self._buffer_dir = load_path
+        self.load_from_buffer_dict(buffer_dict)
@@ -0,0 +1,680 @@
+from typing import Any, Dict, Sequence, Optional, Tuple
+
+import _pickle as pickle
+import chex
+import gzip
+import jax
+import jax.numpy as jnp
+import jax.random as jrandom
+import numpy as np
+
+from jaxl.buffers.buffers import (
+    ReplayBuffer,
+    NoSampleError,
+)
+import jaxl.constants.buffers as c
+
+
+"""
+On-device replay buffers.
+The storage is a PyTree of ``jnp`` arrays and the buffer operations are
+pure functions of the storage, such that they can be composed inside jitted
+update steps without moving the data to the host.
+"""
+
+
+def init_buffer_state(
+    buffer_size: int,
+    obs_dim: Sequence[int],
+    h_state_dim: Sequence[int],
+    act_dim: Sequence[int],
+    rew_dim: Sequence[int],
+    infos: dict = dict(),
+    dtype: np.dtype = np.float32,
+) -> Dict[str, Any]:
+    """
+    Initializes an empty buffer state.
+
+    :param buffer_size: the buffer size
+    :param obs_dim: the observation dimension
+    :param h_state_dim: the hidden state dimension
+    :param act_dim: the action dimension
+    :param rew_dim: the reward dimension
+    :param infos: the environment information to keep track of
+    :param dtype: the observation data type
+    :type buffer_size: int
+    :type obs_dim: Sequence[int]
+    :type h_state_dim: Sequence[int]
+    :type act_dim: Sequence[int]
+    :type rew_dim: Sequence[int]
+    :type infos: dict:  (Default value = dict())
+    :type dtype: np.dtype:  (Default value = np.float32)
+    :return: the buffer state
+    :rtype: Dict[str, Any]
+
+    """
+    return {
+        c.OBSERVATIONS: jnp.zeros((buffer_size, *obs_dim), dtype=dtype),
+        c.HIDDEN_STATES: jnp.zeros((buffer_size, *h_state_dim), dtype=dtype),
+        c.ACTIONS: jnp.zeros((buffer_size, *act_dim[:-1]), dtype=jnp.float32),
+        c.REWARDS: jnp.zeros((buffer_size, *rew_dim), dtype=jnp.float32),
+        c.DONES: jnp.zeros((buffer_size, 1), dtype=jnp.float32),
+        c.TERMINATEDS: jnp.zeros((buffer_size, 1), dtype=jnp.float32),
+        c.TRUNCATEDS: jnp.zeros((buffer_size, 1), dtype=jnp.float32),
+        c.NEXT_OBSERVATIONS: jnp.zeros((buffer_size, *obs_dim), dtype=dtype),
+        c.NEXT_HIDDEN_STATES: jnp.zeros((buffer_size, *h_state_dim), dtype=dtype),
+        c.INFOS: {
+            info_name: jnp.zeros((buffer_size, *info_shape), dtype=info_dtype)
+            for info_name, (info_shape, info_dtype) in infos.items()
+        },
+        c.POINTER: jnp.zeros((), dtype=jnp.int32),
+        c.COUNT: jnp.zeros((), dtype=jnp.int32),
+    }
+
+
+def push_batch(
+    buffer_state: Dict[str, Any],
+    obss: chex.Array,
+    h_states: chex.Array,
+    acts: chex.Array,
+    rews: chex.Array,
+    terminateds: chex.Array,
+    truncateds: chex.Array,
+    infos: Dict[str, chex.Array],
+    next_obss: chex.Array,
+    next_h_states: chex.Array,
+) -> Dict[str, Any]:
+    """
+    Pushes a batch of transitions into the buffer state.
+    The batch must not be larger than the buffer.
+
+    :param buffer_state: the buffer state
+    :param obss: the observations
+    :param h_states: the hidden states
+    :param acts: the actions taken
+    :param rews: the rewards
+    :param terminateds: end of the episodes
+    :param truncateds: early truncations due to time limit
+    :param infos: environment information
+    :param next_obss: the next observations
+    :param next_h_states: the next hidden states
+    :type buffer_state: Dict[str, Any]
+    :type obss: chex.Array
+    :type h_states: chex.Array
+    :type acts: chex.Array
+    :type rews: chex.Array
+    :type terminateds: chex.Array
+    :type truncateds: chex.Array
+    :type infos: Dict[str, chex.Array]
+    :type next_obss: chex.Array
+    :type next_h_states: chex.Array
+    :return: the updated buffer state
+    :rtype: Dict[str, Any]
+
+    """
+    buffer_size = buffer_state[c.OBSERVATIONS].shape[0]
+    num_samples = len(obss)
+    idxes = (buffer_state[c.POINTER] + jnp.arange(num_samples)) % buffer_size
+
+    def set_rows(buffer: chex.Array, values: chex.Array) -> chex.Array:
+        values = jnp.reshape(values, (num_samples, *buffer.shape[1:]))
+        return buffer.at[idxes].set(values.astype(buffer.dtype))
+
+    terminateds = jnp.reshape(terminateds, (num_samples, 1))
+    truncateds = jnp.reshape(truncateds, (num_samples, 1))
+    return {
+        c.OBSERVATIONS: set_rows(buffer_state[c.OBSERVATIONS], obss),
+        c.HIDDEN_STATES: set_rows(buffer_state[c.HIDDEN_STATES], h_states),
+        c.ACTIONS: set_rows(buffer_state[c.ACTIONS], acts),
+        c.REWARDS: set_rows(buffer_state[c.REWARDS], rews),
+        c.DONES: set_rows(
+            buffer_state[c.DONES], jnp.logical_or(terminateds, truncateds)
+        ),
+        c.TERMINATEDS: set_rows(buffer_state[c.TERMINATEDS], terminateds),
+        c.TRUNCATEDS: set_rows(buffer_state[c.TRUNCATEDS], truncateds),
+        c.NEXT_OBSERVATIONS: set_rows(buffer_state[c.NEXT_OBSERVATIONS], next_obss),
+        c.NEXT_HIDDEN_STATES: set_rows(
+            buffer_state[c.NEXT_HIDDEN_STATES], next_h_states
+        ),
+        c.INFOS: {
+            info_name: (
+                set_rows(info_value, infos[info_name])
+                if info_name in infos
+                else info_value
+            )
+            for info_name, info_value in buffer_state[c.INFOS].items()
+        },
+        c.POINTER: (buffer_state[c.POINTER] + num_samples) % buffer_size,
+        c.COUNT: buffer_state[c.COUNT] + num_samples,
+    }
+
+
+def get_transitions(buffer_state: Dict[str, Any], idxes: chex.Array) -> Tuple[
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    dict,
+    chex.Array,
+    chex.Array,
+]:
+    """
+    Gets the transitions with next observations at the specified indices.
+
+    :param buffer_state: the buffer state
+    :param idxes: the indices of the samples
+    :type buffer_state: Dict[str, Any]
+    :type idxes: chex.Array
+    :return: observations, hidden states, actions, rewards, dones,
+             terminations, truncations, next observations, next hidden states,
+             environment informations, sequence lengths, and sampled indices
+    :rtype: Tuple[chex.Array, chex.Array, chex.Array, chex.Array, chex.Array, chex.Array,
+                  chex.Array, chex.Array, chex.Array, dict, chex.Array, chex.Array]
+
+    """
+    return (
+        buffer_state[c.OBSERVATIONS][idxes][:, None, ...],
+        buffer_state[c.HIDDEN_STATES][idxes][:, None, ...],
+        buffer_state[c.ACTIONS][idxes],
+        buffer_state[c.REWARDS][idxes],
+        buffer_state[c.DONES][idxes],
+        buffer_state[c.TERMINATEDS][idxes],
+        buffer_state[c.TRUNCATEDS][idxes],
+        buffer_state[c.NEXT_OBSERVATIONS][idxes][:, None, ...],
+        buffer_state[c.NEXT_HIDDEN_STATES][idxes][:, None, ...],
+        {
+            info_name: info_value[idxes]
+            for info_name, info_value in buffer_state[c.INFOS].items()
+        },
+        jnp.ones(len(idxes), dtype=jnp.int32),
+        idxes,
+    )
+
+
+def sample_with_next_obs(
+    buffer_state: Dict[str, Any],
+    key: jrandom.PRNGKey,
+    batch_size: int,
+) -> Tuple[
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    chex.Array,
+    dict,
+    chex.Array,
+    chex.Array,
+]:
+    """
+    Samples transitions with next observations uniformly from the buffer state.
+    `batch_size` must be static when this is jitted.
+
+    :param buffer_state: the buffer state
+    :param key: the random number generator key for sampling
+    :param batch_size: batch size
+    :type buffer_state: Dict[str, Any]
+    :type key: jrandom.PRNGKey
+    :type batch_size: int
+    :return: observations, hidden states, actions, rewards, dones,
+             terminations, truncations, next observations, next hidden states,
+             environment informations, sequence lengths, and sampled indices
+    :rtype: Tuple[chex.Array, chex.Array, chex.Array, chex.Array, chex.Array, chex.Array,
+                  chex.Array, chex.Array, chex.Array, dict, chex.Array, chex.Array]
+
+    """
+    buffer_size = buffer_state[c.OBSERVATIONS].shape[0]
+    idxes = jrandom.randint(
+        key,
+        (batch_size,),
+        0,
+        jnp.minimum(buffer_state[c.COUNT], buffer_size),
+    )
+    return get_transitions(buffer_state, idxes)
+
+
+class NextStateJAXBuffer(ReplayBuffer):
+    """
+    A replay buffer that keeps its storage on the JAX device and
+    explicitly keeps track of next states.
+    The storage is available as ``buffer_state`` to be used with the pure
+    functions ``push_batch`` and ``sample_with_next_obs`` inside jitted functions.
+    """
+
+    #: The storage of the buffer.
+    buffer_state: Dict[str, Any]
+
+    def __init__(
+        self,
+        buffer_size: int,
+        obs_dim: Sequence[int],
+        h_state_dim: Sequence[int],
+        act_dim: Sequence[int],
+        rew_dim: Sequence[int],
+        infos: dict = dict(),
+        rng: np.random.RandomState = np.random.RandomState(),
+        dtype: np.dtype = np.float32,
+        load_buffer: str = None,
+    ):
+        if load_buffer is not None:
+            self.load(load_buffer)
+        else:
+            self.rng = rng
+            self._buffer_size = buffer_size
+            self._dtype = dtype
+            self.act_dim = act_dim
+            self.buffer_state = init_buffer_state(
+                buffer_size=buffer_size,
+                obs_dim=obs_dim,
+                h_state_dim=h_state_dim,
+                act_dim=act_dim,
+                rew_dim=rew_dim,
+                infos=infos,
+                dtype=dtype,
+            )
+            self._count = 0
+
+        self._sample_key = jrandom.PRNGKey(self.rng.randint(2**31 - 1))
+        self._push_batch = jax.jit(push_batch, donate_argnums=0)
+        self._sample_with_next_obs = jax.jit(
+            sample_with_next_obs, static_argnames=["batch_size"]
+        )
+        self._get_transitions = jax.jit(get_transitions)
+
+    @property
+    def input_dim(self):
+        """The input data dimension."""
+        return self.buffer_state[c.OBSERVATIONS].shape[1:]
+
+    @property
+    def output_dim(self):
+        """The output data dimension."""
+        return self.act_dim
+
+    @property
+    def buffer_size(self):
+        """The buffer size."""
+        return self._buffer_size
+
+    @property
+    def is_full(self):
+        """Whether or not the buffer is full."""
+        return self._count >= self.buffer_size
+
+    def set_size(self, size: int):
+        """
+        Shrink the buffer size by truncating the storage.
+
+        :param size: new buffer size
+        :type size: int
+
+        """
+        if size == self._buffer_size:
+            return
+        assert (
+            size < self._buffer_size
+        ), f"cannot grow the buffer from {self._buffer_size} to {size}"
+        pointer = min(size, self._count % self._buffer_size) % size
+        self._buffer_size = size
+        self._count = min(self._count, size)
+        self.buffer_state = {
+            buffer_key: jax.tree_util.tree_map(lambda buffer: buffer[:size], buffer)
+            for buffer_key, buffer in self.buffer_state.items()
+            if buffer_key not in [c.POINTER, c.COUNT]
+        }
+        self.buffer_state[c.POINTER] = jnp.array(pointer, dtype=jnp.int32)
+        self.buffer_state[c.COUNT] = jnp.array(self._count, dtype=jnp.int32)
+
+    def __len__(self) -> int:
+        return min(self._count, self.buffer_size)
+
+    def push(
+        self,
+        obs: chex.Array,
+        h_state: chex.Array,
+        act: chex.Array,
+        rew: float,
+        terminated: bool,
+        truncated: bool,
+        info: dict,
+        next_obs: chex.Array,
+        next_h_state: chex.Array,
+        **kwargs,
+    ) -> bool:
+        """
+        Push data into buffer.
+
+        :param obs: the observation
+        :param h_state: the hidden state
+        :param act: the action taken
+        :param rew: the reward
+        :param terminated: end of the episode
+        :param truncated: early truncation due to time limit
+        :param info: environment information
+        :param next_obs: the next observation
+        :param next_h_state: the next hidden state
+        :param **kwargs:
+        :type obs: chex.Array
+        :type h_state: chex.Array
+        :type act: chex.Array
+        :type rew: float
+        :type terminated: bool
+        :type truncated: bool
+        :type info: dict
+        :type next_obs: chex.Array
+        :type next_h_state: chex.Array
+        :return: whether the sample is pushed successfully
+        :rtype: bool
+
+        """
+        return self.push_batch(
+            np.asarray(obs)[None],
+            np.asarray(h_state)[None],
+            np.asarray(act)[None],
+            np.asarray(rew).reshape((1, -1)),
+            np.asarray(terminated).reshape((1,)),
+            np.asarray(truncated).reshape((1,)),
+            {
+                info_name: np.asarray(info_value)[None]
+                for info_name, info_value in info.items()
+            },
+            next_obs=np.asarray(next_obs)[None],
+            next_h_state=np.asarray(next_h_state)[None],
+        )
+
+    def push_batch(
+        self,
+        obss: chex.Array,
+        h_states: chex.Array,
+        acts: chex.Array,
+        rews: chex.Array,
+        terminateds: chex.Array,
+        truncateds: chex.Array,
+        infos: Dict[str, chex.Array],
+        next_obs: chex.Array,
+        next_h_state: chex.Array,
+        **kwargs,
+    ) -> bool:
+        """
+        Push a batch of data into buffer.
+
+        :param obss: the observations
+        :param h_states: the hidden states
+        :param acts: the actions taken
+        :param rews: the rewards
+        :param terminateds: end of the episodes
+        :param truncateds: early truncations due to time limit
+        :param infos: environment information
+        :param next_obs: the next observations
+        :param next_h_state: the next hidden states
+        :param **kwargs:
+        :type obss: chex.Array
+        :type h_states: chex.Array
+        :type acts: chex.Array
+        :type rews: chex.Array
+        :type terminateds: chex.Array
+        :type truncateds: chex.Array
+        :type infos: Dict[str, chex.Array]
+        :type next_obs: chex.Array
+        :type next_h_state: chex.Array
+        :return: whether the samples are pushed successfully
+        :rtype: bool
+
+        """
+        infos = {
+            info_name: info_value
+            for info_name, info_value in infos.items()
+            if info_name in self.buffer_state[c.INFOS]
+        }
+        for start_i in range(0, len(obss), self._buffer_size):
+            end_i = start_i + self._buffer_size
+            self.buffer_state = self._push_batch(
+                self.buffer_state,
+                obss[start_i:end_i],
+                h_states[start_i:end_i],
+                acts[start_i:end_i],
+                rews[start_i:end_i],
+                terminateds[start_i:end_i],
+                truncateds[start_i:end_i],
+                {
+                    info_name: info_value[start_i:end_i]
+                    for info_name, info_value in infos.items()
+                },
+                next_obs[start_i:end_i],
+                next_h_state[start_i:end_i],
+            )
+        self._count += len(obss)
+        return True
+
+    def clear(self, **kwargs):
+        """
+        Reset the buffer to be empty.
+
+        :param **kwargs:
+
+        """
+        self._count = 0
+        self.buffer_state[c.POINTER] = jnp.zeros((), dtype=jnp.int32)
+        self.buffer_state[c.COUNT] = jnp.zeros((), dtype=jnp.int32)
+
+    def sample(
+        self, batch_size: int, idxes: Optional[chex.Array] = None, **kwargs
+    ) -> Tuple[
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        dict,
+        chex.Array,
+        chex.Array,
+    ]:
+        """
+        Sample transition from the buffer.
+
+        :param batch_size: batch size
+        :param idxes: the specified indices if needed
+        :param **kwargs:
+
+        :type batch_size: int
+        :type idxes: Optional[chex.Array]:  (Default value = None)
+        :return: observations, hidden states, actions, rewards, dones,
+                 terminations, truncations, environment informations, sequence lengths, and
+                 sampled indices
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array, chex.Array,
+                      chex.Array, chex.Array, chex.Array, dict, chex.Array, chex.Array]
+
+        """
+        (
+            obss,
+            h_states,
+            acts,
+            rews,
+            dones,
+            terminateds,
+            truncateds,
+            _,
+            _,
+            infos,
+            lengths,
+            random_idxes,
+        ) = self.sample_with_next_obs(batch_size, idxes)
+        return (
+            obss,
+            h_states,
+            acts,
+            rews,
+            dones,
+            terminateds,
+            truncateds,
+            infos,
+            lengths,
+            random_idxes,
+        )
+
+    def sample_with_next_obs(
+        self,
+        batch_size: int,
+        idxes: Optional[chex.Array] = None,
+        **kwargs,
+    ) -> Tuple[
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        dict,
+        chex.Array,
+        chex.Array,
+    ]:
+        """
+        Sample transition with next observations from the buffer.
+        The samples stay on the device.
+
+        :param batch_size: batch size
+        :param idxes: the specified indices if needed
+        :param **kwargs:
+
+        :type batch_size: int
+        :type idxes: Optional[chex.Array]:  (Default value = None)
+        :return: observations, hidden states, actions, rewards, dones,
+                 terminations, truncations, next observations, next hidden states,
+                 environment informations, sequence lengths, and sampled indices
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array, chex.Array, chex.Array, chex.Array,
+                      chex.Array, chex.Array, chex.Array, dict, chex.Array, chex.Array]
+
+        """
+        if not len(self):
+            raise NoSampleError
+
+        if idxes is not None:
+            return self._get_transitions(self.buffer_state, idxes)
+
+        self._sample_key, sample_key = jrandom.split(self._sample_key)
+        return self._sample_with_next_obs(
+            self.buffer_state, sample_key, batch_size=batch_size
+        )
+
+    def sample_init_obs(
+        self, batch_size: int, **kwargs
+    ) -> Tuple[chex.Array, chex.Array]:
+        """
+        Sample initial observations from the buffer.
+
+        :param batch_size: batch size
+        :param **kwargs:
+        :type batch_size: int
+        :return: the initial observations and hidden states
+        :rtype: Tuple[chex.Array, chex.Array]
+
+        """
+        dones = np.asarray(self.buffer_state[c.DONES])
+        if np.sum(dones) == 0:
+            raise NoSampleError
+        pointer = self._count % self._buffer_size
+        init_idxes = (np.where(dones == 1)[0] + 1) % self._buffer_size
+        init_idxes = init_idxes[init_idxes < len(self)]
+        init_idxes = init_idxes[init_idxes != pointer]
+        random_idxes = init_idxes[self.rng.randint(len(init_idxes), size=batch_size)]
+        return (
+            self.buffer_state[c.OBSERVATIONS][random_idxes],
+            self.buffer_state[c.HIDDEN_STATES][random_idxes],
+        )
+
+    def get_buffer_dict(self) -> Dict[str, Any]:
+        """
+        Get buffer dictionary.
+        This follows the layout of ``NextStateNumPyBuffer``.
+
+        :return: buffer dictionary
+        :rtype: Dict[str, Any]
+
+        """
+        buffer_state = jax.device_get(self.buffer_state)
+        buffer_dict = {
+            buffer_key: buffer_value
+            for buffer_key, buffer_value in buffer_state.items()
+            if buffer_key not in [c.POINTER, c.COUNT]
+        }
+        buffer_dict[c.BUFFER_SIZE] = self._buffer_size
+        buffer_dict[c.DTYPE] = self._dtype
+        buffer_dict[c.RNG] = self.rng
+        buffer_dict[c.BURN_IN_WINDOW] = {
+            c.BURN_IN_WINDOW: 0,
+        }
+        buffer_dict[c.ACT_DIM] = self.act_dim
+        buffer_dict[c.POINTER] = int(buffer_state[c.POINTER])
+        buffer_dict[c.COUNT] = self._count
+        return buffer_dict
+
+    def load_from_buffer_dict(self, buffer_dict: Dict[str, Any]):
+        """
+        Load from a buffer dictionary.
+
+        :param buffer_dict: buffer dictionary
+        :type buffer_dict: Dict[str, Any]
+
+        """
+        self._buffer_size = buffer_dict[c.BUFFER_SIZE]
+        self._dtype = buffer_dict[c.DTYPE]
+        self.rng = buffer_dict[c.RNG]
+        self.act_dim = buffer_dict[c.ACT_DIM]
+        self._count = buffer_dict[c.COUNT]
+        self.buffer_state = jax.device_put(
+            {
+                c.OBSERVATIONS: buffer_dict[c.OBSERVATIONS],
+                c.HIDDEN_STATES: buffer_dict[c.HIDDEN_STATES],
+                c.ACTIONS: buffer_dict[c.ACTIONS],
+                c.REWARDS: buffer_dict[c.REWARDS],
+                c.DONES: buffer_dict[c.DONES],
+                c.TERMINATEDS: buffer_dict[c.TERMINATEDS],
+                c.TRUNCATEDS: buffer_dict[c.TRUNCATEDS],
+                c.NEXT_OBSERVATIONS: buffer_dict[c.NEXT_OBSERVATIONS],
+                c.NEXT_HIDDEN_STATES: buffer_dict[c.NEXT_HIDDEN_STATES],
+                c.INFOS: buffer_dict[c.INFOS],
+                c.POINTER: np.array(buffer_dict[c.POINTER], dtype=np.int32),
+                c.COUNT: np.array(buffer_dict[c.COUNT], dtype=np.int32),
+            }
+        )
+
+    def save(self, save_path: str, **kwargs):
+        """
+        Saves the replay buffer.
+
+        :param save_path: the file name of the replay buffer
+        :param **kwargs:
+        :type save_path: str
+
+        """
+        with gzip.open(save_path, "wb") as f:
+            pickle.dump(
+                self.get_buffer_dict(),
+                f,
+            )
+
+    def load(self, load_path: str, **kwargs):
+        """
+        Loads a replay buffer.
+
+        :param load_path: the file name of the replay buffer
+        :param **kwargs:
+        :type load_path: str
+
+        """
+        with gzip.open(load_path, "rb") as f:
+            buffer_dict = pickle.load(f)
+        self.load_from_buffer_dict(buffer_dict)
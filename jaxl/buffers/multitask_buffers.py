@@ -0,0 +1,189 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence, Tuple
+
+import chex
+import numpy as np
+
+from jaxl.buffers.buffers import ReplayBuffer, NoSampleError
+from jaxl.buffers.ram_buffers import TransitionNumPyBuffer
+
+
+"""
+Multitask replay buffers.
+- MultitaskNumPyBuffer samples a minibatch from every task buffer at once.
+  The transitions of all tasks are concatenated into contiguous arrays with
+  per-task offset and length tables, such that the minibatches of all tasks
+  are gathered with a single indexing operation. The task buffers are rebound
+  to views of the concatenated arrays, such that the storage is not duplicated.
+  Memory-mapped task buffers are not concatenated, instead the indices of all
+  tasks are drawn at once and each task is gathered from its own files.
+  The next minibatch can be prefetched on a background thread while the
+  current update is running.
+XXX: Buffers with burn-in windows or prioritized sampling fall back to sampling
+     each task buffer separately.
+"""
+
+
+class MultitaskNumPyBuffer:
+    """
+    Read-only container over a fixed set of task buffers.
+    The samples are stacked along the leading task axis.
+    """
+
+    #: The task buffers.
+    _buffers: Sequence[ReplayBuffer]
+
+    #: The offset of each task within the concatenated arrays.
+    _offsets: chex.Array
+
+    #: The number of samples of each task.
+    _lengths: chex.Array
+
+    def __init__(
+        self,
+        buffers: Sequence[ReplayBuffer],
+        rng: Optional[np.random.RandomState] = None,
+        prefetch: bool = False,
+    ):
+        assert len(buffers) > 0, "there must be at least one task buffer"
+        self._buffers = buffers
+        self.rng = np.random.RandomState() if rng is None else rng
+        self._lengths = np.array([len(buffer) for buffer in buffers], dtype=np.int64)
+        if np.any(self._lengths == 0):
+            raise NoSampleError
+
+        self._vectorized = all(
+            isinstance(buffer, TransitionNumPyBuffer) and buffer.burn_in_window == 0
+            for buffer in buffers
+        )
+        # Concatenating memory-mapped storage would read every file into memory
+        self._concatenated = self._vectorized and not any(
+            isinstance(getattr(buffer, field), np.memmap)
+            for buffer in buffers
+            for field in ("observations", "hidden_states", "actions")
+        )
+        if self._concatenated:
+            # The whole storage of each task is kept, such that the task buffers remain valid
+            storage_sizes = np.array(
+                [len(buffer.observations) for buffer in buffers], dtype=np.int64
+            )
+            self._offsets = np.concatenate(([0], np.cumsum(storage_sizes)[:-1]))
+            for field in ("observations", "hidden_states", "actions"):
+                setattr(
+                    self,
+                    field,
+                    np.concatenate([getattr(buffer, field) for buffer in buffers]),
+                )
+
+                # Releases the original storage by rebinding the task buffers to views
+                for buffer, offset, storage_size in zip(
+                    buffers, self._offsets, storage_sizes
+                ):
+                    setattr(
+                        buffer,
+                        field,
+                        getattr(self, field)[offset : offset + storage_size],
+                    )
+
+        self._executor = None
+        self._next_batch = None
+        self._next_batch_size = None
+        if prefetch:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def num_tasks(self) -> int:
+        """The number of tasks."""
+        return len(self._buffers)
+
+    @property
+    def buffers(self) -> Sequence[ReplayBuffer]:
+        """The task buffers."""
+        return self._buffers
+
+    @property
+    def lengths(self) -> chex.Array:
+        """The number of samples of each task."""
+        return self._lengths
+
+    def _sample(self, batch_size: int) -> Tuple[chex.Array, chex.Array, chex.Array]:
+        """
+        Samples a minibatch from every task.
+
+        :param batch_size: batch size per task
+        :type batch_size: int
+        :return: observations, hidden states, and actions
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array]
+
+        """
+        if not self._vectorized:
+            all_obss, all_h_states, all_acts = [], [], []
+            for buffer in self._buffers:
+                obss, h_states, acts, _, _, _, _, _, _, _ = buffer.sample(batch_size)
+                all_obss.append(obss)
+                all_h_states.append(h_states)
+                all_acts.append(acts)
+            return np.stack(all_obss), np.stack(all_h_states), np.stack(all_acts)
+
+        idxes = (
+            self.rng.random_sample((self.num_tasks, batch_size))
+            * self._lengths[:, None]
+        ).astype(np.int64)
+        if not self._concatenated:
+            return (
+                np.stack(
+                    [
+                        buffer.observations[task_idxes]
+                        for buffer, task_idxes in zip(self._buffers, idxes)
+                    ]
+                )[:, :, None, ...],
+                np.stack(
+                    [
+                        buffer.hidden_states[task_idxes]
+                        for buffer, task_idxes in zip(self._buffers, idxes)
+                    ]
+                )[:, :, None, ...],
+                np.stack(
+                    [
+                        buffer.actions[task_idxes]
+                        for buffer, task_idxes in zip(self._buffers, idxes)
+                    ]
+                ),
+            )
+
+        idxes = self._offsets[:, None] + idxes
+        return (
+            self.observations[idxes][:, :, None, ...],
+            self.hidden_states[idxes][:, :, None, ...],
+            self.actions[idxes],
+        )
+
+    def sample(self, batch_size: int) -> Tuple[chex.Array, chex.Array, chex.Array]:
+        """
+        Samples a minibatch from every task.
+        When prefetching, the minibatch is taken from the background thread and
+        the next minibatch is requested immediately.
+
+        :param batch_size: batch size per task
+        :type batch_size: int
+        :return: observations, hidden states, and actions,
+                 each with shape (num_tasks, batch_size, ...)
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array]
+
+        """
+        if self._executor is None:
+            return self._sample(batch_size)
+
+        if self._next_batch is None or self._next_batch_size != batch_size:
+            self._next_batch = self._executor.submit(self._sample, batch_size)
+            self._next_batch_size = batch_size
+        batch = self._next_batch.result()
+        self._next_batch = self._executor.submit(self._sample, batch_size)
+        return batch
+
+    def close(self):
+        """Stops the prefetching thread."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            self._next_batch = None
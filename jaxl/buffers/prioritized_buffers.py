@@ -0,0 +1,403 @@
+from typing import Any, Dict, Optional, Tuple
+
+import chex
+import numpy as np
+
+from jaxl.buffers.buffers import ReplayBuffer, NoSampleError
+from jaxl.buffers.ram_buffers import TransitionNumPyBuffer
+import jaxl.constants.buffers as c
+
+
+"""
+Prioritized experience replay (PER) as suggested by Schaul et al.
+Reference: https://arxiv.org/abs/1511.05952
+- PrioritizedReplayBuffer wraps a ``TransitionNumPyBuffer`` and keeps
+  array-backed sum-tree and min-tree over the priorities. Each level of the
+  trees is updated and traversed for the whole batch at once.
+XXX: The priorities are not saved with the buffer. Loaded samples start with
+     the maximum priority.
+"""
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Prioritized replay buffer that wraps a ``TransitionNumPyBuffer``.
+    The samples are drawn proportionally to their priorities with stratified sampling,
+    and the importance sampling weights are provided in the environment information.
+    """
+
+    #: The wrapped buffer.
+    _buffer: TransitionNumPyBuffer
+
+    #: The sum-tree over the priorities, where the leaves start at index ``_capacity``.
+    _sum_tree: chex.Array
+
+    #: The min-tree over the priorities, where the leaves start at index ``_capacity``.
+    _min_tree: chex.Array
+
+    def __init__(
+        self,
+        buffer: TransitionNumPyBuffer,
+        alpha: float = 0.6,
+        beta: float = 0.4,
+        beta_final: float = 1.0,
+        beta_annealing_steps: int = 0,
+        epsilon: float = 1e-6,
+    ):
+        assert isinstance(
+            buffer, TransitionNumPyBuffer
+        ), f"buffer must be a TransitionNumPyBuffer, got {type(buffer)}"
+        assert alpha >= 0.0, f"alpha must be non-negative, got {alpha}"
+        assert epsilon > 0.0, f"epsilon must be positive, got {epsilon}"
+        self._buffer = buffer
+        self._alpha = alpha
+        self._beta = beta
+        self._beta_final = beta_final
+        self._beta_annealing_steps = beta_annealing_steps
+        self._epsilon = epsilon
+        self._num_samples = 0
+        self._initialize_trees(buffer.buffer_size)
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_buffer":
+            raise AttributeError(name)
+        return getattr(self._buffer, name)
+
+    def _initialize_trees(self, size: int):
+        """
+        Initializes the trees such that the stored samples have the maximum priority.
+
+        :param size: the number of leaves needed
+        :type size: int
+
+        """
+        self._capacity = 1
+        while self._capacity < size:
+            self._capacity *= 2
+        self._sum_tree = np.zeros(2 * self._capacity, dtype=np.float64)
+        self._min_tree = np.full(2 * self._capacity, np.inf, dtype=np.float64)
+        self._max_priority = 1.0
+        if len(self._buffer):
+            self._set_priorities(
+                np.arange(len(self._buffer)), np.full(len(self._buffer), 1.0)
+            )
+
+    def _set_priorities(self, idxes: chex.Array, priorities: chex.Array):
+        """
+        Sets the leaves and recomputes their ancestors, one level at a time.
+
+        :param idxes: the sample indices
+        :param priorities: the priorities, with ``alpha`` applied
+        :type idxes: chex.Array
+        :type priorities: chex.Array
+
+        """
+        tree_idxes = idxes + self._capacity
+        self._sum_tree[tree_idxes] = priorities
+        self._min_tree[tree_idxes] = priorities
+        while tree_idxes[0] > 1:
+            tree_idxes = np.unique(tree_idxes // 2)
+            left_idxes = 2 * tree_idxes
+            self._sum_tree[tree_idxes] = (
+                self._sum_tree[left_idxes] + self._sum_tree[left_idxes + 1]
+            )
+            self._min_tree[tree_idxes] = np.minimum(
+                self._min_tree[left_idxes], self._min_tree[left_idxes + 1]
+            )
+
+    def _find_prefix_sums(self, prefix_sums: chex.Array) -> chex.Array:
+        """
+        Finds the samples whose cumulative priorities contain the prefix sums.
+
+        :param prefix_sums: the prefix sums
+        :type prefix_sums: chex.Array
+        :return: the sample indices
+        :rtype: chex.Array
+
+        """
+        tree_idxes = np.ones(len(prefix_sums), dtype=np.int64)
+        while tree_idxes[0] < self._capacity:
+            left_idxes = 2 * tree_idxes
+            left_sums = self._sum_tree[left_idxes]
+            go_right = prefix_sums > left_sums
+            prefix_sums = prefix_sums - left_sums * go_right
+            tree_idxes = left_idxes + go_right
+
+        # Numerical errors may reach an empty leaf
+        return np.minimum(tree_idxes - self._capacity, len(self._buffer) - 1)
+
+    @property
+    def beta(self) -> float:
+        """The current importance sampling exponent."""
+        if self._beta_annealing_steps <= 0:
+            return self._beta
+        progress = min(self._num_samples / self._beta_annealing_steps, 1.0)
+        return self._beta + progress * (self._beta_final - self._beta)
+
+    @property
+    def buffer(self) -> TransitionNumPyBuffer:
+        """The wrapped buffer."""
+        return self._buffer
+
+    @property
+    def buffer_size(self):
+        """The buffer size."""
+        return self._buffer.buffer_size
+
+    @property
+    def is_full(self):
+        """Whether or not the buffer is full."""
+        return self._buffer.is_full
+
+    @property
+    def input_dim(self):
+        """The input data dimension."""
+        return self._buffer.input_dim
+
+    @property
+    def output_dim(self):
+        """The output data dimension."""
+        return self._buffer.output_dim
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def set_size(self, size: int):
+        """
+        Change the buffer size and reset the priorities.
+
+        :param size: new buffer size
+        :type size: int
+
+        """
+        self._buffer.set_size(size)
+        self._initialize_trees(self._buffer.buffer_size)
+
+    def push(self, *args, **kwargs) -> bool:
+        """
+        Push data into buffer with the maximum priority.
+
+        :param *args:
+        :param **kwargs:
+        :return: whether the sample is pushed successfully
+        :rtype: bool
+
+        """
+        idx = self._buffer.pointer
+        pushed = self._buffer.push(*args, **kwargs)
+        self._set_priorities(
+            np.array([idx]), np.array([self._max_priority**self._alpha])
+        )
+        return pushed
+
+    def push_batch(self, obss: chex.Array, *args, **kwargs) -> bool:
+        """
+        Push a batch of data into buffer with the maximum priority.
+
+        :param obss: the observations
+        :param *args:
+        :param **kwargs:
+        :type obss: chex.Array
+        :return: whether the samples are pushed successfully
+        :rtype: bool
+
+        """
+        num_samples = min(len(obss), self._buffer.buffer_size)
+        idxes = (
+            self._buffer.pointer + len(obss) - num_samples + np.arange(num_samples)
+        ) % self._buffer.buffer_size
+        pushed = self._buffer.push_batch(obss, *args, **kwargs)
+        self._set_priorities(
+            idxes, np.full(num_samples, self._max_priority**self._alpha)
+        )
+        return pushed
+
+    def update_priorities(self, idxes: chex.Array, td_errors: chex.Array):
+        """
+        Updates the priorities of the samples using their TD errors.
+
+        :param idxes: the sample indices
+        :param td_errors: the TD errors of the samples
+        :type idxes: chex.Array
+        :type td_errors: chex.Array
+
+        """
+        priorities = np.abs(np.reshape(td_errors, -1)) + self._epsilon
+        self._max_priority = max(self._max_priority, float(np.max(priorities)))
+        self._set_priorities(np.asarray(idxes), priorities**self._alpha)
+
+    def clear(self, **kwargs):
+        """
+        Reset the buffer to be empty.
+
+        :param **kwargs:
+
+        """
+        self._buffer.clear(**kwargs)
+        self._num_samples = 0
+        self._initialize_trees(self._buffer.buffer_size)
+
+    def sample_idxes(self, batch_size: int) -> Tuple[chex.Array, chex.Array]:
+        """
+        Samples indices proportionally to their priorities.
+
+        :param batch_size: batch size
+        :type batch_size: int
+        :return: the sampled indices and their importance sampling weights
+        :rtype: Tuple[chex.Array, chex.Array]
+
+        """
+        if not len(self._buffer):
+            raise NoSampleError
+
+        total_priority = self._sum_tree[1]
+        prefix_sums = (
+            (np.arange(batch_size) + self._buffer.rng.uniform(size=batch_size))
+            * total_priority
+            / batch_size
+        )
+        idxes = self._find_prefix_sums(prefix_sums)
+
+        importance_weights = self.get_importance_weights(idxes)
+        self._num_samples += 1
+        return idxes, importance_weights
+
+    def get_importance_weights(self, idxes: chex.Array) -> chex.Array:
+        """
+        Gets the importance sampling weights of the samples.
+
+        :param idxes: the sample indices
+        :type idxes: chex.Array
+        :return: the importance sampling weights
+        :rtype: chex.Array
+
+        """
+        # The weights are normalized by the weight of the least likely sample
+        return (
+            (self._sum_tree[idxes + self._capacity] / self._min_tree[1]) ** (-self.beta)
+        ).astype(np.float32)
+
+    def sample(
+        self, batch_size: int, idxes: Optional[chex.Array] = None, **kwargs
+    ) -> Tuple[
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        dict,
+        chex.Array,
+        chex.Array,
+    ]:
+        """
+        Sample transition from the buffer proportionally to the priorities.
+        The importance sampling weights are stored in the environment information.
+
+        :param batch_size: batch size
+        :param idxes: the specified indices if needed
+        :param **kwargs:
+
+        :type batch_size: int
+        :type idxes: Optional[chex.Array]:  (Default value = None)
+        :return: observations, hidden states, actions, rewards, dones,
+                 terminations, truncations, environment informations, sequence lengths, and
+                 sampled indices
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array, chex.Array,
+                      chex.Array, chex.Array, chex.Array, dict, chex.Array, chex.Array]
+
+        """
+        if idxes is None:
+            idxes, importance_weights = self.sample_idxes(batch_size)
+        else:
+            importance_weights = self.get_importance_weights(idxes)
+        samples = self._buffer.sample(batch_size, idxes, **kwargs)
+        samples[-3][c.IMPORTANCE_WEIGHTS] = importance_weights
+        return samples
+
+    def sample_with_next_obs(
+        self, batch_size: int, idxes: Optional[chex.Array] = None, **kwargs
+    ) -> Tuple[
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        chex.Array,
+        dict,
+        chex.Array,
+        chex.Array,
+    ]:
+        """
+        Sample transition with next observations from the buffer proportionally to the priorities.
+        The importance sampling weights are stored in the environment information.
+
+        :param batch_size: batch size
+        :param idxes: the specified indices if needed
+        :param **kwargs:
+
+        :type batch_size: int
+        :type idxes: Optional[chex.Array]:  (Default value = None)
+        :return: observations, hidden states, actions, rewards, dones,
+                 terminations, truncations, next observations, next hidden states,
+                 environment informations, sequence lengths, and sampled indices
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array, chex.Array, chex.Array, chex.Array,
+                      chex.Array, chex.Array, chex.Array, dict, chex.Array, chex.Array]
+
+        """
+        if idxes is None:
+            idxes, importance_weights = self.sample_idxes(batch_size)
+        else:
+            importance_weights = self.get_importance_weights(idxes)
+        samples = self._buffer.sample_with_next_obs(batch_size, idxes, **kwargs)
+        samples[-3][c.IMPORTANCE_WEIGHTS] = importance_weights
+        return samples
+
+    def sample_init_obs(self, batch_size: int, **kwargs) -> Any:
+        """
+        Sample initial observations from the buffer.
+
+        :param batch_size: batch size
+        :param **kwargs:
+        :type batch_size: int
+        :return: the initial observations
+        :rtype: Any
+
+        """
+        return self._buffer.sample_init_obs(batch_size, **kwargs)
+
+    def get_buffer_dict(self) -> Dict[str, Any]:
+        """
+        Get buffer dictionary of the wrapped buffer.
+
+        :return: buffer dictionary
+        :rtype: Dict[str, Any]
+
+        """
+        return self._buffer.get_buffer_dict()
+
+    def save(self, save_path: str, **kwargs):
+        """
+        Saves the wrapped replay buffer.
+
+        :param save_path: the file name of the replay buffer
+        :param **kwargs:
+        :type save_path: str
+
+        """
+        self._buffer.save(save_path, **kwargs)
+
+    def load(self, load_path: str, **kwargs):
+        """
+        Loads the wrapped replay buffer and resets the priorities.
+
+        :param load_path: the file name of the replay buffer
+        :param **kwargs:
+        :type load_path: str
+
+        """
+        self._buffer.load(load_path, **kwargs)
+        self._initialize_trees(self._buffer.buffer_size)
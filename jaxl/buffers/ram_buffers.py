@@ -66,8 +66,10 @@ class AbstractNumPyBuffer(ReplayBuffer):
             self._dtype = dtype
             self.observations = np.zeros(shape=(buffer_size, *obs_dim), dtype=dtype)
             self.hidden_states = np.zeros(
-                shape=(buffer_size, *h_state_dim), dtype=np.float32
+                shape=(buffer_size, *h_state_dim), dtype=dtype
             )
+
+            # Actions and rewards are kept in float32 to represent them exactly
             self.actions = np.zeros(
                 shape=(buffer_size, *act_dim[:-1]), dtype=np.float32
             )
@@ -94,12 +96,14 @@ class AbstractNumPyBuffer(ReplayBuffer):
                 self.historic_dones = np.ones(
                     shape=(burn_in_window, 1), dtype=np.float32
                 )
+                self._historic_pointer = 0
             self._pointer = 0
             self._count = 0
             self.act_dim = act_dim
 
         self._checkpoint_interval = checkpoint_interval
         self._checkpoint_idxes = np.ones(shape=self._buffer_size, dtype=bool)
+        self._num_unsaved = 0
         if checkpoint_path is not None and self._buffer_size >= checkpoint_interval > 0:
             self._checkpoint_path = checkpoint_path
             os.makedirs(checkpoint_path, exist_ok=True)
@@ -212,6 +216,7 @@ class AbstractNumPyBuffer(ReplayBuffer):
             )
 
         self._checkpoint_idxes[transitions_to_save] = 1
+        self._num_unsaved -= len(transitions_to_save)
         self._checkpoint_count += 1
 
     def push(
@@ -249,15 +254,14 @@ class AbstractNumPyBuffer(ReplayBuffer):
         """
         # Stores the overwritten observation and hidden state into historic variables
         if self.burn_in_window > 0 and self._count >= self._buffer_size:
-            self.historic_observations = np.concatenate(
-                (self.historic_observations[1:], [self.observations[self._pointer]])
-            )
-            self.historic_hidden_states = np.concatenate(
-                (self.historic_hidden_states[1:], [self.hidden_states[self._pointer]])
-            )
-            self.historic_dones = np.concatenate(
-                (self.historic_dones[1:], [self.dones[self._pointer]])
-            )
+            self.historic_observations[self._historic_pointer] = self.observations[
+                self._pointer
+            ]
+            self.historic_hidden_states[self._historic_pointer] = self.hidden_states[
+                self._pointer
+            ]
+            self.historic_dones[self._historic_pointer] = self.dones[self._pointer]
+            self._historic_pointer = (self._historic_pointer + 1) % self.burn_in_window
 
         self.observations[self._pointer] = obs
         self.hidden_states[self._pointer] = h_state
@@ -266,6 +270,7 @@ class AbstractNumPyBuffer(ReplayBuffer):
         self.dones[self._pointer] = np.logical_or(terminated, truncated)
         self.terminateds[self._pointer] = terminated
         self.truncateds[self._pointer] = truncated
+        self._num_unsaved += int(self._checkpoint_idxes[self._pointer])
         self._checkpoint_idxes[self._pointer] = 0
         for info_name, info_value in info.items():
             if info_name not in self.infos:
@@ -277,8 +282,152 @@ class AbstractNumPyBuffer(ReplayBuffer):
 
         if (
             self._checkpoint_interval > 0
-            and (self._buffer_size - self._checkpoint_idxes.sum())
-            >= self._checkpoint_interval
+            and self._num_unsaved >= self._checkpoint_interval
+        ):
+            self.checkpoint()
+        return True
+
+    def _push_historic(self, idxes: chex.Array):
+        """
+        Stores the to-be-overwritten observations and hidden states into
+        the historic ring buffer, in place.
+
+        :param idxes: the indices to be overwritten, from oldest to newest
+        :type idxes: chex.Array
+
+        """
+        idxes = idxes[-self.burn_in_window :]
+        historic_idxes = (
+            self._historic_pointer + np.arange(len(idxes))
+        ) % self.burn_in_window
+        self.historic_observations[historic_idxes] = self.observations[idxes]
+        self.historic_hidden_states[historic_idxes] = self.hidden_states[idxes]
+        self.historic_dones[historic_idxes] = self.dones[idxes]
+        self._historic_pointer = (
+            self._historic_pointer + len(idxes)
+        ) % self.burn_in_window
+
+    def _get_historic(self) -> Tuple[chex.Array, chex.Array, chex.Array]:
+        """
+        Gets the historic observations, hidden states, and dones, from oldest to newest.
+
+        :return: the historic observations, hidden states, and dones
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array]
+
+        """
+        return (
+            np.roll(self.historic_observations, -self._historic_pointer, axis=0),
+            np.roll(self.historic_hidden_states, -self._historic_pointer, axis=0),
+            np.roll(self.historic_dones, -self._historic_pointer, axis=0),
+        )
+
+    def _max_push_batch_size(self) -> int:
+        """
+        The maximum number of samples that can be written in one batch
+        without overwriting samples of the same batch or skipping a checkpoint.
+
+        :return: the maximum batch size
+        :rtype: int
+
+        """
+        if self._checkpoint_interval > 0:
+            return max(
+                min(self._buffer_size, self._checkpoint_interval - self._num_unsaved),
+                1,
+            )
+        return self._buffer_size
+
+    def push_batch(
+        self,
+        obss: chex.Array,
+        h_states: chex.Array,
+        acts: chex.Array,
+        rews: chex.Array,
+        terminateds: chex.Array,
+        truncateds: chex.Array,
+        infos: Dict[str, chex.Array],
+        **kwargs,
+    ) -> bool:
+        """
+        Push a batch of data into buffer.
+        The samples are written with wrapped slice assignments.
+        Batches that are larger than the buffer, or that cross a checkpoint,
+        are pushed in chunks.
+
+        :param obss: the observations
+        :param h_states: the hidden states
+        :param acts: the actions taken
+        :param rews: the rewards
+        :param terminateds: end of the episodes
+        :param truncateds: early truncations due to time limit
+        :param infos: environment information
+        :param **kwargs:
+        :type obss: chex.Array
+        :type h_states: chex.Array
+        :type acts: chex.Array
+        :type rews: chex.Array
+        :type terminateds: chex.Array
+        :type truncateds: chex.Array
+        :type infos: Dict[str, chex.Array]
+        :return: whether the samples are pushed successfully
+        :rtype: bool
+
+        """
+        num_samples = len(obss)
+        if num_samples > self._max_push_batch_size():
+            start_i = 0
+            while start_i < num_samples:
+                end_i = start_i + self._max_push_batch_size()
+                self.push_batch(
+                    obss[start_i:end_i],
+                    h_states[start_i:end_i],
+                    acts[start_i:end_i],
+                    rews[start_i:end_i],
+                    terminateds[start_i:end_i],
+                    truncateds[start_i:end_i],
+                    {
+                        info_name: info_value[start_i:end_i]
+                        for info_name, info_value in infos.items()
+                    },
+                    **{
+                        kwarg_name: kwarg_value[start_i:end_i]
+                        for kwarg_name, kwarg_value in kwargs.items()
+                    },
+                )
+                start_i = end_i
+            return True
+
+        idxes = (self._pointer + np.arange(num_samples)) % self._buffer_size
+
+        # Stores the overwritten observations and hidden states into historic variables
+        num_overwritten = min(
+            max(self._count + num_samples - self._buffer_size, 0), num_samples
+        )
+        if self.burn_in_window > 0 and num_overwritten > 0:
+            self._push_historic(idxes[num_samples - num_overwritten :])
+
+        self.observations[idxes] = obss
+        self.hidden_states[idxes] = h_states
+        self.actions[idxes] = np.reshape(acts, (num_samples, *self.actions.shape[1:]))
+        self.rewards[idxes] = np.reshape(rews, (num_samples, *self.rewards.shape[1:]))
+        terminateds = np.reshape(terminateds, (num_samples, 1))
+        truncateds = np.reshape(truncateds, (num_samples, 1))
+        self.dones[idxes] = np.logical_or(terminateds, truncateds)
+        self.terminateds[idxes] = terminateds
+        self.truncateds[idxes] = truncateds
+        self._num_unsaved += int(self._checkpoint_idxes[idxes].sum())
+        self._checkpoint_idxes[idxes] = 0
+        for info_name, info_value in infos.items():
+            if info_name not in self.infos:
+                continue
+            self.infos[info_name][idxes] = info_value
+
+        self._pointer = (self._pointer + num_samples) % self._buffer_size
+        self._count += num_samples
+
+        if (
+            self._checkpoint_interval > 0
+            and self._num_unsaved >= self._checkpoint_interval
         ):
             self.checkpoint()
         return True
@@ -293,89 +442,108 @@ class AbstractNumPyBuffer(ReplayBuffer):
         self._pointer = 0
         self._count = 0
         self._checkpoint_idxes.fill(1)
+        self._num_unsaved = 0
         if self.burn_in_window > 0:
             self.historic_observations.fill(0.0)
             self.historic_hidden_states.fill(0.0)
             self.historic_dones.fill(1)
+            self._historic_pointer = 0
 
-    def _get_burn_in_window(
+    def _get_burn_in_idxes(
         self, idxes: chex.Array
-    ) -> Tuple[chex.Array, chex.Array, chex.Array]:
+    ) -> Tuple[chex.Array, chex.Array, chex.Array, chex.Array, chex.Array]:
         """
-        Gets the history of observations and hidden states.
+        Gets the indices of the burn-in windows, with the samples themselves as the last entries.
+        Each entry is taken from either the buffer or the historic buffer, or is padded with zero.
+        The non-zero entries are moved to the beginning if ``padding_first`` is set.
 
         :param idxes: the indices of the samples
         :type idxes: chex.Array
-        :return: the historical observation, the historical hidden states, and
-                 their sequence lengths
-        :rtype: Tuple[chex.Array, chex.Array, chex.Array]
+        :return: the buffer indices, the historic buffer indices, whether each entry is
+                 taken from the buffer, whether each entry is taken from the historic buffer,
+                 and the sequence lengths
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array, chex.Array, chex.Array]
 
         """
-        historic_observations = np.zeros(
-            (len(idxes), self.burn_in_window, *self.observations.shape[1:])
-        )
-        historic_hidden_states = np.zeros(
-            (len(idxes), self.burn_in_window, *self.hidden_states.shape[1:])
-        )
-        not_dones = np.ones((len(idxes), self.burn_in_window), dtype=bool)
-        lengths = np.zeros(len(idxes), dtype=np.int64)
-
-        shifted_idxes = (
-            (idxes - self._pointer) % len(self)
-            - np.arange(self.burn_in_window, 0, -1)[:, None]
-        ).T
-        cyclic_idxes = (idxes - np.arange(self.burn_in_window, 0, -1)[:, None]).T
+        window = np.arange(self.burn_in_window, 0, -1)
+        shifted_idxes = ((idxes - self._pointer) % len(self))[:, None] - window
+        cyclic_idxes = (idxes[:, None] - window) % self._buffer_size
 
         # Determine which index needs to look into historic buffer
-        historic_idxes = np.logical_and(
-            shifted_idxes >= -self.burn_in_window, shifted_idxes < 0
-        ).astype(np.int64)
-        non_historic_idxes = 1 - historic_idxes
+        is_historic = shifted_idxes < 0
+        historic_ring_idxes = (
+            self._historic_pointer + shifted_idxes * is_historic
+        ) % self.burn_in_window
 
         # Check whether we have reached another episode
-        not_dones[np.where(self.dones[cyclic_idxes, 0] * non_historic_idxes)] = 0
-        not_dones[
-            np.where(
-                self.historic_dones[shifted_idxes * historic_idxes, 0] * historic_idxes
-            )
-        ] = 0
-
+        dones = np.where(
+            is_historic,
+            self.historic_dones[historic_ring_idxes, 0],
+            self.dones[cyclic_idxes, 0],
+        )
+        not_dones = np.flip(dones == 0, axis=1)
         lengths = (
-            np.argmin(np.flip(not_dones, axis=1), axis=1)
+            np.argmin(not_dones, axis=1)
             + np.all(not_dones, axis=1) * self.burn_in_window
         )
-        take_mask = np.concatenate(
-            (
-                np.zeros((1, self.burn_in_window), dtype=np.int64),
-                np.eye(self.burn_in_window),
-            ),
-            axis=0,
-        )[lengths]
-        np.cumsum(np.flip(take_mask, axis=1), axis=1, out=take_mask)
-
-        non_historic_take_mask = np.where(take_mask * non_historic_idxes)
-        non_historic_cyclic_idxes = cyclic_idxes[non_historic_take_mask]
-        historic_take_mask = np.where(take_mask * historic_idxes)
-        historic_cyclic_idxes = cyclic_idxes[historic_take_mask]
-
-        # Update for transitions not looking into historic buffer
-        historic_observations[non_historic_take_mask] = self.observations[
-            non_historic_cyclic_idxes
-        ]
-        historic_hidden_states[non_historic_take_mask] = self.hidden_states[
-            non_historic_cyclic_idxes
-        ]
+        is_taken = window <= lengths[:, None]
 
-        # Update for transitions looking into historic buffer
-        if self._count > self._buffer_size:
-            historic_observations[historic_take_mask] = self.observations[
-                historic_cyclic_idxes
-            ]
-            historic_hidden_states[historic_take_mask] = self.hidden_states[
-                historic_cyclic_idxes
+        buffer_idxes = np.concatenate((cyclic_idxes, idxes[:, None]), axis=1)
+        historic_idxes = np.concatenate(
+            (historic_ring_idxes, np.zeros((len(idxes), 1), dtype=np.int64)), axis=1
+        )
+        from_buffer = np.concatenate(
+            (is_taken & ~is_historic, np.ones((len(idxes), 1), dtype=bool)), axis=1
+        )
+        from_historic = np.concatenate(
+            (is_taken & is_historic, np.zeros((len(idxes), 1), dtype=bool)), axis=1
+        )
+        lengths += 1
+
+        # NOTE: Bad naming but padding first means non-zero entries in the beginning, then pad with zero afterwards
+        if self.padding_first:
+            window_idxes = (np.arange(self.burn_in_window + 1) - lengths[:, None]) % (
+                self.burn_in_window + 1
+            )
+            buffer_idxes, historic_idxes, from_buffer, from_historic = [
+                np.take_along_axis(x, window_idxes, axis=1)
+                for x in (buffer_idxes, historic_idxes, from_buffer, from_historic)
             ]
 
-        return historic_observations, historic_hidden_states, lengths
+        return buffer_idxes, historic_idxes, from_buffer, from_historic, lengths
+
+    def _gather_burn_in_window(
+        self,
+        buffer: chex.Array,
+        historic_buffer: chex.Array,
+        buffer_idxes: chex.Array,
+        historic_idxes: chex.Array,
+        from_buffer: chex.Array,
+        from_historic: chex.Array,
+    ) -> chex.Array:
+        """
+        Gathers the burn-in windows from the buffer and the historic buffer.
+
+        :param buffer: the buffer
+        :param historic_buffer: the historic buffer
+        :param buffer_idxes: the buffer indices
+        :param historic_idxes: the historic buffer indices
+        :param from_buffer: whether each entry is taken from the buffer
+        :param from_historic: whether each entry is taken from the historic buffer
+        :type buffer: chex.Array
+        :type historic_buffer: chex.Array
+        :type buffer_idxes: chex.Array
+        :type historic_idxes: chex.Array
+        :type from_buffer: chex.Array
+        :type from_historic: chex.Array
+        :return: the burn-in windows, in the buffer's data type
+        :rtype: chex.Array
+
+        """
+        windows = np.zeros((*buffer_idxes.shape, *buffer.shape[1:]), dtype=buffer.dtype)
+        windows[from_buffer] = buffer[buffer_idxes[from_buffer]]
+        windows[from_historic] = historic_buffer[historic_idxes[from_historic]]
+        return windows
 
     def get_transitions(self, idxes: chex.Array) -> Tuple[
         chex.Array,
@@ -399,8 +567,6 @@ class AbstractNumPyBuffer(ReplayBuffer):
                       chex.Array, chex.Array, chex.Array, dict, chex.Array]
 
         """
-        obss = self.observations[idxes]
-        h_states = self.hidden_states[idxes]
         acts = self.actions[idxes]
         rews = self.rewards[idxes]
         dones = self.dones[idxes]
@@ -410,36 +576,34 @@ class AbstractNumPyBuffer(ReplayBuffer):
             info_name: info_value[idxes] for info_name, info_value in self.infos.items()
         }
 
-        lengths = np.ones(len(obss), dtype=np.int64)
+        lengths = np.ones(len(idxes), dtype=np.int64)
         if self.burn_in_window:
-            historic_obss, historic_h_states, lengths = self._get_burn_in_window(idxes)
-            obss = np.concatenate((historic_obss, obss[:, None, ...]), axis=1)
-            h_states = np.concatenate(
-                (historic_h_states, h_states[:, None, ...]), axis=1
+            (
+                buffer_idxes,
+                historic_idxes,
+                from_buffer,
+                from_historic,
+                lengths,
+            ) = self._get_burn_in_idxes(idxes)
+            obss = self._gather_burn_in_window(
+                self.observations,
+                self.historic_observations,
+                buffer_idxes,
+                historic_idxes,
+                from_buffer,
+                from_historic,
+            )
+            h_states = self._gather_burn_in_window(
+                self.hidden_states,
+                self.historic_hidden_states,
+                buffer_idxes,
+                historic_idxes,
+                from_buffer,
+                from_historic,
             )
-            lengths += 1
-
-            # NOTE: Bad naming but padding first means non-zero entries in the beginning, then pad with zero afterwards
-            if self.padding_first:
-                obss = np.array(
-                    [
-                        np.roll(
-                            history, shift=(length % (self.burn_in_window + 1)), axis=0
-                        )
-                        for history, length in zip(obss, lengths)
-                    ]
-                )
-                h_states = np.array(
-                    [
-                        np.roll(
-                            history, shift=(length % (self.burn_in_window + 1)), axis=0
-                        )
-                        for history, length in zip(h_states, lengths)
-                    ]
-                )
         else:
-            obss = obss[:, None, ...]
-            h_states = h_states[:, None, ...]
+            obss = self.observations[idxes][:, None, ...]
+            h_states = self.hidden_states[idxes][:, None, ...]
 
         return (
             obss,
@@ -537,9 +701,14 @@ class AbstractNumPyBuffer(ReplayBuffer):
             c.ACT_DIM: self.act_dim,
         }
         if self.burn_in_window > 0:
-            buffer_dict[c.BURN_IN_WINDOW][c.OBSERVATIONS] = self.historic_observations
-            buffer_dict[c.BURN_IN_WINDOW][c.HIDDEN_STATES] = self.historic_hidden_states
-            buffer_dict[c.BURN_IN_WINDOW][c.DONES] = self.historic_dones
+            (
+                historic_observations,
+                historic_hidden_states,
+                historic_dones,
+            ) = self._get_historic()
+            buffer_dict[c.BURN_IN_WINDOW][c.OBSERVATIONS] = historic_observations
+            buffer_dict[c.BURN_IN_WINDOW][c.HIDDEN_STATES] = historic_hidden_states
+            buffer_dict[c.BURN_IN_WINDOW][c.DONES] = historic_dones
 
         return buffer_dict
 
@@ -579,16 +748,18 @@ class AbstractNumPyBuffer(ReplayBuffer):
                     c.HIDDEN_STATES
                 ]
                 self.historic_dones = buffer_dict[c.BURN_IN_WINDOW][c.DONES]
+                self._historic_pointer = 0
 
-    def save(self, save_path: str, end_with_done: bool = True, **kwargs):
+    def _get_save_pointer_and_count(
+        self, end_with_done: bool
+    ) -> Optional[Tuple[int, int]]:
         """
-        Saves the replay buffer.
+        Gets the pointer and the count of the buffer to be saved.
 
-        :param save_path: the file name of the replay buffer
         :param end_with_done: whether or not to keep unfinished episodes
-        :param **kwargs:
-        :type save_path: str
-        :type end_with_done: bool:  (Default value = True)
+        :type end_with_done: bool
+        :return: the pointer and the count, or None if there is nothing to save
+        :rtype: Optional[Tuple[int, int]]
 
         """
         pointer = self._pointer
@@ -598,7 +769,7 @@ class AbstractNumPyBuffer(ReplayBuffer):
             done_idxes = np.where(self.dones == 1)[0]
             if len(done_idxes) == 0:
                 print("No completed episodes. Nothing to save.")
-                return
+                return None
 
             done_before_pointer = done_idxes[done_idxes < self._pointer]
             if len(done_before_pointer) > 0:
@@ -611,6 +782,23 @@ class AbstractNumPyBuffer(ReplayBuffer):
                     + (self._buffer_size * int(self._count <= self._buffer_size))
                     - pointer
                 )
+        return pointer, count
+
+    def save(self, save_path: str, end_with_done: bool = True, **kwargs):
+        """
+        Saves the replay buffer.
+
+        :param save_path: the file name of the replay buffer
+        :param end_with_done: whether or not to keep unfinished episodes
+        :param **kwargs:
+        :type save_path: str
+        :type end_with_done: bool:  (Default value = True)
+
+        """
+        pointer_and_count = self._get_save_pointer_and_count(end_with_done)
+        if pointer_and_count is None:
+            return
+        pointer, count = pointer_and_count
 
         buffer_dict = self.get_buffer_dict()
         buffer_dict[c.POINTER] = pointer
@@ -875,6 +1063,72 @@ class MemoryEfficientNumPyBuffer(TransitionNumPyBuffer):
             info=info,
         )
 
+    def push_batch(
+        self,
+        obss: chex.Array,
+        h_states: chex.Array,
+        acts: chex.Array,
+        rews: chex.Array,
+        terminateds: chex.Array,
+        truncateds: chex.Array,
+        infos: Dict[str, chex.Array],
+        next_obs: chex.Array,
+        next_h_state: chex.Array,
+        **kwargs,
+    ) -> bool:
+        """
+        Push a batch of data into buffer.
+        The batch is assumed to be consecutive transitions, as in ``push``.
+
+        :param obss: the observations
+        :param h_states: the hidden states
+        :param acts: the actions taken
+        :param rews: the rewards
+        :param terminateds: end of the episodes
+        :param truncateds: early truncations due to time limit
+        :param infos: environment information
+        :param next_obs: the next observations
+        :param next_h_state: the next hidden states
+        :param **kwargs:
+        :type obss: chex.Array
+        :type h_states: chex.Array
+        :type acts: chex.Array
+        :type rews: chex.Array
+        :type terminateds: chex.Array
+        :type truncateds: chex.Array
+        :type infos: Dict[str, chex.Array]
+        :type next_obs: chex.Array
+        :type next_h_state: chex.Array
+        :return: whether the samples are pushed successfully
+        :rtype: bool
+
+        """
+        if len(obss) > self._max_push_batch_size():
+            return super().push_batch(
+                obss,
+                h_states,
+                acts,
+                rews,
+                terminateds,
+                truncateds,
+                infos,
+                next_obs=next_obs,
+                next_h_state=next_h_state,
+            )
+
+        self.next_observation = next_obs[-1]
+        self.next_hidden_state = next_h_state[-1]
+
+        return super().push_batch(
+            obss,
+            h_states,
+            acts,
+            rews,
+            terminateds,
+            truncateds,
+            infos,
+        )
+
     def get_next(self, next_idxes: chex.Array) -> Tuple[chex.Array, chex.Array]:
         """
         Gets the next observation and the next hidden state.
@@ -948,7 +1202,7 @@ class NextStateNumPyBuffer(TransitionNumPyBuffer):
     ):
         self.next_observations = np.zeros(shape=(buffer_size, *obs_dim), dtype=dtype)
         self.next_hidden_states = np.zeros(
-            shape=(buffer_size, *h_state_dim), dtype=np.float32
+            shape=(buffer_size, *h_state_dim), dtype=dtype
         )
         super().__init__(
             buffer_size=buffer_size,
@@ -1027,6 +1281,7 @@ class NextStateNumPyBuffer(TransitionNumPyBuffer):
             )
 
         self._checkpoint_idxes[transitions_to_save] = 1
+        self._num_unsaved -= len(transitions_to_save)
         self._checkpoint_count += 1
 
     def push(
@@ -1081,6 +1336,72 @@ class NextStateNumPyBuffer(TransitionNumPyBuffer):
             info=info,
         )
 
+    def push_batch(
+        self,
+        obss: chex.Array,
+        h_states: chex.Array,
+        acts: chex.Array,
+        rews: chex.Array,
+        terminateds: chex.Array,
+        truncateds: chex.Array,
+        infos: Dict[str, chex.Array],
+        next_obs: chex.Array,
+        next_h_state: chex.Array,
+        **kwargs,
+    ) -> bool:
+        """
+        Push a batch of data into buffer.
+
+        :param obss: the observations
+        :param h_states: the hidden states
+        :param acts: the actions taken
+        :param rews: the rewards
+        :param terminateds: end of the episodes
+        :param truncateds: early truncations due to time limit
+        :param infos: environment information
+        :param next_obs: the next observations
+        :param next_h_state: the next hidden states
+        :param **kwargs:
+        :type obss: chex.Array
+        :type h_states: chex.Array
+        :type acts: chex.Array
+        :type rews: chex.Array
+        :type terminateds: chex.Array
+        :type truncateds: chex.Array
+        :type infos: Dict[str, chex.Array]
+        :type next_obs: chex.Array
+        :type next_h_state: chex.Array
+        :return: whether the samples are pushed successfully
+        :rtype: bool
+
+        """
+        if len(obss) > self._max_push_batch_size():
+            return super().push_batch(
+                obss,
+                h_states,
+                acts,
+                rews,
+                terminateds,
+                truncateds,
+                infos,
+                next_obs=next_obs,
+                next_h_state=next_h_state,
+            )
+
+        idxes = (self._pointer + np.arange(len(obss))) % self._buffer_size
+        self.next_observations[idxes] = next_obs
+        self.next_hidden_states[idxes] = next_h_state
+
+        return super().push_batch(
+            obss,
+            h_states,
+            acts,
+            rews,
+            terminateds,
+            truncateds,
+            infos,
+        )
+
     def get_next(self, next_idxes: chex.Array) -> Tuple[chex.Array, chex.Array]:
         """
         Gets the next observation and the next hidden state.
@@ -1122,7 +1443,11 @@ class NextStateNumPyBuffer(TransitionNumPyBuffer):
 
 
 class TrajectoryNumPyBuffer(AbstractNumPyBuffer):
-    """This buffer stores one trajectory as a sample."""
+    """
+    This buffer stores one trajectory as a sample.
+    The episodes are indexed by ring buffers of their start indices, lengths,
+    last observations, and last hidden states, from oldest to newest.
+    """
 
     def __init__(
         self,
@@ -1141,10 +1466,6 @@ class TrajectoryNumPyBuffer(AbstractNumPyBuffer):
         load_buffer: str = None,
     ):
         self._curr_episode_length = 0
-        self._episode_lengths = [0]
-        self._episode_start_idxes = [0]
-        self._last_observations = [np.zeros(obs_dim)]
-        self._last_h_states = [np.zeros(h_state_dim)]
         super().__init__(
             buffer_size=buffer_size,
             obs_dim=obs_dim,
@@ -1160,6 +1481,162 @@ class TrajectoryNumPyBuffer(AbstractNumPyBuffer):
             dtype=dtype,
             load_buffer=load_buffer,
         )
+        if load_buffer is None:
+            self._set_episode_index(
+                np.zeros(1, dtype=np.int64),
+                np.zeros(1, dtype=np.int64),
+                np.zeros((1, *self.observations.shape[1:]), dtype=self._dtype),
+                np.zeros((1, *self.hidden_states.shape[1:]), dtype=self._dtype),
+            )
+
+    @property
+    def num_episodes(self) -> int:
+        """The number of episodes, including the ongoing one."""
+        return self._num_episodes
+
+    def _set_episode_index(
+        self,
+        episode_start_idxes: chex.Array,
+        episode_lengths: chex.Array,
+        last_observations: chex.Array,
+        last_h_states: chex.Array,
+        capacity: Optional[int] = None,
+    ):
+        """
+        Sets the episode index, from oldest to newest episode.
+
+        :param episode_start_idxes: the start index of each episode
+        :param episode_lengths: the length of each episode
+        :param last_observations: the last observation of each episode
+        :param last_h_states: the last hidden state of each episode
+        :param capacity: the number of episodes the ring buffers can hold
+        :type episode_start_idxes: chex.Array
+        :type episode_lengths: chex.Array
+        :type last_observations: chex.Array
+        :type last_h_states: chex.Array
+        :type capacity: Optional[int]:  (Default value = None)
+
+        """
+        num_episodes = len(episode_lengths)
+        if capacity is None:
+            capacity = min(c.DEFAULT_EPISODE_CAPACITY, self._buffer_size + 1)
+        capacity = max(capacity, num_episodes)
+
+        self._episode_start_idxes = np.zeros(capacity, dtype=np.int64)
+        self._episode_lengths = np.zeros(capacity, dtype=np.int64)
+        self._last_observations = np.zeros(
+            (capacity, *last_observations.shape[1:]), dtype=last_observations.dtype
+        )
+        self._last_h_states = np.zeros(
+            (capacity, *last_h_states.shape[1:]), dtype=last_h_states.dtype
+        )
+        self._episode_start_idxes[:num_episodes] = episode_start_idxes
+        self._episode_lengths[:num_episodes] = episode_lengths
+        self._last_observations[:num_episodes] = last_observations
+        self._last_h_states[:num_episodes] = last_h_states
+        self._episode_head = 0
+        self._num_episodes = num_episodes
+
+    def _get_episode_slots(self, episode_idxes: chex.Array) -> chex.Array:
+        """
+        Gets the ring buffer slots of the episodes, where index 0 is the oldest episode.
+
+        :param episode_idxes: the episode indices
+        :type episode_idxes: chex.Array
+        :return: the ring buffer slots
+        :rtype: chex.Array
+
+        """
+        return (self._episode_head + episode_idxes) % len(self._episode_lengths)
+
+    def _get_episode_index(
+        self,
+    ) -> Tuple[chex.Array, chex.Array, chex.Array, chex.Array]:
+        """
+        Gets the episode index, from oldest to newest episode.
+
+        :return: the start indices, the lengths, the last observations,
+                 and the last hidden states of the episodes
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array, chex.Array]
+
+        """
+        slots = self._get_episode_slots(np.arange(self._num_episodes))
+        return (
+            self._episode_start_idxes[slots],
+            self._episode_lengths[slots],
+            self._last_observations[slots],
+            self._last_h_states[slots],
+        )
+
+    def _append_episodes(self, start_idxes: chex.Array):
+        """
+        Appends empty episodes, growing the ring buffers if needed.
+
+        :param start_idxes: the start indices of the new episodes
+        :type start_idxes: chex.Array
+
+        """
+        num_new_episodes = len(start_idxes)
+        if self._num_episodes + num_new_episodes > len(self._episode_lengths):
+            self._set_episode_index(
+                *self._get_episode_index(),
+                capacity=2 * (self._num_episodes + num_new_episodes),
+            )
+
+        slots = self._get_episode_slots(
+            self._num_episodes + np.arange(num_new_episodes)
+        )
+        self._episode_start_idxes[slots] = start_idxes
+        self._episode_lengths[slots] = 0
+        self._last_observations[slots] = 0
+        self._last_h_states[slots] = 0
+        self._num_episodes += num_new_episodes
+
+    def _evict_samples(self, num_evicted: int):
+        """
+        Removes the oldest samples from the episode index.
+        Episodes without any samples left are dropped.
+
+        :param num_evicted: the number of samples to remove
+        :type num_evicted: int
+
+        """
+        if num_evicted <= 0:
+            return
+
+        # Only the oldest few episodes can be affected
+        num_candidates = min(num_evicted + 1, self._num_episodes)
+        slots = self._get_episode_slots(np.arange(num_candidates))
+        cum_lengths = np.cumsum(self._episode_lengths[slots])
+        num_dropped = min(
+            int(np.searchsorted(cum_lengths, num_evicted, side="right")),
+            self._num_episodes - 1,
+        )
+        num_remaining = num_evicted - (
+            cum_lengths[num_dropped - 1] if num_dropped else 0
+        )
+
+        self._episode_head = int(self._get_episode_slots(num_dropped))
+        self._num_episodes -= num_dropped
+        self._episode_lengths[self._episode_head] -= num_remaining
+        self._episode_start_idxes[self._episode_head] = (
+            self._episode_start_idxes[self._episode_head] + num_remaining
+        ) % self._buffer_size
+
+    def clear(self, **kwargs):
+        """
+        Reset the buffer to be empty.
+
+        :param **kwargs:
+
+        """
+        super().clear(**kwargs)
+        self._set_episode_index(
+            np.zeros(1, dtype=np.int64),
+            np.zeros(1, dtype=np.int64),
+            np.zeros((1, *self._last_observations.shape[1:]), dtype=self._dtype),
+            np.zeros((1, *self._last_h_states.shape[1:]), dtype=self._dtype),
+        )
 
     def push(
         self,
@@ -1200,22 +1677,14 @@ class TrajectoryNumPyBuffer(AbstractNumPyBuffer):
         :rtype: bool
 
         """
-        self._episode_lengths[-1] += 1
-        self._last_observations[-1] = next_obs
-        self._last_h_states[-1] = next_h_state
+        last_slot = self._get_episode_slots(self._num_episodes - 1)
+        self._episode_lengths[last_slot] += 1
+        self._last_observations[last_slot] = next_obs
+        self._last_h_states[last_slot] = next_h_state
         if self.is_full:
-            self._episode_lengths[0] -= 1
-            self._episode_start_idxes[0] += 1
-            if self._episode_lengths[0] <= 0:
-                self._episode_lengths.pop(0)
-                self._episode_start_idxes.pop(0)
-                self._last_observations.pop(0)
-                self._last_h_states.pop(0)
+            self._evict_samples(1)
         if terminated or truncated:
-            self._episode_lengths.append(0)
-            self._episode_start_idxes.append(self._pointer + 1)
-            self._last_observations.append(np.zeros(obs.shape))
-            self._last_h_states.append(np.zeros(h_state.shape))
+            self._append_episodes(np.array([(self._pointer + 1) % self._buffer_size]))
 
         return super().push(
             obs=obs,
@@ -1227,6 +1696,91 @@ class TrajectoryNumPyBuffer(AbstractNumPyBuffer):
             info=info,
         )
 
+    def push_batch(
+        self,
+        obss: chex.Array,
+        h_states: chex.Array,
+        acts: chex.Array,
+        rews: chex.Array,
+        terminateds: chex.Array,
+        truncateds: chex.Array,
+        infos: Dict[str, chex.Array],
+        next_obs: chex.Array,
+        next_h_state: chex.Array,
+        **kwargs,
+    ) -> bool:
+        """
+        Push a batch of data into buffer.
+        The batch is assumed to be consecutive transitions, as in ``push``.
+
+        :param obss: the observations
+        :param h_states: the hidden states
+        :param acts: the actions taken
+        :param rews: the rewards
+        :param terminateds: end of the episodes
+        :param truncateds: early truncations due to time limit
+        :param infos: environment information
+        :param next_obs: the next observations
+        :param next_h_state: the next hidden states
+        :param **kwargs:
+        :type obss: chex.Array
+        :type h_states: chex.Array
+        :type acts: chex.Array
+        :type rews: chex.Array
+        :type terminateds: chex.Array
+        :type truncateds: chex.Array
+        :type infos: Dict[str, chex.Array]
+        :type next_obs: chex.Array
+        :type next_h_state: chex.Array
+        :return: whether the samples are pushed successfully
+        :rtype: bool
+
+        """
+        num_samples = len(obss)
+        if num_samples > self._max_push_batch_size():
+            return super().push_batch(
+                obss,
+                h_states,
+                acts,
+                rews,
+                terminateds,
+                truncateds,
+                infos,
+                next_obs=next_obs,
+                next_h_state=next_h_state,
+            )
+
+        # Each done closes the current episode, the samples after it go into a new one
+        done_idxes = np.where(np.logical_or(terminateds, truncateds).reshape(-1))[0]
+        segment_ends = np.append(done_idxes, num_samples - 1)
+        segment_lengths = np.diff(segment_ends, prepend=-1)
+        self._append_episodes((self._pointer + done_idxes + 1) % self._buffer_size)
+        segment_slots = self._get_episode_slots(
+            self._num_episodes - len(segment_ends) + np.arange(len(segment_ends))
+        )
+
+        self._episode_lengths[segment_slots] += segment_lengths
+        nonempty = segment_lengths > 0
+        self._last_observations[segment_slots[nonempty]] = next_obs[
+            segment_ends[nonempty]
+        ]
+        self._last_h_states[segment_slots[nonempty]] = next_h_state[
+            segment_ends[nonempty]
+        ]
+        self._evict_samples(
+            min(max(self._count + num_samples - self._buffer_size, 0), num_samples)
+        )
+
+        return super().push_batch(
+            obss,
+            h_states,
+            acts,
+            rews,
+            terminateds,
+            truncateds,
+            infos,
+        )
+
     def sample(
         self,
         batch_size: int,
@@ -1267,27 +1821,29 @@ class TrajectoryNumPyBuffer(AbstractNumPyBuffer):
         assert (
             horizon_length >= 2
         ), f"horizon_length must be at least length of 2. Got: {horizon_length}"
-        if not len(self._episode_lengths):
+        if not self._num_episodes:
             raise NoSampleError
 
         if idxes is None:
+            first_slot, last_slot = self._get_episode_slots(
+                np.array([0, self._num_episodes - 1])
+            )
             episode_idxes = self.rng.randint(
-                int(self._episode_lengths[0] <= 1),
-                len(self._episode_lengths) - int(self._episode_lengths[-1] <= 1),
+                int(self._episode_lengths[first_slot] <= 1),
+                self._num_episodes - int(self._episode_lengths[last_slot] <= 1),
                 size=batch_size,
             )
         else:
             episode_idxes = idxes
 
         # Get subtrajectory within each episode
-        episode_lengths = np.array(self._episode_lengths)
-        episode_start_idxes = np.array(self._episode_start_idxes)
-        batch_episode_lengths = episode_lengths[episode_idxes]
+        episode_slots = self._get_episode_slots(episode_idxes)
+        batch_episode_lengths = self._episode_lengths[episode_slots]
 
         sample_lengths = np.tile(np.arange(horizon_length), (batch_size, 1))
         subtraj_start_idxes = self.rng.randint(batch_episode_lengths - 1)
         sample_idxes = (
-            (subtraj_start_idxes + episode_start_idxes[episode_idxes])[:, None]
+            (subtraj_start_idxes + self._episode_start_idxes[episode_slots])[:, None]
             + sample_lengths
         ) % self._buffer_size
         (
@@ -1316,11 +1872,10 @@ class TrajectoryNumPyBuffer(AbstractNumPyBuffer):
 
         # If the episode ends too early, then the last observation should be in the trajectory
         # at index length_i of the trajectory.
-        for sample_i, (ep_i, length_i) in enumerate(zip(episode_idxes, traj_lengths)):
-            if length_i == horizon_length:
-                continue
-            obss[sample_i * horizon_length + length_i] = self._last_observations[ep_i]
-            h_states[sample_i * horizon_length + length_i] = self._last_h_states[ep_i]
+        ended_early = np.where(traj_lengths < horizon_length)[0]
+        last_idxes = ended_early * horizon_length + traj_lengths[ended_early]
+        obss[last_idxes] = self._last_observations[episode_slots[ended_early]][:, None]
+        h_states[last_idxes] = self._last_h_states[episode_slots[ended_early]][:, None]
 
         return (
             obss,
@@ -1345,16 +1900,23 @@ class TrajectoryNumPyBuffer(AbstractNumPyBuffer):
 
         """
         buffer_dict = super().get_buffer_dict()
-        buffer_dict[c.LAST_OBSERVATIONS] = self._last_observations
-        buffer_dict[c.LAST_HIDDEN_STATES] = self._last_h_states
-        buffer_dict[c.EPISODE_LENGTHS] = self._episode_lengths
-        buffer_dict[c.EPISODE_START_IDXES] = self._episode_start_idxes
+        (
+            episode_start_idxes,
+            episode_lengths,
+            last_observations,
+            last_h_states,
+        ) = self._get_episode_index()
+        buffer_dict[c.LAST_OBSERVATIONS] = last_observations
+        buffer_dict[c.LAST_HIDDEN_STATES] = last_h_states
+        buffer_dict[c.EPISODE_LENGTHS] = episode_lengths
+        buffer_dict[c.EPISODE_START_IDXES] = episode_start_idxes
         buffer_dict[c.CURR_EPISODE_LENGTH] = self._curr_episode_length
         return buffer_dict
 
     def load_from_buffer_dict(self, buffer_dict: Dict[str, Any]):
         """
         Load from a buffer dictionary.
+        The episode index can be either arrays or lists, from oldest to newest episode.
 
         :param buffer_dict: buffer dictionary
         :type buffer_dict: Dict[str, Any]
@@ -1362,7 +1924,10 @@ class TrajectoryNumPyBuffer(AbstractNumPyBuffer):
         """
         super().load_from_buffer_dict(buffer_dict)
         self._curr_episode_length = buffer_dict[c.CURR_EPISODE_LENGTH]
-        self._last_observations = buffer_dict[c.LAST_OBSERVATIONS]
-        self._last_h_states = buffer_dict[c.LAST_HIDDEN_STATES]
-        self._episode_lengths = buffer_dict[c.EPISODE_LENGTHS]
-        self._episode_start_idxes = buffer_dict[c.EPISODE_START_IDXES]
+        self._set_episode_index(
+            np.asarray(buffer_dict[c.EPISODE_START_IDXES], dtype=np.int64)
+            % self._buffer_size,
+            np.asarray(buffer_dict[c.EPISODE_LENGTHS], dtype=np.int64),
+            np.asarray(buffer_dict[c.LAST_OBSERVATIONS], dtype=self._dtype),
+            np.asarray(buffer_dict[c.LAST_HIDDEN_STATES], dtype=self._dtype),
+        )
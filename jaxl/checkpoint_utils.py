@@ -0,0 +1,357 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import dill
+import importlib
+import jax
+import json
+import numpy as np
+import os
+import shutil
+
+
+"""
+Structured checkpoint format.
+A checkpoint is a directory with a JSON manifest describing the PyTree structure
+and one file per leaf. Arrays are stored as ``.npy`` files such that they can be
+memory-mapped, Python scalars and strings are stored within the manifest,
+and any other leaves (e.g. optimizer internals) fall back to dill.
+Subtrees can be loaded without reading the rest of the checkpoint.
+XXX: Legacy dill checkpoints are still supported when loading.
+"""
+
+CHECKPOINT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+TMP_SUFFIX = ".tmp"
+
+NODE_ARRAY = "array"
+NODE_DICT = "dict"
+NODE_LIST = "list"
+NODE_NAMEDTUPLE = "namedtuple"
+NODE_PICKLE = "pickle"
+NODE_TUPLE = "tuple"
+NODE_VALUE = "value"
+
+
+def _flatten_node(node: Any, save_path: str, leaf_files: List[str]) -> Dict[str, Any]:
+    """
+    Writes the leaves of a node and returns its manifest entry.
+
+    :param node: the node of the PyTree
+    :param save_path: the checkpoint directory
+    :param leaf_files: the leaf files written so far
+    :type node: Any
+    :type save_path: str
+    :type leaf_files: List[str]
+    :return: the manifest entry of the node
+    :rtype: Dict[str, Any]
+
+    """
+
+    def write_leaf(extension: str, write):
+        file_name = f"{len(leaf_files)}.{extension}"
+        leaf_files.append(file_name)
+        with open(os.path.join(save_path, file_name), "wb") as f:
+            write(f)
+        return file_name
+
+    if isinstance(node, (np.ndarray, np.generic, jax.Array)):
+        node = np.asarray(node)
+        if node.dtype != object:
+            return {
+                "type": NODE_ARRAY,
+                "file": write_leaf("npy", lambda f: np.save(f, node)),
+                "shape": list(node.shape),
+                "dtype": node.dtype.str,
+            }
+    elif node is None or isinstance(node, (bool, int, float, str)):
+        return {"type": NODE_VALUE, "value": node}
+    elif type(node) is dict and all(isinstance(key, (str, int)) for key in node):
+        return {
+            "type": NODE_DICT,
+            "keys": list(node.keys()),
+            "children": [
+                _flatten_node(child, save_path, leaf_files) for child in node.values()
+            ],
+        }
+    elif isinstance(node, tuple) and hasattr(node, "_fields"):
+        return {
+            "type": NODE_NAMEDTUPLE,
+            "class": [type(node).__module__, type(node).__qualname__],
+            "keys": list(node._fields),
+            "children": [_flatten_node(child, save_path, leaf_files) for child in node],
+        }
+    elif type(node) in (list, tuple):
+        return {
+            "type": NODE_LIST if type(node) is list else NODE_TUPLE,
+            "children": [_flatten_node(child, save_path, leaf_files) for child in node],
+        }
+
+    return {
+        "type": NODE_PICKLE,
+        "file": write_leaf("dill", lambda f: dill.dump(node, f)),
+    }
+
+
+def _unflatten_node(
+    entry: Dict[str, Any], load_path: str, mmap_mode: Optional[str]
+) -> Any:
+    """
+    Reads a node from its manifest entry.
+
+    :param entry: the manifest entry of the node
+    :param load_path: the checkpoint directory
+    :param mmap_mode: the memory-map mode for the arrays
+    :type entry: Dict[str, Any]
+    :type load_path: str
+    :type mmap_mode: Optional[str]
+    :return: the node of the PyTree
+    :rtype: Any
+
+    """
+    node_type = entry["type"]
+    if node_type == NODE_ARRAY:
+        # Zero-dimensional arrays cannot be memory-mapped
+        return np.load(
+            os.path.join(load_path, entry["file"]),
+            mmap_mode=mmap_mode if len(entry["shape"]) else None,
+        )
+    elif node_type == NODE_VALUE:
+        return entry["value"]
+    elif node_type == NODE_PICKLE:
+        with open(os.path.join(load_path, entry["file"]), "rb") as f:
+            return dill.load(f)
+
+    children = [
+        _unflatten_node(child, load_path, mmap_mode) for child in entry["children"]
+    ]
+    if node_type == NODE_DICT:
+        return dict(zip(entry["keys"], children))
+    elif node_type == NODE_NAMEDTUPLE:
+        module_name, class_name = entry["class"]
+        node_class = importlib.import_module(module_name)
+        for attr in class_name.split("."):
+            node_class = getattr(node_class, attr)
+        return node_class(*children)
+    elif node_type == NODE_LIST:
+        return children
+    elif node_type == NODE_TUPLE:
+        return tuple(children)
+    raise NotImplementedError
+
+
+def _has_child(node: Any, key: str, is_entry: bool) -> bool:
+    """
+    Checks whether a node (or its manifest entry) has a child by its path component.
+
+    :param node: the node or the manifest entry
+    :param key: the path component
+    :param is_entry: whether or not the node is a manifest entry
+    :type node: Any
+    :type key: str
+    :type is_entry: bool
+    :return: whether or not the child exists
+    :rtype: bool
+
+    """
+    if is_entry:
+        if "keys" in node:
+            return key in [str(child_key) for child_key in node["keys"]]
+        elif "children" in node:
+            return key.isdigit() and int(key) < len(node["children"])
+        return False
+
+    if isinstance(node, dict):
+        return key in [str(child_key) for child_key in node]
+    elif hasattr(node, "_fields"):
+        return key in node._fields
+    elif isinstance(node, (list, tuple)):
+        return key.isdigit() and int(key) < len(node)
+    return False
+
+
+def _get_child(node: Any, key: str, is_entry: bool) -> Any:
+    """
+    Gets the child of a node (or its manifest entry) by its path component.
+
+    :param node: the node or the manifest entry
+    :param key: the path component
+    :param is_entry: whether or not the node is a manifest entry
+    :type node: Any
+    :type key: str
+    :type is_entry: bool
+    :return: the child
+    :rtype: Any
+
+    """
+    if is_entry:
+        if "keys" in node:
+            child_i = [str(child_key) for child_key in node["keys"]].index(key)
+        else:
+            child_i = int(key)
+        return node["children"][child_i]
+
+    if isinstance(node, dict):
+        return node[{str(child_key): child_key for child_key in node}[key]]
+    elif hasattr(node, "_fields"):
+        return getattr(node, key)
+    return node[int(key)]
+
+
+def _prune(
+    node: Any,
+    paths: Sequence[Sequence[str]],
+    is_entry: bool,
+    load_subtree: Optional[Callable[[Any], Any]] = None,
+) -> Any:
+    """
+    Keeps only the specified subtrees while preserving the nesting of the dictionaries.
+    Subtrees that do not exist are omitted.
+
+    :param node: the node or the manifest entry
+    :param paths: the paths of the subtrees relative to the node
+    :param is_entry: whether or not the node is a manifest entry
+    :param load_subtree: the function that loads a kept subtree, if any
+    :type node: Any
+    :type paths: Sequence[Sequence[str]]
+    :type is_entry: bool
+    :type load_subtree: Optional[Callable[[Any], Any]]:  (Default value = None)
+    :return: the pruned tree, where the subtrees are kept as is unless loaded
+    :rtype: Any
+
+    """
+    if any(len(path) == 0 for path in paths):
+        return node if load_subtree is None else load_subtree(node)
+
+    subpaths = {}
+    for key, *path in paths:
+        if _has_child(node, key, is_entry):
+            subpaths.setdefault(key, []).append(path)
+    return {
+        key: _prune(
+            _get_child(node, key, is_entry), child_paths, is_entry, load_subtree
+        )
+        for key, child_paths in subpaths.items()
+    }
+
+
+def is_checkpoint(path: str) -> bool:
+    """
+    Checks whether a path is a complete checkpoint.
+
+    :param path: the path
+    :type path: str
+    :return: whether or not the path is a complete checkpoint
+    :rtype: bool
+
+    """
+    if path.endswith(TMP_SUFFIX):
+        return False
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE)) or path.endswith(".dill")
+
+
+def list_checkpoints(checkpoint_dir: str) -> List[str]:
+    """
+    Lists the complete checkpoints in a directory in order.
+
+    :param checkpoint_dir: the directory containing the checkpoints
+    :type checkpoint_dir: str
+    :return: the names of the checkpoints
+    :rtype: List[str]
+
+    """
+    return sorted(
+        checkpoint
+        for checkpoint in os.listdir(checkpoint_dir)
+        if is_checkpoint(os.path.join(checkpoint_dir, checkpoint))
+    )
+
+
+def get_checkpoint_step(checkpoint: str) -> int:
+    """
+    Gets the step of a checkpoint from its name.
+
+    :param checkpoint: the name of the checkpoint
+    :type checkpoint: str
+    :return: the step of the checkpoint
+    :rtype: int
+
+    """
+    return int(os.path.basename(checkpoint).split(".")[0])
+
+
+def save_checkpoint(obj: Any, save_path: str):
+    """
+    Saves a PyTree in the structured checkpoint format.
+    The checkpoint is written to a temporary directory first and renamed once complete.
+
+    :param obj: the PyTree to save
+    :param save_path: the checkpoint directory
+    :type obj: Any
+    :type save_path: str
+
+    """
+    tmp_path = f"{save_path}{TMP_SUFFIX}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    manifest = {
+        "format_version": CHECKPOINT_FORMAT_VERSION,
+        "tree": _flatten_node(obj, tmp_path, []),
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(save_path, ignore_errors=True)
+    os.replace(tmp_path, save_path)
+
+
+def load_checkpoint(
+    load_path: str,
+    keys: Optional[Sequence[str]] = None,
+    mmap_mode: Optional[str] = None,
+) -> Any:
+    """
+    Loads a checkpoint.
+    If ``keys`` are provided, only the corresponding subtrees are read,
+    where each key is a path such as ``model_dict/model/policy``.
+    The returned dictionary keeps the same nesting as the full checkpoint,
+    and the subtrees that do not exist are omitted.
+
+    :param load_path: the checkpoint directory, or a legacy dill checkpoint
+    :param keys: the paths of the subtrees to load
+    :param mmap_mode: the memory-map mode for the arrays (e.g. "r")
+    :type load_path: str
+    :type keys: Optional[Sequence[str]]:  (Default value = None)
+    :type mmap_mode: Optional[str]:  (Default value = None)
+    :return: the checkpoint
+    :rtype: Any
+
+    """
+    paths = None
+    if keys is not None:
+        paths = [[key for key in path.split("/") if key] for path in keys]
+
+    if os.path.isfile(load_path):
+        with open(load_path, "rb") as f:
+            obj = dill.load(f)
+        if paths is None:
+            return obj
+        return _prune(obj, paths, False)
+
+    with open(os.path.join(load_path, MANIFEST_FILE), "r") as f:
+        manifest = json.load(f)
+    assert (
+        manifest["format_version"] <= CHECKPOINT_FORMAT_VERSION
+    ), "checkpoint format version {} is not supported (at most {})".format(
+        manifest["format_version"], CHECKPOINT_FORMAT_VERSION
+    )
+
+    tree = manifest["tree"]
+    if paths is not None:
+        return _prune(
+            tree,
+            paths,
+            True,
+            lambda entry: _unflatten_node(entry, load_path, mmap_mode),
+        )
+    return _unflatten_node(tree, load_path, mmap_mode)
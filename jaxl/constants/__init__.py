@@ -8,6 +8,13 @@ from jaxl.constants.optimizers import *
 
 CONST_CPU = "cpu"
 CONST_GPU = "gpu"
+
+CONST_FLOAT32 = "float32"
+CONST_FLOAT16 = "float16"
+CONST_BFLOAT16 = "bfloat16"
+VALID_COMPUTE_DTYPE = [CONST_FLOAT32, CONST_BFLOAT16]
+VALID_STORAGE_DTYPE = [CONST_FLOAT32, CONST_FLOAT16, CONST_BFLOAT16]
+
 CONST_BUFFER_CONFIG = "buffer_config"
 CONST_BUFFER_PATH = "buffer_path"
 CONST_CONFIG = "config"
@@ -25,11 +25,23 @@ CURR_EPISODE_LENGTH = "curr_episode_length"
 EPISODE_IDXES = "episode_idxes"
 EPISODE_LENGTHS = "episode_lengths"
 EPISODE_START_IDXES = "episode_start_idxes"
+DEFAULT_EPISODE_CAPACITY = 1024
+
+IMPORTANCE_WEIGHTS = "importance_weights"
+CONST_PRIORITIZED = "prioritized"
 
 CONST_DEFAULT = "default"
 CONST_MEMORY_EFFICIENT = "memory_efficient"
 CONST_TRAJECTORY = "trajectory"
-VALID_BUFFER = [CONST_DEFAULT, CONST_MEMORY_EFFICIENT, CONST_TRAJECTORY]
+CONST_JAX = "jax"
+CONST_MEMORY_MAPPED = "memory_mapped"
+VALID_BUFFER = [
+    CONST_DEFAULT,
+    CONST_MEMORY_EFFICIENT,
+    CONST_TRAJECTORY,
+    CONST_JAX,
+    CONST_MEMORY_MAPPED,
+]
 
 DEFAULT_LOAD_BUFFER_KWARGS = {
     "buffer_size": 0,
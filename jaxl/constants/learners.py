@@ -37,6 +37,10 @@ CONST_INPUT_RMS = "input_rms"
 CONST_OBS_RMS = "obs_rms"
 CONST_VALUE_RMS = "value_rms"
 
+CONST_NUM_ENVS = "num_envs"
+CONST_NUM_DEVICES = "num_devices"
+CONST_DATA_AXIS = "data"
+
 CONST_UPDATE_TIME = "update_time"
 CONST_ROLLOUT_TIME = "rollout_time"
 CONST_SAMPLING_TIME = "sampling_time"
@@ -55,3 +59,4 @@ CONST_CONTEXT_OUTPUT = "context_output"
 
 CONST_ACTOR_UPDATE_FREQUENCY = "actor_update_frequency"
 CONST_TARGET_UPDATE_FREQUENCY = "target_update_frequency"
+CONST_UTD_RATIO = "utd_ratio"
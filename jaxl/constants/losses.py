@@ -20,5 +20,6 @@ CONST_METRIC = "metric"
 CONST_LOSS = "loss"
 CONST_PREDICTIONS = "predictions"
 CONST_SUM = "sum"
+CONST_TD_ERROR = "td_error"
 
 VALID_REDUCTION = [CONST_SUM, CONST_MEAN]
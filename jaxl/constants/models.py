@@ -79,3 +79,14 @@ VALID_Q_ENCODING = [CONST_CONCATENATE_INPUTS_ENCODING, CONST_NO_ENCODING]
 
 CONST_SAME_PADDING = "SAME"
 CONST_BATCH_STATS = "batch_stats"
+
+CONST_CACHE = "cache"
+CONST_CACHED_KEY = "cached_key"
+CONST_CACHED_VALUE = "cached_value"
+CONST_NUM_CACHED_CONTEXTS = "num_cached_contexts"
+CONST_INPUT_EMBEDDINGS = "input_embeddings"
+
+CONST_DENSE_ATTENTION = "dense"
+CONST_BLOCKWISE_ATTENTION = "blockwise"
+VALID_ATTENTION = [CONST_DENSE_ATTENTION, CONST_BLOCKWISE_ATTENTION]
+DEFAULT_ATTENTION_BLOCK_SIZE = 128
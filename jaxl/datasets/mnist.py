@@ -1,6 +1,6 @@
 from torch.utils.data import Dataset
 from types import SimpleNamespace
-from typing import Tuple
+from typing import Dict, Tuple
 
 from jaxl.constants import (
     VALID_MNIST_TASKS,
@@ -10,8 +10,10 @@ from jaxl.constants import (
     CONST_MULTITASK_MNIST_BURSTY,
 )
 from jaxl.datasets.utils import (
+    IndexedRandomState,
     maybe_save_dataset,
     maybe_load_dataset,
+    sample_bursty_label_sequences,
 )
 
 import _pickle as pickle
@@ -580,6 +582,7 @@ class MultitaskMNISTBursty(Dataset):
         self._remap = remap
         self._bursty_len = bursty_len
         self._unique_classes = unique_classes
+        self._batch_rng = np.random.RandomState(seed)
 
     def _generate_data(
         self,
@@ -680,3 +683,98 @@ class MultitaskMNISTBursty(Dataset):
         outputs = np.eye(self._data["num_classes"])[labels]
 
         return (inputs, outputs)
+
+    def _get_inputs(self, sample_idxes: chex.Array) -> chex.Array:
+        """
+        Gets the images with a single indexing operation.
+        The input transforms are applied as array operations, and unknown transforms
+        fall back to transforming the images one by one.
+
+        :param sample_idxes: the indices of the images
+        :type sample_idxes: chex.Array
+        :return: the images
+        :rtype: chex.Array
+
+        """
+        transforms = getattr(
+            getattr(self._dataset, "transform", None), "transforms", None
+        )
+        if not hasattr(self._dataset, "data") or transforms is None:
+            return np.stack([self._dataset[ii][0] for ii in sample_idxes])
+
+        # The images are stored as uint8 with shape (N, H, W)
+        inputs = np.asarray(self._dataset.data[sample_idxes], dtype=np.float32)
+        inputs = inputs[..., None] / 255.0
+        for transform in transforms:
+            if isinstance(transform, jaxl_transforms.DefaultPILToImageTransform):
+                inputs = inputs / transform.scale
+            elif isinstance(transform, jaxl_transforms.Transpose):
+                # The images are already channel-last
+                continue
+            elif isinstance(transform, jaxl_transforms.GaussianNoise):
+                inputs = (
+                    inputs
+                    + self._batch_rng.randn(*inputs.shape) * transform.std
+                    + transform.mean
+                )
+            elif isinstance(transform, torch_transforms.Normalize):
+                inputs = (inputs - np.asarray(transform.mean)) / np.asarray(
+                    transform.std
+                )
+            else:
+                return np.stack([self._dataset[ii][0] for ii in sample_idxes])
+        return inputs.astype(np.float32)
+
+    def sample_batch(self, batch_idxes: chex.Array) -> Dict[str, chex.Array]:
+        """
+        Samples a batch of sequences with vectorized operations.
+        Unlike ``__getitem__``, the labels are returned as integers.
+        The randomness of each sequence is derived from its index, such that the same
+        index always yields the same sequence, except for the input noise.
+
+        :param batch_idxes: the indices of the sequences
+        :type batch_idxes: chex.Array
+        :return: the inputs and the integer labels of the sequences
+        :rtype: Dict[str, chex.Array]
+
+        """
+        batch_idxes = np.asarray(batch_idxes)
+        rng = IndexedRandomState(batch_idxes)
+        classes = np.arange(self._data["num_classes"])
+
+        query_idxes = self._data["query_idxes"][batch_idxes]
+        labels = np.asarray(self._dataset.targets)[query_idxes]
+        label_idxes = sample_bursty_label_sequences(
+            rng,
+            classes,
+            labels,
+            self._data["is_bursty"][batch_idxes],
+            self._data["context_len"],
+            self._bursty_len,
+            self._unique_classes,
+        )
+
+        context_idxes = np.take_along_axis(
+            self._data["label_to_idx"][label_idxes],
+            self._data["context_idxes"][batch_idxes][..., None],
+            axis=2,
+        )[..., 0]
+        sample_idxes = np.concatenate([context_idxes, query_idxes[:, None]], axis=1)
+        inputs = self._get_inputs(sample_idxes.flatten()).reshape(
+            (*sample_idxes.shape, *self.input_dim)
+        )
+        labels = np.concatenate([label_idxes, labels[:, None]], axis=1)
+
+        if self._data["random_label"]:
+            label_maps = np.argsort(
+                rng.rand(len(batch_idxes), self._data["num_classes"]), axis=1
+            )
+            labels = np.take_along_axis(label_maps, labels, axis=1)
+
+        if self._remap:
+            labels = labels % 2
+
+        return {
+            "inputs": inputs,
+            "labels": labels,
+        }
@@ -1,6 +1,6 @@
 from torch.utils.data import Dataset
 from types import SimpleNamespace
-from typing import Tuple
+from typing import Dict, Tuple
 
 from jaxl.constants import (
     VALID_OMNIGLOT_TASKS,
@@ -9,13 +9,18 @@ from jaxl.constants import (
     CONST_MULTITASK_OMNIGLOT_N_SHOT_K_WAY,
 )
 from jaxl.datasets.utils import (
+    IndexedRandomState,
+    maybe_save_array,
     maybe_save_dataset,
+    maybe_load_array,
     maybe_load_dataset,
+    sample_bursty_label_sequences,
 )
 
 import chex
 import jax.random as jrandom
 import numpy as np
+import torch
 import torchvision.datasets as torch_datasets
 import torchvision.transforms as torch_transforms
 
@@ -67,6 +72,22 @@ def construct_omniglot(
         ]
     input_transform = torch_transforms.Compose(transforms)
 
+    # Decoding every image is only worth it when opted in, preferably with save_dir set
+    # such that the decoded images are saved once and loaded afterwards
+    image_store = None
+    if task_name in [
+        CONST_MULTITASK_OMNIGLOT_BURSTY,
+        CONST_MULTITASK_OMNIGLOT_N_SHOT_K_WAY,
+    ] and getattr(task_config, "cache_images", False):
+        image_store = OmniglotImageStore(
+            get_omniglot_images(save_path, task_config.save_dir),
+            noise_scale=(
+                task_config.noise_scale
+                if getattr(task_config, "augmentation", False)
+                else None
+            ),
+        )
+
     if task_name is None:
         # By default, the Omniglot task will be normalized to be between 0 to 1.
         return Omniglot(
@@ -121,6 +142,7 @@ def construct_omniglot(
             save_dir=task_config.save_dir,
             min_num_per_class=getattr(task_config, "min_num_per_class", 20),
             unique_classes=getattr(task_config, "unique_classes", False),
+            image_store=image_store,
         )
     elif task_name == CONST_MULTITASK_OMNIGLOT_N_SHOT_K_WAY:
         return MultitaskOmniglotNShotKWay(
@@ -146,11 +168,68 @@ def construct_omniglot(
             min_num_per_class=getattr(task_config, "min_num_per_class", 20),
             seed=seed,
             save_dir=task_config.save_dir,
+            image_store=image_store,
         )
     else:
         raise ValueError(f"{task_name} is invalid (one of {VALID_OMNIGLOT_TASKS})")
 
 
+def get_omniglot_images(save_path: str, save_dir: str = None) -> chex.Array:
+    """
+    Decodes every Omniglot character, background split followed by evaluation split,
+    into a single uint8 array of shape (1623 * 20, 105, 105, 1).
+    The array is cached in ``save_dir`` and memory-mapped when loaded from there.
+
+    :param save_path: the path to store the Omniglot dataset
+    :param save_dir: the directory to cache the decoded images
+    :type save_path: str
+    :type save_dir: str:  (Default value = None)
+    :return: the decoded images
+    :rtype: chex.Array
+
+    """
+    array_name = "omniglot_images-all_split.npy"
+    loaded, images = maybe_load_array(save_dir, array_name, mmap_mode="r")
+
+    if not loaded:
+        print("Decoding Images")
+        images = np.concatenate(
+            [
+                np.stack(
+                    [
+                        np.asarray(image, dtype=np.uint8)[..., None]
+                        for image, _ in torch_datasets.Omniglot(
+                            save_path,
+                            background=background,
+                            download=True,
+                        )
+                    ]
+                )
+                for background in [True, False]
+            ]
+        )
+        maybe_save_array(images, save_dir, array_name)
+    return images
+
+
+class OmniglotImageStore:
+    """
+    Gathers Omniglot images from the decoded uint8 array.
+    The outputs match the input transforms of ``construct_omniglot``.
+    """
+
+    def __init__(self, images: chex.Array, noise_scale: float = None):
+        self._images = images
+        self._noise_scale = noise_scale
+
+    def __getitem__(self, idxes: chex.Array) -> chex.Array:
+        inputs = self._images[idxes].astype(np.float32) / 255.0
+        if self._noise_scale is not None:
+            # Uses torch's RNG such that each data loader worker gets a different noise
+            inputs += torch.randn(inputs.shape).numpy() * self._noise_scale
+        return inputs / 255.0
+
+
 class Omniglot(Dataset):
     def __init__(self, dataset):
         self._dataset = dataset
@@ -302,6 +381,7 @@ class MultitaskOmniglotBursty(Dataset):
         remap: bool = False,
         random_label: bool = False,
         save_dir: str = None,
+        image_store: OmniglotImageStore = None,
     ):
         dataset_name = "omniglot_bursty-all_split-p_bursty_{}-num_sequences_{}-sequence_length_{}-min_num_per_class_{}-random_label_{}-seed_{}.pkl".format(
             p_bursty,
@@ -350,6 +430,7 @@ class MultitaskOmniglotBursty(Dataset):
 
         self._train_dataset = train_dataset
         self._test_dataset = test_dataset
+        self._image_store = image_store
         self._data = data
         self._remap = remap
         self._unique_classes = unique_classes
@@ -407,9 +488,60 @@ class MultitaskOmniglotBursty(Dataset):
     def sequence_length(self) -> int:
         return self._data["sequence_length"]
 
+    @property
+    def num_exemplars(self) -> int:
+        return self._data["max_num_classes"] * self._max_num_per_class
+
     def __len__(self):
         return self._data["num_sequences"]
 
+    def get_exemplars(self, exemplar_idxes: chex.Array) -> chex.Array:
+        """
+        Gets the images by their exemplar indices, as returned by ``sample_batch``.
+        Negative indices correspond to padding and map to zero images.
+
+        :param exemplar_idxes: the indices of the images
+        :type exemplar_idxes: chex.Array
+        :return: the images
+        :rtype: chex.Array
+
+        """
+        exemplar_idxes = np.asarray(exemplar_idxes)
+        inputs = self._get_inputs(
+            np.clip(exemplar_idxes, a_min=0, a_max=None).flatten()
+        ).reshape((*exemplar_idxes.shape, *self.input_dim))
+        inputs[exemplar_idxes < 0] = 0.0
+        return inputs
+
+    def _get_inputs(self, sample_idxes: chex.Array) -> chex.Array:
+        """
+        Gets the images, where the indices span both the background and evaluation splits.
+
+        :param sample_idxes: the indices of the images
+        :type sample_idxes: chex.Array
+        :return: the images
+        :rtype: chex.Array
+
+        """
+        if self._image_store is not None:
+            return self._image_store[sample_idxes]
+
+        inputs, _ = zip(
+            *list(
+                map(
+                    lambda ii: (
+                        self._train_dataset[ii]
+                        if ii < self._train_size * self._max_num_per_class
+                        else self._test_dataset[
+                            ii - self._train_size * self._max_num_per_class
+                        ]
+                    ),
+                    sample_idxes,
+                )
+            )
+        )
+        return np.concatenate([input[None] for input in inputs])
+
     def __getitem__(self, idx):
         is_bursty = self._data["is_bursty"][idx]
         sample_rng = np.random.RandomState(idx)
@@ -417,13 +549,6 @@ class MultitaskOmniglotBursty(Dataset):
         label = sample_rng.choice(self._classes)
         base_idx = self._label_to_idx[label, self._data["query_idxes"][idx]]
 
-        if label < self._train_size:
-            query, _ = self._train_dataset[base_idx]
-        else:
-            query, _ = self._test_dataset[
-                base_idx - self._train_size * self._max_num_per_class
-            ]
-
         if is_bursty:
             label_idxes = []
             min_tokens = 6
@@ -461,23 +586,7 @@ class MultitaskOmniglotBursty(Dataset):
         context_idxes = np.take_along_axis(
             self._label_to_idx[label_idxes], context_idxes[:, None], axis=1
         ).flatten()
-        inputs, _ = zip(
-            *list(
-                map(
-                    lambda ii: (
-                        self._train_dataset[ii]
-                        if ii < self._train_size * self._max_num_per_class
-                        else self._test_dataset[
-                            ii - self._train_size * self._max_num_per_class
-                        ]
-                    ),
-                    context_idxes,
-                )
-            )
-        )
-        inputs = np.concatenate(
-            (*[context_input[None] for context_input in inputs], query[None])
-        )
+        inputs = self._get_inputs(np.concatenate([context_idxes, [base_idx]]))
         labels = np.concatenate([label_idxes, [label]])
 
         if self._data["random_label"]:
@@ -488,10 +597,72 @@ class MultitaskOmniglotBursty(Dataset):
 
         if self._remap:
             labels = labels % 2
-        outputs = np.eye(self._data["max_num_classes"])[labels]
+        outputs = np.zeros((len(labels), self._data["max_num_classes"]))
+        outputs[np.arange(len(labels)), labels] = 1.0
 
         return (inputs, outputs)
 
+    def sample_batch(
+        self, batch_idxes: chex.Array, include_inputs: bool = True
+    ) -> Dict[str, chex.Array]:
+        """
+        Samples a batch of sequences with vectorized operations.
+        Unlike ``__getitem__``, the labels are returned as integers.
+        The randomness of each sequence is derived from its index, such that the same
+        index always yields the same sequence.
+        The exemplar indices identify the images, such that the images can be
+        gathered later with ``get_exemplars``.
+
+        :param batch_idxes: the indices of the sequences
+        :param include_inputs: whether or not to gather the images
+        :type batch_idxes: chex.Array
+        :type include_inputs: bool:  (Default value = True)
+        :return: the inputs, the exemplar indices, and the integer labels of the sequences
+        :rtype: Dict[str, chex.Array]
+
+        """
+        batch_idxes = np.asarray(batch_idxes)
+        rng = IndexedRandomState(batch_idxes)
+
+        labels = rng.choice(self._classes, size=len(batch_idxes))
+        label_idxes = sample_bursty_label_sequences(
+            rng,
+            self._classes,
+            labels,
+            self._data["is_bursty"][batch_idxes],
+            self._data["context_len"],
+            3,
+            self._unique_classes,
+        )
+
+        context_idxes = np.take_along_axis(
+            self._label_to_idx[label_idxes],
+            self._data["context_idxes"][batch_idxes][..., None],
+            axis=2,
+        )[..., 0]
+        query_idxes = self._label_to_idx[labels, self._data["query_idxes"][batch_idxes]]
+        sample_idxes = np.concatenate([context_idxes, query_idxes[:, None]], axis=1)
+        labels = np.concatenate([label_idxes, labels[:, None]], axis=1)
+
+        if self._data["random_label"]:
+            label_maps = np.argsort(
+                rng.rand(len(batch_idxes), self._num_classes), axis=1
+            )
+            labels = np.take_along_axis(label_maps, labels, axis=1)
+
+        if self._remap:
+            labels = labels % 2
+
+        batch = {
+            "exemplar_idxes": sample_idxes,
+            "labels": labels,
+        }
+        if include_inputs:
+            batch["inputs"] = self._get_inputs(sample_idxes.flatten()).reshape(
+                (*sample_idxes.shape, *self.input_dim)
+            )
+        return batch
+
 
 class MultitaskOmniglotNShotKWay(Dataset):
     """
@@ -511,6 +682,7 @@ class MultitaskOmniglotNShotKWay(Dataset):
         min_num_per_class: int = 20,
         seed: int = 0,
         save_dir: str = None,
+        image_store: OmniglotImageStore = None,
     ):
         dataset_name = "omniglot_n_shot_k_way-all_split-k_way_{}-num_sequences_{}-sequence_length_{}-min_num_per_class_{}-seed_{}.pkl".format(
             k_way,
@@ -558,6 +730,7 @@ class MultitaskOmniglotNShotKWay(Dataset):
 
         self._train_dataset = train_dataset
         self._test_dataset = test_dataset
+        self._image_store = image_store
         self._data = data
         self._min_num_per_class = min_num_per_class
         self._max_num_per_class = 20
@@ -613,19 +786,41 @@ class MultitaskOmniglotNShotKWay(Dataset):
     def __len__(self):
         return self._data["num_sequences"]
 
+    def _get_inputs(self, sample_idxes: chex.Array) -> chex.Array:
+        """
+        Gets the images, where the indices span both the background and evaluation splits.
+
+        :param sample_idxes: the indices of the images
+        :type sample_idxes: chex.Array
+        :return: the images
+        :rtype: chex.Array
+
+        """
+        if self._image_store is not None:
+            return self._image_store[sample_idxes]
+
+        inputs, _ = zip(
+            *list(
+                map(
+                    lambda ii: (
+                        self._train_dataset[ii]
+                        if ii < self._train_size * self._max_num_per_class
+                        else self._test_dataset[
+                            ii - self._train_size * self._max_num_per_class
+                        ]
+                    ),
+                    sample_idxes,
+                )
+            )
+        )
+        return np.concatenate([input[None] for input in inputs])
+
     def __getitem__(self, idx):
         sample_rng = np.random.RandomState(idx)
 
         label = sample_rng.choice(self._classes)
         base_idx = self._label_to_idx[label, self._data["query_idxes"][idx]]
 
-        if label < self._train_size:
-            query, _ = self._train_dataset[base_idx]
-        else:
-            query, _ = self._test_dataset[
-                base_idx - self._train_size * self._max_num_per_class
-            ]
-
         while True:
             repeated_distractor_labels = sample_rng.choice(
                 self._classes, size=self._data["k_way"] - 1, replace=True
@@ -649,27 +844,12 @@ class MultitaskOmniglotNShotKWay(Dataset):
         context_idxes = np.take_along_axis(
             self._label_to_idx[label_idxes], context_idxes[:, None], axis=1
         ).flatten()
-        inputs, _ = zip(
-            *list(
-                map(
-                    lambda ii: (
-                        self._train_dataset[ii]
-                        if ii < self._train_size * self._max_num_per_class
-                        else self._test_dataset[
-                            ii - self._train_size * self._max_num_per_class
-                        ]
-                    ),
-                    context_idxes,
-                )
-            )
-        )
-        inputs = np.concatenate(
-            (*[context_input[None] for context_input in inputs], query[None])
-        )
+        inputs = self._get_inputs(np.concatenate([context_idxes, [base_idx]]))
         labels = np.concatenate([label_idxes, [label]])
         label_to_k_way = sample_rng.permutation(np.unique(labels))
         labels = np.array([np.argmax(label_to_k_way == label) for label in labels])
 
-        outputs = np.eye(self._data["max_num_classes"])[labels]
+        outputs = np.zeros((len(labels), self._data["max_num_classes"]))
+        outputs[np.arange(len(labels)), labels] = 1.0
 
         return (inputs, outputs)
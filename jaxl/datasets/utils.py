@@ -1,6 +1,7 @@
-from typing import Any, Tuple
+from typing import Any, Tuple, Union
 
 import _pickle as pickle
+import numpy as np
 import os
 
 
@@ -24,3 +25,152 @@ def maybe_load_dataset(save_dir: str, dataset_name: str) -> Tuple[bool, Any]:
             return True, pickle.load(open(full_path, "rb"))
         print("{} not found".format(full_path))
     return False, None
+
+
+def maybe_save_array(array: Any, save_dir: str, array_name: str):
+    if save_dir is not None:
+        full_path = os.path.join(save_dir, array_name)
+        if not os.path.isfile(full_path):
+            print("Saving to {}".format(full_path))
+            os.makedirs(save_dir, exist_ok=True)
+            np.save(full_path, array)
+
+
+def maybe_load_array(
+    save_dir: str, array_name: str, mmap_mode: str = None
+) -> Tuple[bool, Any]:
+    if save_dir is not None:
+        full_path = os.path.join(save_dir, array_name)
+        if os.path.isfile(full_path):
+            print("Loading from {}".format(full_path))
+            return True, np.load(full_path, mmap_mode=mmap_mode)
+        print("{} not found".format(full_path))
+    return False, None
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """
+    Mixes 64-bit integers with the SplitMix64 finalizer.
+
+    :param x: the integers
+    :type x: np.ndarray
+    :return: the mixed integers
+    :rtype: np.ndarray
+
+    """
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class IndexedRandomState:
+    """
+    Counter-based random number generator over a batch of sample indices.
+    Each row of a draw only depends on its sample index, the stream, and the draws
+    made before it, such that the same index always yields the same samples
+    regardless of the batch it is sampled in.
+    The first dimension of every draw corresponds to the sample indices.
+    """
+
+    def __init__(self, idxes: np.ndarray, stream: int = 0):
+        self._keys = _splitmix64(
+            _splitmix64(np.asarray(idxes).astype(np.uint64)) ^ np.uint64(stream)
+        )
+        self._counter = 0
+
+    def rand(self, *shape: int) -> np.ndarray:
+        """
+        Draws uniform samples in [0, 1).
+
+        :param *shape: the shape of the samples, starting with the number of indices
+        :return: the samples
+        :rtype: np.ndarray
+
+        """
+        assert shape[0] == len(
+            self._keys
+        ), f"the first dimension {shape[0]} must match the number of indices {len(self._keys)}"
+        num_draws = int(np.prod(shape[1:], dtype=np.int64))
+        counters = _splitmix64(
+            np.arange(self._counter, self._counter + num_draws, dtype=np.uint64)
+        )
+        self._counter += num_draws
+        bits = _splitmix64(self._keys[:, None] ^ counters[None])
+        return ((bits >> np.uint64(11)) * 2.0**-53).reshape(shape)
+
+    def choice(self, a: np.ndarray, size: Union[int, Tuple[int, ...]]) -> np.ndarray:
+        """
+        Draws uniform samples from the given array with replacement.
+
+        :param a: the array to sample from
+        :param size: the shape of the samples, starting with the number of indices
+        :type a: np.ndarray
+        :type size: Union[int, Tuple[int, ...]]
+        :return: the samples
+        :rtype: np.ndarray
+
+        """
+        size = (size,) if isinstance(size, int) else tuple(size)
+        return np.asarray(a)[(self.rand(*size) * len(a)).astype(np.int64)]
+
+
+def sample_bursty_label_sequences(
+    rng: Union[np.random.RandomState, IndexedRandomState],
+    classes: np.ndarray,
+    labels: np.ndarray,
+    is_bursty: np.ndarray,
+    context_len: int,
+    bursty_len: int,
+    unique_classes: bool,
+) -> np.ndarray:
+    """
+    Samples the context labels of a batch of bursty sequences, following Chan et al. 2022.
+    A bursty sequence repeats the query label and a distractor label ``bursty_len`` times each,
+    while a non-bursty sequence samples the context labels independently.
+
+    :param rng: the random number generator
+    :param classes: the classes to sample from
+    :param labels: the query labels
+    :param is_bursty: whether or not each sequence is bursty
+    :param context_len: the context length
+    :param bursty_len: the number of repetitions of the query and distractor labels
+    :param unique_classes: whether or not non-bursty contexts have distinct labels excluding the query label
+    :type rng: Union[np.random.RandomState, IndexedRandomState]
+    :type classes: np.ndarray
+    :type labels: np.ndarray
+    :type is_bursty: np.ndarray
+    :type context_len: int
+    :type bursty_len: int
+    :type unique_classes: bool
+    :return: the context labels
+    :rtype: np.ndarray
+
+    """
+    batch_size = len(labels)
+    num_filler = max(context_len - 2 * bursty_len, 0)
+    distractor_labels = rng.choice(classes, size=(batch_size, 1))
+    bursty_label_idxes = np.concatenate(
+        [
+            np.repeat(labels[:, None], bursty_len, axis=1),
+            np.repeat(distractor_labels, bursty_len, axis=1),
+            rng.choice(classes, size=(batch_size, num_filler)),
+        ],
+        axis=1,
+    )[:, :context_len]
+    bursty_label_idxes = np.take_along_axis(
+        bursty_label_idxes,
+        np.argsort(rng.rand(*bursty_label_idxes.shape), axis=1),
+        axis=1,
+    )
+
+    if unique_classes:
+        # Sample without replacement by taking the smallest random scores, excluding the query label
+        scores = rng.rand(batch_size, len(classes))
+        scores[labels[:, None] == classes[None]] = np.inf
+        label_idxes = classes[np.argsort(scores, axis=1)[:, :context_len]]
+    else:
+        label_idxes = rng.choice(classes, size=(batch_size, context_len))
+
+    return np.where(is_bursty[:, None], bursty_label_idxes, label_idxes)
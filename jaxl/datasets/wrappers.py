@@ -1,11 +1,13 @@
 from torch.utils.data import Dataset, DataLoader
-from typing import Any
+from typing import Any, Dict
 from types import SimpleNamespace
 
 import chex
 import numpy as np
 import tensorflow_datasets as tfds
 
+from jaxl.datasets.utils import IndexedRandomState
+
 
 class DatasetWrapper(Dataset):
     """Default dataset wrapper."""
@@ -114,6 +116,46 @@ class FixedLengthContextDataset(DatasetWrapper):
         # return context_inputs, context_outputs, query, output
         return ret_dict
 
+    def sample_batch(self, batch_idxes: chex.Array, **kwargs) -> Dict[str, chex.Array]:
+        """
+        Samples a batch of contexts and queries with vectorized operations.
+        The underlying dataset must implement ``sample_batch``, and the keyword
+        arguments are passed to it.
+        The exemplar indices are included when the underlying dataset provides them.
+
+        :param batch_idxes: the indices of the samples
+        :type batch_idxes: chex.Array
+        :return: the context inputs, the context labels, the queries, and the labels
+        :rtype: Dict[str, chex.Array]
+
+        """
+        batch_idxes = np.asarray(batch_idxes)
+        batch = self._dataset.sample_batch(batch_idxes // self._seq_mod, **kwargs)
+
+        # Each row is a window of context_len + 1 consecutive samples
+        window_idxes = (batch_idxes % self._seq_mod)[:, None] + np.arange(
+            self._context_len + 1
+        )
+        labels = np.take_along_axis(batch["labels"], window_idxes, axis=1)
+        samples = {
+            "context_labels": labels[:, :-1],
+            "labels": labels[:, -1],
+        }
+
+        if "inputs" in batch:
+            inputs = batch["inputs"][np.arange(len(batch_idxes))[:, None], window_idxes]
+            samples["context_inputs"] = inputs[:, :-1]
+            samples["queries"] = inputs[:, -1:]
+
+        if "exemplar_idxes" in batch:
+            exemplar_idxes = np.take_along_axis(
+                batch["exemplar_idxes"], window_idxes, axis=1
+            )
+            samples["context_exemplar_idxes"] = exemplar_idxes[:, :-1]
+            samples["query_exemplar_idxes"] = exemplar_idxes[:, -1:]
+
+        return samples
+
 
 class ContextDataset(DatasetWrapper):
     """Dataset for in-context learning."""
@@ -198,4 +240,89 @@ class ContextDataset(DatasetWrapper):
         # return context_inputs, context_outputs, query, output
         return ret_dict
 
+    def sample_batch(self, batch_idxes: chex.Array, **kwargs) -> Dict[str, chex.Array]:
+        """
+        Samples a batch of contexts and queries with vectorized operations.
+        The underlying dataset must implement ``sample_batch``, and the keyword
+        arguments are passed to it.
+        Context positions before the start of the sequence have zero inputs, label -1,
+        and exemplar index -1.
+
+        :param batch_idxes: the indices of the samples
+        :type batch_idxes: chex.Array
+        :return: the context inputs, the context labels, the queries, and the labels
+        :rtype: Dict[str, chex.Array]
+
+        """
+        batch_idxes = np.asarray(batch_idxes)
+        batch_size = len(batch_idxes)
+        batch = self._dataset.sample_batch(batch_idxes // self._seq_mod, **kwargs)
+        inputs = batch.get("inputs")
+        labels = batch["labels"]
+        exemplar_idxes = batch.get("exemplar_idxes")
+        row_idxes = np.arange(batch_size)
+
+        timestep_idxes = batch_idxes % self._seq_mod
+        seq_copy_start_idxes = np.clip(
+            timestep_idxes - self._last_context_idx, a_min=0, a_max=None
+        )
+
+        if self._include_query_class:
+            # Move a sample of the query class into the context when it is not already there
+            # The randomness is derived from the sample indices, in a separate stream
+            # from the underlying dataset
+            rng = IndexedRandomState(batch_idxes, stream=1)
+            match_idxes = labels[:, :-1] == labels[:, -1:]
+            has_match = np.any(match_idxes, axis=1) & (
+                timestep_idxes < self._last_context_idx
+            )
+            idxes_to_put = np.argmax(rng.rand(*match_idxes.shape) * match_idxes, axis=1)
+            to_swap = has_match & (
+                (idxes_to_put < seq_copy_start_idxes) | (idxes_to_put > timestep_idxes)
+            )
+            swap_idxes = seq_copy_start_idxes + np.floor(
+                rng.rand(batch_size) * (timestep_idxes - seq_copy_start_idxes + 1)
+            ).astype(int)
+            if np.any(to_swap):
+                swapped = []
+                for sequences in (inputs, labels, exemplar_idxes):
+                    if sequences is not None:
+                        sequences = np.array(sequences)
+                        sequences[row_idxes[to_swap], swap_idxes[to_swap]] = sequences[
+                            row_idxes[to_swap], idxes_to_put[to_swap]
+                        ]
+                    swapped.append(sequences)
+                inputs, labels, exemplar_idxes = swapped
+
+        # The context ends at the current timestep and is left-padded
+        context_idxes = (
+            timestep_idxes[:, None]
+            - self._last_context_idx
+            + np.arange(self._context_len)
+        )
+        is_padding = context_idxes < 0
+        context_idxes = np.clip(context_idxes, a_min=0, a_max=None)
+        context_labels = np.take_along_axis(labels, context_idxes, axis=1)
+        context_labels[is_padding] = -1
+        samples = {
+            "context_labels": context_labels,
+            "labels": labels[:, -1],
+        }
+
+        if inputs is not None:
+            context_inputs = inputs[row_idxes[:, None], context_idxes]
+            context_inputs[is_padding] = 0.0
+            samples["context_inputs"] = context_inputs
+            samples["queries"] = inputs[:, -1:]
+
+        if exemplar_idxes is not None:
+            context_exemplar_idxes = np.take_along_axis(
+                exemplar_idxes, context_idxes, axis=1
+            )
+            context_exemplar_idxes[is_padding] = -1
+            samples["context_exemplar_idxes"] = context_exemplar_idxes
+            samples["query_exemplar_idxes"] = exemplar_idxes[:, -1:]
+
+        return samples
+
     # TODO: Generate test query for visualization on context length, then use that for ICL plots
@@ -153,11 +153,10 @@ class Softmax(Distribution):
         :rtype: chex.Array
 
         """
+        shape = logits.shape[:-1]
         if num_samples:
-            shape = (num_samples, *logits.shape[:-1], 1)
-        else:
-            shape = (*logits.shape[:-1], 1)
-        return jrandom.categorical(key, logits, shape=shape)
+            shape = (num_samples, *shape)
+        return jrandom.categorical(key, logits, shape=shape)[..., None]
 
     @staticmethod
     def lprob(logits: chex.Array, x: chex.Array) -> chex.Array:
@@ -1,4 +1,3 @@
-from gymnasium import spaces
 from skimage.transform import resize
 from tqdm import tqdm
 from typing import Any, Dict, Union
@@ -9,7 +8,7 @@ import numpy as np
 import optax
 
 from jaxl.buffers import ReplayBuffer
-from jaxl.envs.rollouts import EvaluationRollout
+from jaxl.envs.rollouts import EvaluationRollout, SubtrajectoryRecorder
 from jaxl.envs.wrappers.wrapper import DefaultGymWrapper
 from jaxl.models import Policy
 from jaxl.utils import RunningMeanStd
@@ -66,12 +65,11 @@ class MetaWorldRollout(EvaluationRollout):
             it = tqdm(it)
 
         exploration_key = jrandom.split(self._reset_key, 1)[0]
+        step_action = policy.deterministic_step_action
         if random:
-            get_action = policy.compute_action
-        else:
-            get_action = lambda params, obs, h_state, key: policy.deterministic_action(
-                params, obs, h_state
-            )
+            step_action = policy.step_action
+        obs_rms_state = obs_rms.rms_state if obs_rms else None
+        action_bounds = self._get_action_bounds()
         for _ in it:
             self._episodic_returns.append(0)
             self._episode_lengths.append(0)
@@ -98,25 +96,14 @@ class MetaWorldRollout(EvaluationRollout):
             while not done:
                 if use_image_for_inference:
                     self._curr_obs = save_curr_obs
-                normalize_obs = np.array([self._curr_obs])
-                if obs_rms:
-                    normalize_obs = obs_rms.normalize(normalize_obs)
-
-                act, next_h_state = get_action(
+                env_act, act, next_h_state, exploration_key = step_action(
                     params,
-                    normalize_obs,
-                    np.array([self._curr_h_state]),
+                    self._curr_obs,
+                    self._curr_h_state,
                     exploration_key,
+                    obs_rms_state,
+                    action_bounds,
                 )
-                exploration_key = jrandom.split(exploration_key, 1)[0]
-                act = act[0]
-                next_h_state = next_h_state[0]
-
-                env_act = act
-                if isinstance(self._env.action_space, spaces.Box):
-                    env_act = np.clip(
-                        act, self._env.action_space.low, self._env.action_space.high
-                    )
                 env_act = np.array(env_act)
                 next_obs, rew, terminated, truncated, info = self._env.step(env_act)
                 self._episodic_returns[-1] += float(rew)
@@ -166,6 +153,8 @@ class MetaWorldRollout(EvaluationRollout):
     ):
         """
         Executes the policy in the environment and store them with a subsampling scheme.
+        Only the subtrajectory of each episode is kept, see `SubtrajectoryRecorder`,
+        and the episode ends early once a subtrajectory with a predetermined end is recorded.
 
         :param params: the model parameters
         :param policy: the policy
@@ -195,20 +184,27 @@ class MetaWorldRollout(EvaluationRollout):
 
         termination_steps = None
         if max_episode_length is not None and max_episode_length > subsampling_length:
-            termination_steps = jrandom.randint(
-                jrandom.split(self._reset_key, 1)[0],
-                (num_episodes,),
-                subsampling_length,
-                max_episode_length,
+            termination_steps = np.asarray(
+                jrandom.randint(
+                    jrandom.split(self._reset_key, 1)[0],
+                    (num_episodes,),
+                    subsampling_length,
+                    max_episode_length,
+                )
             )
 
         it = range(num_episodes)
         if use_tqdm:
             it = tqdm(it)
+
+        exploration_key = jrandom.split(self._reset_key, 1)[0]
+        obs_rms_state = obs_rms.rms_state if obs_rms else None
+        action_bounds = self._get_action_bounds()
+        recorder = SubtrajectoryRecorder(subsampling_length)
         for ep_i in it:
             termination_step = None
             if termination_steps is not None:
-                termination_step = termination_steps[ep_i]
+                termination_step = int(termination_steps[ep_i])
             self._episodic_returns.append(0)
             self._episode_lengths.append(0)
             seed = int(jrandom.randint(self._reset_key, (1,), 0, 2**16 - 1))
@@ -222,6 +218,7 @@ class MetaWorldRollout(EvaluationRollout):
                 )
 
             self._curr_h_state = policy.reset()
+            recorder.reset(termination_step, np.random.RandomState(seed))
 
             save_curr_obs = self._curr_obs
             if get_image:
@@ -230,36 +227,25 @@ class MetaWorldRollout(EvaluationRollout):
                     axes=(2, 0, 1),
                 )
 
-            curr_episode = []
             done = False
             while not done:
                 if use_image_for_inference:
                     self._curr_obs = save_curr_obs
-                normalize_obs = np.array([self._curr_obs])
-                if obs_rms:
-                    normalize_obs = obs_rms.normalize(normalize_obs)
-
-                act, next_h_state = policy.deterministic_action(
-                    params,
-                    normalize_obs,
-                    np.array([self._curr_h_state]),
-                )
-                act = act[0]
-                next_h_state = next_h_state[0]
-
-                if isinstance(self._env.action_space, spaces.Box):
-                    env_act = np.clip(
-                        act, self._env.action_space.low, self._env.action_space.high
+                env_act, act, next_h_state, exploration_key = (
+                    policy.deterministic_step_action(
+                        params,
+                        self._curr_obs,
+                        self._curr_h_state,
+                        exploration_key,
+                        obs_rms_state,
+                        action_bounds,
                     )
+                )
                 env_act = np.array(env_act)
                 next_obs, rew, terminated, truncated, info = self._env.step(env_act)
                 self._episodic_returns[-1] += float(rew)
                 self._episode_lengths[-1] += 1
 
-                done = terminated or truncated
-                if termination_step is not None:
-                    done = done or len(curr_episode) == termination_step
-
                 save_next_obs = next_obs
                 if get_image:
                     save_next_obs = np.transpose(
@@ -267,42 +253,23 @@ class MetaWorldRollout(EvaluationRollout):
                         axes=(2, 0, 1),
                     )
 
-                curr_episode.append(
-                    (
-                        save_curr_obs,
-                        self._curr_h_state,
-                        act,
-                        rew,
-                        terminated,
-                        truncated,
-                        info,
-                        save_next_obs,
-                        next_h_state,
-                    )
+                is_recorded = recorder.record(
+                    save_curr_obs,
+                    self._curr_h_state,
+                    act,
+                    rew,
+                    terminated,
+                    truncated,
+                    info,
+                    save_next_obs,
+                    next_h_state,
                 )
+                done = terminated or truncated or is_recorded
 
                 save_curr_obs = save_next_obs
                 self._curr_obs = next_obs
                 self._curr_h_state = next_h_state
 
-            idx_start = 0
-            idx_end = len(curr_episode)
-            if termination_step is not None:
-                idx_start = termination_step - subsampling_length
-                idx_end = termination_step
-            else:
-                if subsampling_length < len(curr_episode):
-                    idx_start = jrandom.randint(
-                        self._reset_key,
-                        (),
-                        minval=0,
-                        maxval=len(curr_episode) - subsampling_length,
-                    )
-                    idx_end = idx_start + subsampling_length
-
-            for idx in range(idx_start, idx_end):
-                buffer.push(*curr_episode[idx])
-                if buffer.is_full:
-                    break
+            recorder.push(buffer)
 
         self._env.reset()
@@ -1,9 +1,10 @@
 from abc import ABC, abstractclassmethod
 from gymnasium import spaces
 from tqdm import tqdm
-from typing import Any, Dict, Iterable, Tuple, Union
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 import chex
+import jax
 import jax.random as jrandom
 import math
 import numpy as np
@@ -15,6 +16,150 @@ from jaxl.models import Policy
 from jaxl.utils import RunningMeanStd
 
 
+def draw_reset_seeds(
+    reset_key: jrandom.PRNGKey, num_seeds: int
+) -> Tuple[jrandom.PRNGKey, chex.Array]:
+    """
+    Draws the reset seeds of consecutive episodes in one call.
+    The seeds and the resulting key match drawing the seeds one episode at a time.
+
+    :param reset_key: the random number generator key for the reset seeds
+    :param num_seeds: the number of seeds to draw
+    :type reset_key: jrandom.PRNGKey
+    :type num_seeds: int
+    :return: the next random number generator key and the reset seeds
+    :rtype: Tuple[jrandom.PRNGKey, chex.Array]
+
+    """
+
+    def draw_seed(key, _):
+        return jrandom.split(key, 1)[0], jrandom.randint(key, (1,), 0, 2**16 - 1)[0]
+
+    return jax.lax.scan(draw_seed, reset_key, None, length=num_seeds)
+
+
+class SubtrajectoryRecorder:
+    """
+    Records a subtrajectory of an episode into preallocated arrays.
+    If the end of the subtrajectory is known beforehand, only the transitions
+    within the subtrajectory are recorded, and the recording is complete once
+    its last transition is recorded.
+    Otherwise, a uniformly random subtrajectory that excludes the last transition
+    of the episode is selected via reservoir sampling, such that at most two
+    subtrajectories worth of transitions are kept.
+    Episodes that are not longer than the subtrajectory are recorded entirely.
+    """
+
+    def __init__(self, subsampling_length: int):
+        assert (
+            subsampling_length > 0
+        ), f"subsampling_length needs to be at least 1, got {subsampling_length}"
+        self._subsampling_length = subsampling_length
+        self._window = None
+        self._recent = None
+        self._idx_end = None
+        self._rng = None
+        self._num_steps = 0
+        self._num_recorded = 0
+
+    def reset(self, idx_end: Optional[int], rng: np.random.RandomState):
+        """
+        Starts recording a new episode.
+
+        :param idx_end: the end of the subtrajectory, if known beforehand
+        :param rng: the random number generator for selecting the subtrajectory
+        :type idx_end: Optional[int]
+        :type rng: np.random.RandomState
+
+        """
+        self._idx_end = idx_end
+        self._rng = rng
+        self._num_steps = 0
+        self._num_recorded = 0
+
+    def _allocate(self, transition: Tuple) -> List[np.ndarray]:
+        """
+        Allocates the storage of one subtrajectory.
+
+        :param transition: a transition to infer the shapes and the data types from
+        :type transition: Tuple
+        :return: the storage with one array per transition entry
+        :rtype: List[np.ndarray]
+
+        """
+        return [
+            (
+                np.empty(self._subsampling_length, dtype=object)
+                if isinstance(entry, dict)
+                else np.zeros(
+                    (self._subsampling_length, *np.shape(entry)),
+                    dtype=np.asarray(entry).dtype,
+                )
+            )
+            for entry in transition
+        ]
+
+    def record(self, *transition) -> bool:
+        """
+        Records a transition.
+
+        :param *transition: the observation, the hidden state, the action, the reward,
+            whether the episode is terminated, whether the episode is truncated,
+            the environment information, the next observation, and the next hidden state
+        :return: whether or not the subtrajectory is completely recorded
+        :rtype: bool
+
+        """
+        if self._window is None:
+            self._window = self._allocate(transition)
+            self._recent = self._allocate(transition)
+
+        step = self._num_steps
+        self._num_steps += 1
+        if self._idx_end is not None:
+            idx_start = self._idx_end - self._subsampling_length
+            if step >= idx_start:
+                for storage, entry in zip(self._window, transition):
+                    storage[step - idx_start] = entry
+                self._num_recorded += 1
+            return self._num_steps >= self._idx_end
+
+        # The subtrajectory ending at the previous step becomes a candidate
+        # only once the episode continues past it.
+        num_candidates = step - self._subsampling_length + 1
+        if num_candidates > 0 and self._rng.randint(num_candidates) == 0:
+            order = (
+                np.arange(step - self._subsampling_length, step)
+                % self._subsampling_length
+            )
+            for window_storage, recent_storage in zip(self._window, self._recent):
+                window_storage[:] = recent_storage[order]
+            self._num_recorded = self._subsampling_length
+
+        for storage, entry in zip(self._recent, transition):
+            storage[step % self._subsampling_length] = entry
+        return False
+
+    def push(self, buffer: ReplayBuffer):
+        """
+        Pushes the recorded subtrajectory into the buffer until the buffer is full.
+
+        :param buffer: the buffer to store the transitions with
+        :type buffer: ReplayBuffer
+
+        """
+        storages = self._window
+        num_transitions = self._num_recorded
+        if self._idx_end is None and self._num_steps <= self._subsampling_length:
+            storages = self._recent
+            num_transitions = self._num_steps
+
+        for idx in range(num_transitions):
+            buffer.push(*[storage[idx] for storage in storages])
+            if buffer.is_full:
+                break
+
+
 class Rollout(ABC):
     """
     Interconnection between policy and environment.
@@ -51,6 +196,18 @@ class Rollout(ABC):
     def rollout(self, *args, **kwargs) -> Any:
         raise NotImplementedError
 
+    def _get_action_bounds(self) -> Optional[Tuple[chex.Array, chex.Array]]:
+        """
+        Gets the bounds to clip the actions with, if the action space is bounded.
+
+        :return: the lower and upper bounds of the action space
+        :rtype: Optional[Tuple[chex.Array, chex.Array]]
+
+        """
+        if isinstance(self._env.action_space, spaces.Box):
+            return (self._env.action_space.low, self._env.action_space.high)
+        return None
+
     @property
     def episodic_returns(self):
         """All episodic returns."""
@@ -160,12 +317,11 @@ class EvaluationRollout(Rollout):
             it = tqdm(it)
 
         exploration_key = jrandom.split(self._reset_key, 1)[0]
+        step_action = policy.deterministic_step_action
         if random:
-            get_action = policy.compute_action
-        else:
-            get_action = lambda params, obs, h_state, key: policy.deterministic_action(
-                params, obs, h_state
-            )
+            step_action = policy.step_action
+        obs_rms_state = obs_rms.rms_state if obs_rms else None
+        action_bounds = self._get_action_bounds()
         for _ in it:
             self._episodic_returns.append(0)
             self._episode_lengths.append(0)
@@ -176,25 +332,14 @@ class EvaluationRollout(Rollout):
 
             done = False
             while not done:
-                normalize_obs = np.array([self._curr_obs])
-                if obs_rms:
-                    normalize_obs = obs_rms.normalize(normalize_obs)
-
-                act, next_h_state = get_action(
+                env_act, act, next_h_state, exploration_key = step_action(
                     params,
-                    normalize_obs,
-                    np.array([self._curr_h_state]),
+                    self._curr_obs,
+                    self._curr_h_state,
                     exploration_key,
+                    obs_rms_state,
+                    action_bounds,
                 )
-                exploration_key = jrandom.split(exploration_key, 1)[0]
-                act = act[0]
-                next_h_state = next_h_state[0]
-
-                env_act = act
-                if isinstance(self._env.action_space, spaces.Box):
-                    env_act = np.clip(
-                        act, self._env.action_space.low, self._env.action_space.high
-                    )
                 env_act = np.array(env_act)
                 next_obs, rew, terminated, truncated, info = self._env.step(env_act)
                 self._episodic_returns[-1] += float(rew)
@@ -289,6 +434,8 @@ class EvaluationRollout(Rollout):
     ):
         """
         Executes the policy in the environment and store them with a subsampling scheme.
+        Only the subtrajectory of each episode is kept, see `SubtrajectoryRecorder`,
+        and the episode ends early once a subtrajectory with a predetermined end is recorded.
 
         :param params: the model parameters
         :param policy: the policy
@@ -312,94 +459,231 @@ class EvaluationRollout(Rollout):
 
         termination_steps = None
         if max_episode_length is not None and max_episode_length > subsampling_length:
-            termination_steps = jrandom.randint(
-                jrandom.split(self._reset_key, 1)[0],
-                (num_episodes,),
-                subsampling_length,
-                max_episode_length,
+            termination_steps = np.asarray(
+                jrandom.randint(
+                    jrandom.split(self._reset_key, 1)[0],
+                    (num_episodes,),
+                    subsampling_length,
+                    max_episode_length,
+                )
             )
 
         it = range(num_episodes)
         if use_tqdm:
             it = tqdm(it)
+
+        exploration_key = jrandom.split(self._reset_key, 1)[0]
+        obs_rms_state = obs_rms.rms_state if obs_rms else None
+        action_bounds = self._get_action_bounds()
+        recorder = SubtrajectoryRecorder(subsampling_length)
         for ep_i in it:
             termination_step = None
             if termination_steps is not None:
-                termination_step = termination_steps[ep_i]
+                termination_step = int(termination_steps[ep_i])
             self._episodic_returns.append(0)
             self._episode_lengths.append(0)
             seed = int(np.array(jrandom.randint(self._reset_key, (1,), 0, 2**16 - 1)))
             self._reset_key = jrandom.split(self._reset_key, 1)[0]
             self._curr_obs, self._curr_info = self._env.reset(seed=seed)
             self._curr_h_state = policy.reset()
+            recorder.reset(termination_step, np.random.RandomState(seed))
 
-            curr_episode = []
             done = False
             while not done:
-                normalize_obs = np.array([self._curr_obs])
-                if obs_rms:
-                    normalize_obs = obs_rms.normalize(normalize_obs)
-
-                act, next_h_state = policy.deterministic_action(
-                    params,
-                    normalize_obs,
-                    np.array([self._curr_h_state]),
-                )
-                act = act[0]
-                next_h_state = next_h_state[0]
-
-                env_act = act
-                if isinstance(self._env.action_space, spaces.Box):
-                    env_act = np.clip(
-                        act, self._env.action_space.low, self._env.action_space.high
+                env_act, act, next_h_state, exploration_key = (
+                    policy.deterministic_step_action(
+                        params,
+                        self._curr_obs,
+                        self._curr_h_state,
+                        exploration_key,
+                        obs_rms_state,
+                        action_bounds,
                     )
+                )
                 env_act = np.array(env_act)
                 next_obs, rew, terminated, truncated, info = self._env.step(env_act)
                 self._episodic_returns[-1] += float(rew)
                 self._episode_lengths[-1] += 1
 
-                done = terminated or truncated
-                if termination_step is not None:
-                    done = done or len(curr_episode) == termination_step
-
-                curr_episode.append(
-                    (
-                        self._curr_obs,
-                        self._curr_h_state,
-                        act,
-                        rew,
-                        terminated,
-                        truncated,
-                        info,
-                        next_obs,
-                        next_h_state,
-                    )
+                is_recorded = recorder.record(
+                    self._curr_obs,
+                    self._curr_h_state,
+                    act,
+                    rew,
+                    terminated,
+                    truncated,
+                    info,
+                    next_obs,
+                    next_h_state,
                 )
+                done = terminated or truncated or is_recorded
 
                 self._curr_obs = next_obs
                 self._curr_h_state = next_h_state
 
-            idx_start = 0
-            idx_end = len(curr_episode)
-            if termination_step is not None:
-                idx_start = termination_step - subsampling_length
-                idx_end = termination_step
-            else:
-                if subsampling_length < len(curr_episode):
-                    idx_start = jrandom.randint(
-                        self._reset_key,
-                        (),
-                        minval=0,
-                        maxval=len(curr_episode) - subsampling_length,
+            recorder.push(buffer)
+
+        self._env.reset()
+
+
+class VectorizedEvaluationRollout(EvaluationRollout):
+    """
+    Interconnection between policy and multiple copies of an environment.
+    This executes multiple evaluation episodes concurrently, one per environment copy,
+    using a single batched action computation per step.
+    The environment copies without an ongoing episode are masked out.
+    The episodes use the same reset seeds as `EvaluationRollout`, and
+    `episodic_returns` and `episode_lengths` are ordered by episode.
+    """
+
+    #: The environment copies.
+    _envs: Sequence[DefaultGymWrapper]
+
+    def __init__(self, envs: Sequence[DefaultGymWrapper], seed: int = 0):
+        super().__init__(envs[0], seed)
+        self._envs = envs
+        self._num_envs = len(envs)
+        self._draw_reset_seeds = jax.jit(
+            draw_reset_seeds, static_argnames=["num_seeds"]
+        )
+
+    @property
+    def num_envs(self):
+        """The number of environment copies."""
+        return self._num_envs
+
+    def rollout(
+        self,
+        params: Union[optax.Params, Dict[str, Any]],
+        policy: Policy,
+        obs_rms: Union[bool, RunningMeanStd],
+        num_episodes: int,
+        buffer: ReplayBuffer = None,
+        use_tqdm: bool = True,
+        random: bool = False,
+    ):
+        """
+        Executes the policy in the environments.
+        The transitions are pushed into the buffer one complete episode at a time,
+        in the order of the episodes.
+
+        :param params: the model parameters
+        :param policy: the policy
+        :param obs_rms: the running statistics for observations
+        :param num_episodes: the number of interaction episodes with the environments
+        :param buffer: the buffer to store the transitions with
+        :param use_tqdm: whether or not to show progress bar
+        :param random: whether to use random actions
+        :type params: Union[optax.Params, Dict[str, Any]]
+        :type policy: Policy
+        :type obs_rms: Union[bool, RunningMeanStd]
+        :type num_episodes: int
+        :type buffer: ReplayBuffer (DefaultValue = None)
+        :type use_tqdm: bool (DefaultValue = True)
+        :type random: bool (DefaultValue = False)
+
+        """
+        progress = tqdm(total=num_episodes, disable=not use_tqdm)
+
+        exploration_key = jrandom.split(self._reset_key, 1)[0]
+        self._reset_key, seeds = self._draw_reset_seeds(self._reset_key, num_episodes)
+        seeds = np.asarray(seeds)
+        step_action = policy.deterministic_step_action
+        if random:
+            step_action = policy.step_action
+        obs_rms_state = obs_rms.rms_state if obs_rms else None
+        action_bounds = self._get_action_bounds()
+        h_state = np.asarray(policy.reset())
+
+        episodic_returns = np.zeros(num_episodes)
+        episode_lengths = np.zeros(num_episodes, dtype=np.int64)
+        episode_dones = np.zeros(num_episodes, dtype=bool)
+        episode_transitions = [[] for _ in range(num_episodes)]
+        num_pushed_episodes = 0
+
+        # The episode each environment copy is executing, -1 if there is none
+        env_episodes = np.full(self._num_envs, -1)
+        curr_obss = None
+        curr_h_states = np.tile(h_state, (self._num_envs, *[1] * h_state.ndim))
+        next_episode = 0
+        for env_i in range(min(self._num_envs, num_episodes)):
+            obs, _ = self._envs[env_i].reset(seed=int(seeds[next_episode]))
+            if curr_obss is None:
+                curr_obss = np.zeros(
+                    (self._num_envs, *np.shape(obs)), dtype=np.asarray(obs).dtype
+                )
+            curr_obss[env_i] = obs
+            env_episodes[env_i] = next_episode
+            next_episode += 1
+
+        while np.any(env_episodes >= 0):
+            env_acts, acts, next_h_states, exploration_key = step_action(
+                params,
+                curr_obss,
+                curr_h_states,
+                exploration_key,
+                obs_rms_state,
+                action_bounds,
+                batched=True,
+            )
+            env_acts = np.asarray(env_acts)
+            acts = np.asarray(acts)
+            next_h_states = np.asarray(next_h_states)
+
+            for env_i in np.where(env_episodes >= 0)[0]:
+                episode_i = env_episodes[env_i]
+                next_obs, rew, terminated, truncated, info = self._envs[env_i].step(
+                    env_acts[env_i]
+                )
+                episodic_returns[episode_i] += float(rew)
+                episode_lengths[episode_i] += 1
+
+                if buffer is not None:
+                    episode_transitions[episode_i].append(
+                        (
+                            np.array(curr_obss[env_i]),
+                            curr_h_states[env_i],
+                            acts[env_i],
+                            rew,
+                            terminated,
+                            truncated,
+                            info,
+                            next_obs,
+                            next_h_states[env_i],
+                        )
                     )
-                    idx_end = idx_start + subsampling_length
 
-            for idx in range(idx_start, idx_end):
-                buffer.push(*curr_episode[idx])
-                if buffer.is_full:
-                    break
+                curr_obss[env_i] = next_obs
+                curr_h_states[env_i] = next_h_states[env_i]
+                if not (terminated or truncated):
+                    continue
+
+                episode_dones[episode_i] = True
+                progress.update()
+                env_episodes[env_i] = -1
+                if next_episode < num_episodes:
+                    obs, _ = self._envs[env_i].reset(seed=int(seeds[next_episode]))
+                    curr_obss[env_i] = obs
+                    curr_h_states[env_i] = h_state
+                    env_episodes[env_i] = next_episode
+                    next_episode += 1
+
+            # Keep the transitions of each episode contiguous within the buffer
+            while (
+                num_pushed_episodes < num_episodes
+                and episode_dones[num_pushed_episodes]
+            ):
+                if buffer is not None:
+                    for transition in episode_transitions[num_pushed_episodes]:
+                        buffer.push(*transition)
+                episode_transitions[num_pushed_episodes] = None
+                num_pushed_episodes += 1
 
-        self._env.reset()
+        progress.close()
+        self._episodic_returns.extend(episodic_returns.tolist())
+        self._episode_lengths.extend(episode_lengths.tolist())
+        for env in self._envs:
+            env.reset()
 
 
 class StandardRollout(Rollout):
@@ -438,6 +722,8 @@ class StandardRollout(Rollout):
         :rtype: Tuple[chex.Array, chex.Array]
 
         """
+        obs_rms_state = obs_rms.rms_state if obs_rms else None
+        action_bounds = self._get_action_bounds()
         for _ in range(num_steps):
             if self._done:
                 self._done = False
@@ -450,25 +736,14 @@ class StandardRollout(Rollout):
                 self._curr_obs, self._curr_info = self._env.reset(seed=seed)
                 self._curr_h_state = policy.reset()
 
-            normalize_obs = np.array([self._curr_obs])
-            if obs_rms:
-                normalize_obs = obs_rms.normalize(normalize_obs)
-
-            act, next_h_state = policy.compute_action(
+            env_act, act, next_h_state, self._exploration_key = policy.step_action(
                 params,
-                normalize_obs,
-                np.array([self._curr_h_state]),
+                self._curr_obs,
+                self._curr_h_state,
                 self._exploration_key,
+                obs_rms_state,
+                action_bounds,
             )
-            act = act[0]
-            next_h_state = next_h_state[0]
-            self._exploration_key = jrandom.split(self._exploration_key, 1)[0]
-
-            env_act = act
-            if isinstance(self._env.action_space, spaces.Box):
-                env_act = np.clip(
-                    act, self._env.action_space.low, self._env.action_space.high
-                )
             env_act = np.array(env_act)
             next_obs, rew, terminated, truncated, info = self._env.step(env_act)
 
@@ -493,3 +768,217 @@ class StandardRollout(Rollout):
             self._curr_obs = next_obs
             self._curr_h_state = next_h_state
         return self._curr_obs, self._curr_h_state
+
+
+class VectorizedRollout(Rollout):
+    """
+    Interconnection between policy and multiple copies of an environment.
+    This executes the provided policy in all environments in lockstep
+    using a single batched `compute_action` per step.
+    The transitions of all environments are pushed into the buffer together.
+    NOTE: `episodic_returns` and `episode_lengths` only contain completed episodes.
+    """
+
+    #: The environment copies.
+    _envs: Sequence[DefaultGymWrapper]
+
+    #: Whether or not each environment's trajectory is done (terminated or truncated).
+    _dones: chex.Array
+
+    #: The returns of the ongoing episode of each environment.
+    _curr_episodic_returns: chex.Array
+
+    #: The lengths of the ongoing episode of each environment.
+    _curr_episode_lengths: chex.Array
+
+    def __init__(self, envs: Sequence[DefaultGymWrapper], seed: int = 0):
+        super().__init__(envs[0])
+        self._envs = envs
+        self._num_envs = len(envs)
+        self._reset_key, self._exploration_key = jrandom.split(jrandom.PRNGKey(seed))
+        self._dones = np.ones(self._num_envs, dtype=bool)
+        self._curr_episodic_returns = np.zeros(self._num_envs)
+        self._curr_episode_lengths = np.zeros(self._num_envs, dtype=np.int64)
+        self._sub_env_episodic_returns = [[] for _ in range(self._num_envs)]
+        self._sub_env_episode_lengths = [[] for _ in range(self._num_envs)]
+
+    @property
+    def num_envs(self):
+        """The number of environment copies."""
+        return self._num_envs
+
+    @property
+    def sub_env_episodic_returns(self):
+        """All episodic returns, per environment copy."""
+        return self._sub_env_episodic_returns
+
+    @property
+    def sub_env_episode_lengths(self):
+        """All episode lengths, per environment copy."""
+        return self._sub_env_episode_lengths
+
+    @property
+    def latest_return(self):
+        """Latest episodic return."""
+        if len(self._episodic_returns):
+            return self._episodic_returns[-1]
+        return 0
+
+    @property
+    def latest_episode_length(self):
+        """Latest episode length."""
+        if len(self._episode_lengths):
+            return self._episode_lengths[-1]
+        return 0
+
+    def latest_average_return(self, num_episodes: int = 5) -> chex.Array:
+        """
+        Gets the average return of the last few completed episodes
+
+        :param num_episodes: the number of episodes to smooth over.
+        :type params: int:  (Default Value = 5)
+        :return: the average return over the last `num_episodes` episodes
+        :rtype: chex.Array
+
+        """
+        return np.mean(self._episodic_returns[-num_episodes:])
+
+    def latest_average_episode_length(self, num_episodes: int = 5) -> chex.Array:
+        """
+        Gets the average episode length of the last few completed episodes
+
+        :param num_episodes: the number of episodes to smooth over.
+        :type params: int int:  (Default Value = 5)
+        :return: the average episode length over the last `num_episodes` episodes
+        :rtype: chex.Array
+
+        """
+        return np.mean(self._episode_lengths[-num_episodes:])
+
+    def _reset_done_envs(self, policy: Policy):
+        """
+        Resets the environments with completed trajectories.
+
+        :param policy: the policy
+        :type policy: Policy
+
+        """
+        done_env_idxes = np.where(self._dones)[0]
+        if len(done_env_idxes) == 0:
+            return
+
+        seeds = np.array(
+            jrandom.randint(self._reset_key, (len(done_env_idxes),), 0, 2**16 - 1)
+        )
+        self._reset_key = jrandom.split(self._reset_key, 1)[0]
+        h_state = np.array(policy.reset())
+        for env_i, seed in zip(done_env_idxes, seeds):
+            obs, _ = self._envs[env_i].reset(seed=int(seed))
+            if self._curr_obs is None:
+                self._curr_obs = np.zeros(
+                    (self._num_envs, *np.shape(obs)), dtype=np.asarray(obs).dtype
+                )
+                self._curr_h_state = np.zeros(
+                    (self._num_envs, *h_state.shape), dtype=h_state.dtype
+                )
+            self._curr_obs[env_i] = obs
+            self._curr_h_state[env_i] = h_state
+        self._curr_episodic_returns[done_env_idxes] = 0
+        self._curr_episode_lengths[done_env_idxes] = 0
+        self._dones[done_env_idxes] = False
+
+    def rollout(
+        self,
+        params: Union[optax.Params, Dict[str, Any]],
+        policy: Policy,
+        obs_rms: Union[bool, RunningMeanStd],
+        buffer: ReplayBuffer,
+        num_steps: int,
+    ) -> Tuple[chex.Array, chex.Array]:
+        """
+        Executes the policy in the environments.
+        Each step interacts with every environment copy once, hence
+        `num_steps` must be a multiple of the number of environments.
+
+        :param params: the model parameters
+        :param policy: the policy
+        :param obs_rms: the running statistics for observations
+        :param buffer: the buffer
+        :param num_steps: the total number of interactions to have with the environments
+        :type params: Union[optax.Params, Dict[str, Any]]
+        :type policy: Policy
+        :type obs_rms: Union[bool, RunningMeanStd]
+        :type buffer: ReplayBuffer
+        :type num_steps: int
+        :return: the current observations and the current hidden states
+        :rtype: Tuple[chex.Array, chex.Array]
+
+        """
+        assert (
+            num_steps % self._num_envs == 0
+        ), "number of steps {} must be a multiple of number of environments {}".format(
+            num_steps, self._num_envs
+        )
+        obs_rms_state = obs_rms.rms_state if obs_rms else None
+        action_bounds = self._get_action_bounds()
+        for _ in range(num_steps // self._num_envs):
+            self._reset_done_envs(policy)
+
+            env_acts, acts, next_h_states, self._exploration_key = policy.step_action(
+                params,
+                self._curr_obs,
+                self._curr_h_state,
+                self._exploration_key,
+                obs_rms_state,
+                action_bounds,
+                batched=True,
+            )
+            env_acts = np.asarray(env_acts)
+            acts = np.asarray(acts)
+            next_h_states = np.array(next_h_states)
+
+            next_obss = np.zeros_like(self._curr_obs)
+            rews = np.zeros(self._num_envs)
+            terminateds = np.zeros(self._num_envs, dtype=bool)
+            truncateds = np.zeros(self._num_envs, dtype=bool)
+            step_infos = []
+            for env_i, env in enumerate(self._envs):
+                next_obs, rew, terminated, truncated, info = env.step(env_acts[env_i])
+                next_obss[env_i] = next_obs
+                rews[env_i] = info.get("shaped_reward", rew)
+                terminateds[env_i] = terminated
+                truncateds[env_i] = truncated
+                step_infos.append(info)
+
+                self._curr_episodic_returns[env_i] += float(rew)
+                self._curr_episode_lengths[env_i] += 1
+
+            self._dones = np.logical_or(terminateds, truncateds)
+            for env_i in np.where(self._dones)[0]:
+                episodic_return = float(self._curr_episodic_returns[env_i])
+                episode_length = int(self._curr_episode_lengths[env_i])
+                self._episodic_returns.append(episodic_return)
+                self._episode_lengths.append(episode_length)
+                self._sub_env_episodic_returns[env_i].append(episodic_return)
+                self._sub_env_episode_lengths[env_i].append(episode_length)
+
+            infos = {
+                info_name: np.array([info[info_name] for info in step_infos])
+                for info_name in step_infos[0]
+                if all(info_name in info for info in step_infos)
+            }
+
+            buffer.push_batch(
+                self._curr_obs,
+                self._curr_h_state,
+                acts,
+                rews,
+                terminateds,
+                truncateds,
+                infos,
+                next_obs=next_obss,
+                next_h_state=next_h_states,
+            )
+            self._curr_obs = next_obss
+            self._curr_h_state = next_h_states
+        return self._curr_obs, self._curr_h_state
@@ -148,7 +148,7 @@ class BC(SupervisedLearner):
                 self._config.batch_size
             )
             self.model_dict, aux = self.train_step(
-                self._model_dict, obss, h_states, acts_e
+                self._model_dict, *self._shard_batch(obss, h_states, acts_e)
             )
             total_update_time += timeit.default_timer() - tic
             assert np.isfinite(aux[CONST_AGG_LOSS]), f"Loss became NaN\naux: {aux}"
@@ -4,6 +4,7 @@ from typing import Any, Dict, Tuple
 import chex
 import flax
 import jax
+import jax.numpy as jnp
 import jax.random as jrandom
 import numpy as np
 import timeit
@@ -13,6 +14,7 @@ from jaxl.learners.learner import OfflineLearner
 from jaxl.learners.utils import gather_learning_rate
 from jaxl.losses import get_loss_function, make_aggregate_loss
 from jaxl.models import get_model, get_update_function
+from jaxl.models.transformers import InputEmbeddingCache
 from jaxl.optimizers import get_optimizer
 from jaxl.utils import parse_dict, l2_norm
 
@@ -39,7 +41,7 @@ class InContextLearner(OfflineLearner):
     ):
         super().__init__(config, model_config, optimizer_config)
         self._initialize_losses()
-        self.train_step = jax.jit(self.make_train_step())
+        self.train_step = self._jit_train_step(self.make_train_step())
 
         if getattr(model_config, "query_pred_only", False):
 
@@ -49,10 +51,49 @@ class InContextLearner(OfflineLearner):
         else:
 
             def construct_outputs(context_outputs, outputs):
-                return np.concatenate((context_outputs, outputs[:, None]), 1)
+                return jnp.concatenate((context_outputs, outputs[:, None]), 1)
 
         self.construct_outputs = construct_outputs
 
+        # Samples the batches with the dataset's vectorized sampler instead of the data loader
+        self._batch_sampler = getattr(config.dataset_config, "batch_sampler", False)
+        if self._batch_sampler:
+            # The context wrappers define sample_batch, which relies on the dataset's
+            assert hasattr(
+                self._buffer._dataset, "sample_batch"
+            ), f"{type(self._buffer._dataset).__name__} does not support batch sampling"
+            self._sample_rng = np.random.RandomState(config.seeds.data_seed)
+            num_classes = self._buffer.output_dim[-1]
+            self._to_one_hot = jax.jit(
+                lambda labels: jax.nn.one_hot(labels, num_classes)
+            )
+
+        # Gathers the precomputed input tokenizer embeddings by exemplar index
+        self._input_embedding_cache = None
+        if getattr(config, "input_embedding_cache", False):
+            assert self._batch_sampler, "input embedding cache requires batch_sampler"
+            assert hasattr(
+                self._buffer, "num_exemplars"
+            ), f"{type(self._buffer).__name__} does not provide exemplar indices"
+            assert optimizer_config.optimizer == CONST_FROZEN or (
+                CONST_INPUT_TOKENIZER in getattr(optimizer_config, CONST_MASK_NAMES, [])
+            ), "input embedding cache requires a frozen input tokenizer"
+            # The cache embeds in evaluation mode, whereas training would normalize
+            # with the batch statistics and update them
+            assert not getattr(
+                self._model.input_tokenizer, "use_batch_norm", False
+            ), "input embedding cache does not support batch norm in the input tokenizer"
+            assert not getattr(
+                getattr(config.dataset_config.dataset_kwargs, "task_config", None),
+                "augmentation",
+                False,
+            ), "input embedding cache does not support augmentation"
+            self._input_embedding_cache = InputEmbeddingCache(
+                self._model,
+                self._buffer.get_exemplars,
+                self._buffer.num_exemplars,
+            )
+
     def _initialize_model_and_opt(self, input_dim: chex.Array, output_dim: chex.Array):
         """
         Construct the model and the optimizer.
@@ -105,6 +146,7 @@ class InContextLearner(OfflineLearner):
             context_outputs,
             queries,
             outputs,
+            input_embeddings=None,
             *args,
             **kwargs,
         ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
@@ -116,6 +158,7 @@ class InContextLearner(OfflineLearner):
             :param context_outputs: the context inputs
             :param queries: the queries
             :param outputs: the outputs
+            :param input_embeddings: the precomputed input embeddings indexed by the inputs
             :param *args:
             :param **kwargs:
             :type model_dict: Dict[str, Any]
@@ -123,16 +166,21 @@ class InContextLearner(OfflineLearner):
             :type context_outputs: chex.Array
             :type queries: chex.Array
             :type outputs: chex.Array
+            :type input_embeddings: chex.Array:  (Default value = None)
             :return: the updated model state and optimizer state, and auxiliary information
             :rtype: Tuple[Dict[str, Any], Dict[str, Any]]
             """
+            contexts = {
+                CONST_CONTEXT_INPUT: context_inputs,
+                CONST_CONTEXT_OUTPUT: context_outputs,
+            }
+            if input_embeddings is not None:
+                contexts[CONST_INPUT_EMBEDDINGS] = input_embeddings
+
             (agg_loss, aux), grads = jax.value_and_grad(self._loss, has_aux=True)(
                 model_dict[CONST_MODEL],
                 queries,
-                {
-                    CONST_CONTEXT_INPUT: context_inputs,
-                    CONST_CONTEXT_OUTPUT: context_outputs,
-                },
+                contexts,
                 outputs,
             )
             aux[CONST_AGG_LOSS] = agg_loss
@@ -162,29 +210,58 @@ class InContextLearner(OfflineLearner):
         """
         auxes = []
         total_update_time = 0
+        input_embeddings = None
+        if self._input_embedding_cache is not None:
+            # The input tokenizer is frozen, so the embeddings are computed on the first
+            # epoch and never refreshed, hence no parameter version is given
+            params = self._model_dict[CONST_MODEL]
+            if self._mesh is not None:
+                # Computes the embeddings once on a single device instead of on every replica
+                params = jax.device_get(params)
+            input_embeddings = self._replicate(
+                self._input_embedding_cache.get_embeddings(params)
+            )
+
         for _ in range(self._num_updates_per_epoch):
             tic = timeit.default_timer()
             auxes.append({})
-            try:
-                data = next(self._train_loader)
-            except StopIteration:
-                self._train_loader = iter(self._train_dataloader)
-                data = next(self._train_loader)
-
-            context_inputs = data["context_inputs"]
-            context_outputs = data["context_outputs"]
-            queries = data["queries"]
-            outputs = data["outputs"]
-
-            if hasattr(context_inputs, "numpy"):
-                context_inputs = context_inputs.numpy()
-                context_outputs = context_outputs.numpy()
-                queries = queries.numpy()
-                outputs = outputs.numpy()
+            if self._batch_sampler:
+                batch_idxes = self._sample_rng.randint(
+                    len(self._buffer), size=self._config.batch_size
+                )
+                if input_embeddings is None:
+                    data = self._buffer.sample_batch(batch_idxes)
+                    context_inputs = data["context_inputs"]
+                    queries = data["queries"]
+                else:
+                    data = self._buffer.sample_batch(batch_idxes, include_inputs=False)
+                    context_inputs = data["context_exemplar_idxes"]
+                    queries = data["query_exemplar_idxes"]
+                context_outputs = self._to_one_hot(data["context_labels"])
+                outputs = self._to_one_hot(data["labels"])
+            else:
+                try:
+                    data = next(self._train_loader)
+                except StopIteration:
+                    self._train_loader = iter(self._train_dataloader)
+                    data = next(self._train_loader)
+
+                context_inputs = data["context_inputs"]
+                context_outputs = data["context_outputs"]
+                queries = data["queries"]
+                outputs = data["outputs"]
+
+                if hasattr(context_inputs, "numpy"):
+                    context_inputs = context_inputs.numpy()
+                    context_outputs = context_outputs.numpy()
+                    queries = queries.numpy()
+                    outputs = outputs.numpy()
             outputs = self.construct_outputs(context_outputs, outputs)
 
             self.model_dict, aux = self.train_step(
-                self._model_dict, context_inputs, context_outputs, queries, outputs
+                self._model_dict,
+                *self._shard_batch(context_inputs, context_outputs, queries, outputs),
+                input_embeddings,
             )
 
             total_update_time += timeit.default_timer() - tic
@@ -212,6 +289,10 @@ class InContextLearner(OfflineLearner):
         else:
             gather_learning_rate(aux, CONST_MODEL, self._model_dict[CONST_OPT_STATE])
 
+        if input_embeddings is not None:
+            context_inputs = self._buffer.get_exemplars(context_inputs)
+            queries = self._buffer.get_exemplars(queries)
+
         aux[CONST_DATA] = [
             context_inputs,
             context_outputs,
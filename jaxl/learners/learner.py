@@ -1,10 +1,12 @@
 from abc import ABC
+from jax.sharding import Mesh, NamedSharding, PartitionSpec
 from torch.utils.data import DataLoader
 from types import SimpleNamespace
-from typing import Any, Callable, Dict, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
 
 import dill
 import chex
+import jax
 import numpy as np
 import optax
 
@@ -109,6 +111,12 @@ class Learner(ABC):
         """
         pass
 
+    def close(self):
+        """
+        Releases the resources held by the learner once training is done.
+        """
+        pass
+
     def save_buffer(self, checkpoint_path: str):
         """
         Saves the buffer.
@@ -176,6 +184,12 @@ class OfflineLearner(Learner):
     #: The number of gradient steps per update call.
     _num_updates_per_epoch: int
 
+    #: The device mesh for data-parallel training, if any.
+    _mesh: Optional[Mesh]
+
+    #: The axis of the batch dimension within the sampled arrays.
+    _batch_axis: int = 0
+
     def __init__(
         self,
         config: SimpleNamespace,
@@ -184,10 +198,102 @@ class OfflineLearner(Learner):
     ):
         super().__init__(config, model_config, optimizer_config)
 
+        # The mesh is validated before the buffer and the model are constructed
+        self._initialize_mesh()
         self._initialize_buffer()
         self._initialize_model_and_opt(self._buffer.input_dim, self._buffer.output_dim)
+        self._model_dict = self._replicate(self._model_dict)
         self._num_updates_per_epoch = self._config.num_updates_per_epoch
 
+    def _initialize_mesh(self):
+        """
+        Construct the device mesh for data-parallel training.
+        The batches are sharded over the data axis while the model states are replicated,
+        such that the gradients are all-reduced within the compiled training step.
+        """
+        self._mesh = None
+        num_devices = getattr(self._config, CONST_NUM_DEVICES, 1)
+        if num_devices == 1:
+            return
+
+        devices = jax.devices()
+        assert (
+            0 < num_devices <= len(devices)
+        ), f"num_devices should be between 1 and {len(devices)}, got {num_devices}"
+        assert (
+            self._config.batch_size % num_devices == 0
+        ), f"batch_size {self._config.batch_size} should be divisible by {num_devices} devices"
+        self._mesh = Mesh(np.array(devices[:num_devices]), (CONST_DATA_AXIS,))
+
+    def _replicate(self, tree: Any) -> Any:
+        """
+        Replicates a PyTree across the devices of the mesh.
+
+        :param tree: the PyTree to replicate
+        :type tree: Any
+        :return: the replicated PyTree
+        :rtype: Any
+
+        """
+        if self._mesh is None:
+            return tree
+        return jax.device_put(tree, NamedSharding(self._mesh, PartitionSpec()))
+
+    def _shard_batch(self, *batch: Iterable[chex.Array]) -> Iterable[chex.Array]:
+        """
+        Shards the batch dimension of the arrays across the devices of the mesh.
+
+        :param *batch: the arrays of the batch
+        :type *batch: Iterable[chex.Array]
+        :return: the sharded arrays
+        :rtype: Iterable[chex.Array]
+
+        """
+        if self._mesh is None:
+            return batch
+
+        num_devices = self._mesh.devices.size
+        sharding = NamedSharding(
+            self._mesh, PartitionSpec(*([None] * self._batch_axis), CONST_DATA_AXIS)
+        )
+        sharded_batch = []
+        for arr in batch:
+            batch_size = arr.shape[self._batch_axis]
+            assert (
+                batch_size % num_devices == 0
+            ), f"batch size {batch_size} should be divisible by {num_devices} devices"
+            sharded_batch.append(jax.device_put(arr, sharding))
+        return sharded_batch
+
+    def _jit_train_step(self, train_step: Callable) -> Callable:
+        """
+        Compiles the training step.
+        Under data-parallel training, the outputs are replicated across the devices of the mesh.
+
+        :param train_step: the training step
+        :type train_step: Callable
+        :return: the compiled training step
+        :rtype: Callable
+
+        """
+        if self._mesh is None:
+            return jax.jit(train_step)
+        return jax.jit(
+            train_step,
+            out_shardings=NamedSharding(self._mesh, PartitionSpec()),
+        )
+
+    def load_checkpoint(self, params: Dict[str, Any]):
+        """
+        Loads a model state from a saved checkpoint.
+
+        :param params: the checkpointed parameters
+        :type params: Dict[str, Any]
+
+        """
+        super().load_checkpoint(params)
+        self._model_dict = self._replicate(self._model_dict)
+
     def _initialize_buffer(self):
         """
         Construct the buffer
@@ -201,6 +307,9 @@ class OfflineLearner(Learner):
                 self._config.dataset_config,
                 self._config.seeds.data_seed,
             )
+            if getattr(self._config.dataset_config, "batch_sampler", False):
+                # The learner samples batches from the dataset directly
+                return
             self._train_dataloader = self._buffer.get_dataloader(
                 self._config,
             )
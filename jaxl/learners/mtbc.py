@@ -2,7 +2,6 @@ from types import SimpleNamespace
 from typing import Any, Dict, Tuple, Union
 
 import chex
-import dill
 import jax
 import jax.numpy as jnp
 import jax.random as jrandom
@@ -11,7 +10,8 @@ import numpy as np
 import os
 import timeit
 
-from jaxl.buffers import get_buffer
+from jaxl.buffers import get_buffer, MultitaskNumPyBuffer
+from jaxl.checkpoint_utils import list_checkpoints, load_checkpoint
 from jaxl.constants import *
 from jaxl.learners.learner import OfflineLearner
 from jaxl.losses import get_loss_function, make_aggregate_loss
@@ -41,6 +41,12 @@ class MTBC(OfflineLearner):
     #: Number of tasks
     _num_tasks: int
 
+    #: The container that samples from all task buffers at once.
+    _multitask_buffer: MultitaskNumPyBuffer
+
+    #: The samples are stacked along the leading task axis.
+    _batch_axis: int = 1
+
     def __init__(
         self,
         config: SimpleNamespace,
@@ -106,9 +112,9 @@ class MTBC(OfflineLearner):
 
             """
 
-            reps, _ = jax.vmap(self._model.encode, in_axes=[None, 0, 0])(
-                model_dicts[CONST_ENCODER], obss, h_states
-            )
+            reps, _, encoder_updates = jax.vmap(
+                self._model.encode, in_axes=[None, 0, 0]
+            )(model_dicts[CONST_ENCODER], obss, h_states)
 
             bc_loss, bc_aux = jax.vmap(self._pi_loss)(
                 model_dicts[CONST_PREDICTOR],
@@ -119,10 +125,21 @@ class MTBC(OfflineLearner):
 
             agg_loss = jnp.mean(bc_loss)
 
+            # The encoder is shared across tasks, thus we average its batch statistics
+            bc_aux[CONST_ENCODER] = jax.tree_util.tree_map(
+                lambda x: jnp.mean(x, axis=0), encoder_updates
+            )
+
             return agg_loss, bc_aux
 
         self._loss = loss
-        self.train_step = jax.jit(self.make_train_step())
+        self.train_step = self._jit_train_step(self.make_train_step())
+
+    def close(self):
+        """
+        Stops the prefetching thread of the multitask buffer.
+        """
+        self._multitask_buffer.close()
 
     @property
     def num_tasks(self):
@@ -179,6 +196,12 @@ class MTBC(OfflineLearner):
                 output_dims[:-1] == output_dims[1:]
             ), "We assume the action space to be the same for all tasks."
 
+        self._multitask_buffer = MultitaskNumPyBuffer(
+            self._buffers,
+            rng=np.random.RandomState(self._config.seeds.buffer_seed),
+            prefetch=getattr(self._config, "prefetch", False),
+        )
+
     def _initialize_model_and_opt(self, input_dim: chex.Array, output_dim: chex.Array):
         """
         Construct the model and the optimizer.
@@ -204,9 +227,13 @@ class MTBC(OfflineLearner):
 
         encoder_path = getattr(self._config, "load_encoder", False)
         if encoder_path:
-            all_steps = sorted(os.listdir(self._config.load_encoder))
-            all_params = dill.load(
-                open(os.path.join(self._config.load_encoder, all_steps[-1]), "rb")
+            all_steps = list_checkpoints(self._config.load_encoder)
+            all_params = load_checkpoint(
+                os.path.join(self._config.load_encoder, all_steps[-1]),
+                [
+                    f"{CONST_MODEL_DICT}/{CONST_MODEL}/{CONST_POLICY}/{CONST_ENCODER}",
+                    CONST_OBS_RMS,
+                ],
             )
             params[CONST_ENCODER] = all_params[CONST_MODEL_DICT][CONST_MODEL][
                 CONST_POLICY
@@ -275,7 +302,12 @@ class MTBC(OfflineLearner):
                 grads,
                 model_dict[CONST_OPT_STATE][CONST_POLICY],
                 model_dict[CONST_MODEL][CONST_POLICY],
-                aux[self._config.losses[0]][CONST_AUX][CONST_UPDATES],
+                {
+                    CONST_ENCODER: aux.pop(CONST_ENCODER),
+                    CONST_PREDICTOR: aux[self._config.losses[0]][CONST_AUX][
+                        CONST_UPDATES
+                    ],
+                },
             )
 
             return {
@@ -301,24 +333,13 @@ class MTBC(OfflineLearner):
         for _ in range(self._num_updates_per_epoch):
             tic = timeit.default_timer()
             auxes.append({})
-            all_obss = []
-            all_h_states = []
-            all_acts = []
-
-            for buffer in self._buffers:
-                obss, h_states, acts, _, _, _, _, _, _, _ = buffer.sample(
-                    self._config.batch_size
-                )
-                all_obss.append(obss)
-                all_h_states.append(h_states)
-                all_acts.append(acts)
-
-            all_obss = np.stack(all_obss)
-            all_h_states = np.stack(all_h_states)
-            all_acts = np.stack(all_acts)
+            all_obss, all_h_states, all_acts = self._multitask_buffer.sample(
+                self._config.batch_size
+            )
 
             self.model_dict, aux = self.train_step(
-                self._model_dict, all_obss, all_h_states, all_acts
+                self._model_dict,
+                *self._shard_batch(all_obss, all_h_states, all_acts),
             )
             total_update_time += timeit.default_timer() - tic
             assert np.isfinite(aux[CONST_AGG_LOSS]), f"Loss became NaN\naux: {aux}"
@@ -2,7 +2,6 @@ from types import SimpleNamespace
 from typing import Any, Dict, Tuple
 
 import chex
-import dill
 import jax
 import jax.numpy as jnp
 import jax.random as jrandom
@@ -11,6 +10,7 @@ import optax
 import os
 import timeit
 
+from jaxl.checkpoint_utils import list_checkpoints, load_checkpoint
 from jaxl.constants import *
 from jaxl.learners.reinforcement import OnPolicyLearner
 from jaxl.losses.reinforcement import (
@@ -205,6 +205,7 @@ class PPO(OnPolicyLearner):
 
         self._joint_loss = joint_loss
         self.joint_step = jax.jit(self.make_joint_step())
+        self.fused_update = jax.jit(self.make_fused_update())
 
     @property
     def policy(self):
@@ -242,14 +243,9 @@ class PPO(OnPolicyLearner):
         vf_params = self._model[CONST_VF].init(model_keys[1], dummy_x)
 
         if getattr(self._config, "load_pretrain", False):
-            all_steps = sorted(os.listdir(self._config.load_pretrain.checkpoint_path))
-            all_params = dill.load(
-                open(
-                    os.path.join(
-                        self._config.load_pretrain.checkpoint_path, all_steps[-1]
-                    ),
-                    "rb",
-                )
+            all_steps = list_checkpoints(self._config.load_pretrain.checkpoint_path)
+            all_params = load_checkpoint(
+                os.path.join(self._config.load_pretrain.checkpoint_path, all_steps[-1])
             )
             if CONST_POLICY in self._config.load_pretrain.load_components:
                 pi_params = all_params[CONST_MODEL_DICT][CONST_MODEL][CONST_POLICY]
@@ -375,6 +371,108 @@ class PPO(OnPolicyLearner):
 
         return _joint_step
 
+    def make_fused_update(self):
+        """
+        Makes the update that runs every minibatch step of the optimization epochs
+        within a single ``jax.lax.scan``.
+        Early stopping on the approximate KL is handled by masking the remaining steps.
+        """
+
+        joint_step = self.make_joint_step()
+        opt_epochs = self._opt_epochs
+        opt_batch_size = self._opt_batch_size
+        kl_threshold = self._kl_threshold
+        update_before_early_stopping = self._update_before_early_stopping
+
+        def _fused_update(
+            model_dict: Dict[str, Any],
+            obss: chex.Array,
+            h_states: chex.Array,
+            acts: chex.Array,
+            rets: chex.Array,
+            advs: chex.Array,
+            vals: chex.Array,
+            old_lprobs: chex.Array,
+            ent_coef: float,
+            sample_idxes: chex.Array,
+        ) -> Tuple[Dict[str, Any], Dict[str, Any], chex.Array, chex.Array]:
+            """
+            The scanned training steps over the minibatches.
+
+            :param model_dict: the actor and critic states and their optimizers state
+            :param obss: the training observations
+            :param h_states: the training hidden states for memory-based models
+            :param acts: the training actions
+            :param rets: the Monte-Carlo returns
+            :param advs: the advantages
+            :param vals: the predicted values from the critic
+            :param old_lprobs: the action log probabilities
+            :param ent_coef: the entropy coefficient
+            :param sample_idxes: the concatenated permutations of the sample indices
+            :type model_dict: Dict[str, Any]
+            :type obss: chex.Array
+            :type h_states: chex.Array
+            :type acts: chex.Array
+            :type rets: chex.Array
+            :type advs: chex.Array
+            :type vals: chex.Array
+            :type old_lprobs: chex.Array
+            :type ent_coef: float
+            :type sample_idxes: chex.Array
+            :return: the updated states, the stacked auxiliary information,
+                whether each step is executed, and the number of applied updates
+            :rtype: Tuple[Dict[str, Any], Dict[str, Any], chex.Array, chex.Array]
+
+            """
+            minibatch_idxes = sample_idxes[: opt_epochs * opt_batch_size].reshape(
+                (opt_epochs, opt_batch_size)
+            )
+
+            def step(carry, idxes):
+                model_dict, stopped = carry
+                next_model_dict, aux = joint_step(
+                    model_dict,
+                    obss[idxes],
+                    h_states[idxes],
+                    acts[idxes],
+                    rets[idxes],
+                    advs[idxes],
+                    vals[idxes],
+                    old_lprobs[idxes],
+                    ent_coef,
+                )
+                approx_reverse_kl = jnp.mean(
+                    old_lprobs[idxes] - aux[CONST_POLICY][CONST_LOG_PROBS]
+                )
+                aux[CONST_REVERSE_KL] = approx_reverse_kl
+
+                stop_update = False
+                if kl_threshold:
+                    stop_update = approx_reverse_kl > kl_threshold
+                apply_update = jnp.logical_and(
+                    jnp.logical_not(stopped),
+                    jnp.logical_or(
+                        jnp.logical_not(stop_update), update_before_early_stopping
+                    ),
+                )
+                model_dict = jax.tree_util.tree_map(
+                    lambda new, old: jnp.where(apply_update, new, old),
+                    next_model_dict,
+                    model_dict,
+                )
+                return (model_dict, jnp.logical_or(stopped, stop_update)), (
+                    aux,
+                    jnp.logical_not(stopped),
+                    apply_update,
+                )
+
+            (model_dict, _), (auxes, executed, applied) = jax.lax.scan(
+                step, (model_dict, jnp.array(False)), minibatch_idxes
+            )
+            return model_dict, auxes, executed, jnp.sum(applied)
+
+        return _fused_update
+
     def update(self, *args, **kwargs) -> Dict[str, Any]:
         """
         Updates the actor and the critic.
@@ -389,7 +487,6 @@ class PPO(OnPolicyLearner):
         auxes = []
         total_rollout_time = 0
         total_update_time = 0
-        stop_update = False
 
         carried_steps = self._global_step % self._update_frequency
         num_update_steps = (
@@ -459,7 +556,6 @@ class PPO(OnPolicyLearner):
                 self._model_dict[CONST_MODEL][CONST_POLICY], obss, h_states, acts
             )
 
-            auxes_per_epoch = []
             curr_sample_keys = jrandom.split(self._sample_key, num=self._opt_epochs + 1)
 
             self._sample_key = curr_sample_keys[0]
@@ -469,52 +565,36 @@ class PPO(OnPolicyLearner):
             sample_idxes = jax.vmap(jrandom.permutation, in_axes=[0, None])(
                 permutation_keys, self._sample_idxes
             ).flatten()
-            for opt_i in range(self._opt_epochs):
-                minibatch_idxes = sample_idxes[
-                    opt_i * self._opt_batch_size : (opt_i + 1) * self._opt_batch_size
-                ]
-                next_model_dict, aux = self.joint_step(
-                    self._model_dict,
-                    obss[minibatch_idxes],
-                    h_states[minibatch_idxes],
-                    acts[minibatch_idxes],
-                    rets[minibatch_idxes],
-                    advs[minibatch_idxes],
-                    vals[minibatch_idxes],
-                    old_lprobs[minibatch_idxes],
-                    self._ent_coef(self._num_updates),
-                )
-                approx_reverse_kl = np.mean(
-                    old_lprobs[minibatch_idxes] - aux[CONST_POLICY][CONST_LOG_PROBS]
-                )
-                stop_update = (
-                    self._kl_threshold and approx_reverse_kl > self._kl_threshold
-                )
-
-                aux[CONST_REVERSE_KL] = approx_reverse_kl
-                assert np.isfinite(aux[CONST_AGG_LOSS]), f"Loss became NaN\naux: {aux}"
-                auxes_per_epoch.append(aux)
-
-                # Stop update due to approximate KL
-                if stop_update:
-                    if self._update_before_early_stopping:
-                        self.model_dict = next_model_dict
-                        opt_i += 1
-                    break
-                else:
-                    self.model_dict = next_model_dict
-            else:
-                opt_i += 1
+            self.model_dict, auxes_per_epoch, executed, opt_i = self.fused_update(
+                self._model_dict,
+                obss,
+                h_states,
+                acts,
+                rets,
+                advs,
+                vals,
+                old_lprobs,
+                self._ent_coef(self._num_updates),
+                sample_idxes,
+            )
+            (auxes_per_epoch, executed, opt_i) = jax.device_get(
+                (auxes_per_epoch, executed, opt_i)
+            )
+            assert np.all(
+                np.isfinite(auxes_per_epoch[CONST_AGG_LOSS][executed])
+            ), f"Loss became NaN\naux: {auxes_per_epoch}"
+            aux = jax.tree_util.tree_map(lambda x: x[executed][-1], auxes_per_epoch)
 
             total_update_time += timeit.default_timer() - tic
 
-            auxes[-1][CONST_NUM_UPDATES] = opt_i
+            auxes[-1][CONST_NUM_UPDATES] = opt_i.item()
             auxes[-1][CONST_RETURNS] = rets.mean().item()
             auxes[-1][CONST_VALUES] = vals.mean().item()
             auxes[-1][CONST_ADVANTAGES] = advs.mean().item()
 
+            # Only the steps up to early stopping contribute to the statistics
             auxes_per_epoch = jax.tree_util.tree_map(
-                lambda *args: np.mean(args), *auxes_per_epoch
+                lambda x: np.mean(x[executed]), auxes_per_epoch
             )
             auxes[-1][CONST_AUX] = auxes_per_epoch
             auxes[-1][CONST_ACTION] = {
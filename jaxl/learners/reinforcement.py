@@ -6,7 +6,8 @@ from types import SimpleNamespace
 from typing import Any, Dict, Union
 
 from jaxl.constants import *
-from jaxl.envs.rollouts import Rollout, StandardRollout
+from jaxl.envs import get_environment
+from jaxl.envs.rollouts import Rollout, StandardRollout, VectorizedRollout
 from jaxl.learners.learner import OnlineLearner
 from jaxl.utils import RunningMeanStd
 
@@ -231,7 +232,8 @@ class OffPolicyLearner(ReinforcementLearner):
     _batch_size: int
 
     #: Uses purely the policy to interact with the environment.
-    _rollout: StandardRollout
+    #: Steps multiple environment copies in lockstep when `num_envs > 1`.
+    _rollout: Union[StandardRollout, VectorizedRollout]
 
     def __init__(
         self,
@@ -242,4 +244,35 @@ class OffPolicyLearner(ReinforcementLearner):
         super().__init__(config, model_config, optimizer_config)
         self._update_frequency = self._config.update_frequency
         self._batch_size = self._config.batch_size
-        self._rollout = StandardRollout(self._env, self._config.seeds.env_seed)
+
+        num_envs = getattr(self._config, CONST_NUM_ENVS, 1)
+        if num_envs > 1:
+            assert (
+                self._update_frequency % num_envs == 0
+            ), "update frequency {} must be a multiple of number of environments {}".format(
+                self._update_frequency, num_envs
+            )
+            buffer_warmup = getattr(self._config, "buffer_warmup", 0)
+            assert (
+                buffer_warmup % num_envs == 0
+            ), "buffer warmup {} must be a multiple of number of environments {}".format(
+                buffer_warmup, num_envs
+            )
+            # The transitions of the environment copies are interleaved in the buffer
+            assert self._config.buffer_config.buffer_type not in [
+                CONST_MEMORY_EFFICIENT,
+                CONST_TRAJECTORY,
+            ], "{} buffer requires consecutive transitions, which is incompatible with {} > 1".format(
+                self._config.buffer_config.buffer_type, CONST_NUM_ENVS
+            )
+            assert (
+                getattr(self._buffer, BURN_IN_WINDOW, 0) == 0
+            ), "{} requires consecutive transitions, which is incompatible with {} > 1".format(
+                BURN_IN_WINDOW, CONST_NUM_ENVS
+            )
+            envs = [self._env] + [
+                get_environment(self._config.env_config) for _ in range(num_envs - 1)
+            ]
+            self._rollout = VectorizedRollout(envs, self._config.seeds.env_seed)
+        else:
+            self._rollout = StandardRollout(self._env, self._config.seeds.env_seed)
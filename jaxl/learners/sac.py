@@ -1,13 +1,16 @@
 from types import SimpleNamespace
-from typing import Any, Dict, Tuple, Sequence
+from typing import Any, Callable, Dict, Optional, Tuple, Sequence
 
 import chex
 import jax
+import jax.numpy as jnp
 import jax.random as jrandom
 import numpy as np
 import optax
 import timeit
 
+from jaxl.buffers.jax_buffers import NextStateJAXBuffer, sample_with_next_obs
+from jaxl.buffers.prioritized_buffers import PrioritizedReplayBuffer
 from jaxl.constants import *
 from jaxl.learners.reinforcement import OffPolicyLearner
 from jaxl.losses.reinforcement import (
@@ -72,6 +75,318 @@ TEMP_LOG_KEYS = [
 ]
 
 
+def make_scan_update(
+    qf_step: Callable,
+    pi_step: Callable,
+    temp_step: Optional[Callable],
+    update_target_model: Optional[Callable],
+    actor_update_frequency: int,
+    target_update_frequency: int,
+) -> Callable:
+    """
+    Makes the update that runs multiple critic, target, actor, and temperature
+    updates within a single ``jax.lax.scan``.
+    The auxiliary information is reduced on device.
+
+    :param qf_step: the training step for the critic update
+    :param pi_step: the training step for the actor update
+    :param temp_step: the training step for the temperature update, if any
+    :param update_target_model: the target model update, if any
+    :param actor_update_frequency: the number of critic updates per actor update
+    :param target_update_frequency: the number of critic updates per target update
+    :type qf_step: Callable
+    :type pi_step: Callable
+    :type temp_step: Optional[Callable]
+    :type update_target_model: Optional[Callable]
+    :type actor_update_frequency: int
+    :type target_update_frequency: int
+    :return: the scanned update
+    :rtype: Callable
+
+    """
+
+    def set_model(
+        model_dict: Dict[str, Any], model_key: str, sub_model_dict: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        return {
+            CONST_MODEL: {
+                **model_dict[CONST_MODEL],
+                model_key: sub_model_dict[CONST_MODEL],
+            },
+            CONST_OPT_STATE: {
+                **model_dict[CONST_OPT_STATE],
+                model_key: sub_model_dict[CONST_OPT_STATE],
+            },
+        }
+
+    def update_actor(
+        model_dict: Dict[str, Any],
+        obss: chex.Array,
+        h_states: chex.Array,
+        pi_keys: jrandom.PRNGKey,
+        temp_keys: jrandom.PRNGKey,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        pi_model_dict, pi_aux = pi_step(model_dict, obss, h_states, pi_keys)
+        model_dict = set_model(model_dict, CONST_POLICY, pi_model_dict)
+        aux = {
+            CONST_POLICY: {
+                key: pi_aux[key]
+                for key in [CONST_AGG_LOSS, CONST_GRAD_NORM, *PI_LOG_KEYS]
+            }
+        }
+
+        if temp_step is not None:
+            temp_model_dict, temp_aux = temp_step(model_dict, obss, h_states, temp_keys)
+            model_dict = set_model(model_dict, CONST_TEMPERATURE, temp_model_dict)
+            aux[CONST_TEMPERATURE] = {
+                key: temp_aux[key]
+                for key in [CONST_AGG_LOSS, CONST_GRAD_NORM, *TEMP_LOG_KEYS]
+            }
+        return model_dict, aux
+
+    def skip_actor(
+        model_dict: Dict[str, Any],
+        obss: chex.Array,
+        h_states: chex.Array,
+        pi_keys: jrandom.PRNGKey,
+        temp_keys: jrandom.PRNGKey,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        aux_shape = jax.eval_shape(
+            update_actor, model_dict, obss, h_states, pi_keys, temp_keys
+        )[1]
+        return model_dict, jax.tree_util.tree_map(
+            lambda x: jnp.zeros(x.shape, x.dtype), aux_shape
+        )
+
+    def update_step(
+        carry: Tuple[Dict[str, Any], chex.Array],
+        batch: Tuple[chex.Array, ...],
+    ) -> Tuple[Tuple[Dict[str, Any], chex.Array], Dict[str, Any]]:
+        model_dict, num_qf_updates = carry
+        (
+            obss,
+            h_states,
+            acts,
+            rews,
+            terminateds,
+            next_obss,
+            next_h_states,
+            importance_weights,
+            keys,
+        ) = batch
+
+        qf_model_dict, qf_aux = qf_step(
+            model_dict,
+            obss,
+            h_states,
+            acts,
+            rews,
+            terminateds,
+            next_obss,
+            next_h_states,
+            keys[0],
+            importance_weights,
+        )
+        model_dict = set_model(model_dict, CONST_QF, qf_model_dict)
+        num_qf_updates = num_qf_updates + 1
+
+        if update_target_model is not None:
+            model_dict[CONST_MODEL][CONST_TARGET_QF] = jax.lax.cond(
+                num_qf_updates % target_update_frequency == 0,
+                update_target_model,
+                lambda model_dict: model_dict[CONST_MODEL][CONST_TARGET_QF],
+                model_dict,
+            )
+
+        actor_updated = num_qf_updates % actor_update_frequency == 0
+        model_dict, actor_aux = jax.lax.cond(
+            actor_updated,
+            update_actor,
+            skip_actor,
+            model_dict,
+            obss,
+            h_states,
+            keys[1],
+            keys[2],
+        )
+
+        abs_acts = jnp.abs(acts).reshape((-1, acts.shape[-1]))
+        aux = {
+            CONST_QF: {
+                key: qf_aux[key]
+                for key in [CONST_AGG_LOSS, CONST_GRAD_NORM, *QF_LOG_KEYS]
+            },
+            CONST_ACTION: {
+                CONST_SATURATION: jnp.max(abs_acts, axis=0),
+                CONST_MEAN: jnp.mean(abs_acts, axis=0),
+            },
+            CONST_TD_ERROR: qf_aux[CONST_TD_ERROR],
+            CONST_UPDATES: actor_updated,
+            **actor_aux,
+        }
+        return (model_dict, num_qf_updates), aux
+
+    def scan_update(
+        model_dict: Dict[str, Any],
+        num_qf_updates: int,
+        obss: chex.Array,
+        h_states: chex.Array,
+        acts: chex.Array,
+        rews: chex.Array,
+        terminateds: chex.Array,
+        next_obss: chex.Array,
+        next_h_states: chex.Array,
+        key: jrandom.PRNGKey,
+        importance_weights: Optional[chex.Array] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Runs one update per minibatch, where every minibatch is stacked
+        along the leading axis.
+        The per-sample TD errors of every minibatch are kept in the auxiliary information.
+
+        :param model_dict: the model state and optimizer state
+        :param num_qf_updates: the number of critic updates so far
+        :param obss: current observations
+        :param h_states: current hidden states
+        :param acts: actions taken for current observations
+        :param rews: received rewards
+        :param terminateds: whether or not the episode is terminated
+        :param next_obss: next observations
+        :param next_h_states: next hidden states
+        :param key: random key for sampling actions
+        :param importance_weights: the importance sampling weights of the samples
+        :type model_dict: Dict[str, Any]
+        :type num_qf_updates: int
+        :type obss: chex.Array
+        :type h_states: chex.Array
+        :type acts: chex.Array
+        :type rews: chex.Array
+        :type terminateds: chex.Array
+        :type next_obss: chex.Array
+        :type next_h_states: chex.Array
+        :type key: jrandom.PRNGKey
+        :type importance_weights: Optional[chex.Array]:  (Default value = None)
+        :return: the updated model state and optimizer state, and
+                 auxiliary information averaged over the updates
+        :rtype: Tuple[Dict[str, Any], Dict[str, Any]]
+
+        """
+        num_updates = obss.shape[0]
+        keys = jrandom.split(key, num=num_updates * 3).reshape((num_updates, 3, -1))
+        (model_dict, _), auxes = jax.lax.scan(
+            update_step,
+            (model_dict, num_qf_updates),
+            (
+                obss,
+                h_states,
+                acts,
+                rews,
+                terminateds,
+                next_obss,
+                next_h_states,
+                importance_weights,
+                keys,
+            ),
+        )
+
+        td_errors = auxes.pop(CONST_TD_ERROR)
+        actor_updated = auxes.pop(CONST_UPDATES)
+        num_actor_updates = jnp.sum(actor_updated)
+        aux = jax.tree_util.tree_map(
+            lambda x: jnp.mean(x, axis=0),
+            {
+                CONST_QF: auxes.pop(CONST_QF),
+                CONST_ACTION: auxes.pop(CONST_ACTION),
+            },
+        )
+        aux.update(
+            jax.tree_util.tree_map(
+                lambda x: jnp.sum(x, axis=0) / jnp.maximum(num_actor_updates, 1),
+                auxes,
+            )
+        )
+        aux[CONST_UPDATES] = num_actor_updates
+        aux[CONST_TD_ERROR] = td_errors
+        return model_dict, aux
+
+    return scan_update
+
+
+def make_sample_and_scan_update(scan_update: Callable, batch_size: int) -> Callable:
+    """
+    Makes the update that samples the minibatches from an on-device buffer
+    and runs the scanned update.
+
+    :param scan_update: the scanned update
+    :param batch_size: the batch size of each minibatch
+    :type scan_update: Callable
+    :type batch_size: int
+    :return: the update with on-device sampling
+    :rtype: Callable
+
+    """
+
+    def sample_and_scan_update(
+        model_dict: Dict[str, Any],
+        num_qf_updates: int,
+        buffer_state: Dict[str, Any],
+        sample_keys: chex.Array,
+        key: jrandom.PRNGKey,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Samples one minibatch per sample key and runs the scanned update.
+
+        :param model_dict: the model state and optimizer state
+        :param num_qf_updates: the number of critic updates so far
+        :param buffer_state: the buffer state
+        :param sample_keys: random keys for sampling the minibatches
+        :param key: random key for sampling actions
+        :type model_dict: Dict[str, Any]
+        :type num_qf_updates: int
+        :type buffer_state: Dict[str, Any]
+        :type sample_keys: chex.Array
+        :type key: jrandom.PRNGKey
+        :return: the updated model state and optimizer state, and
+                 auxiliary information averaged over the updates
+        :rtype: Tuple[Dict[str, Any], Dict[str, Any]]
+
+        """
+        (
+            obss,
+            h_states,
+            acts,
+            rews,
+            _,
+            terminateds,
+            _,
+            next_obss,
+            next_h_states,
+            _,
+            _,
+            _,
+        ) = jax.vmap(
+            lambda sample_key: sample_with_next_obs(
+                buffer_state, sample_key, batch_size
+            )
+        )(
+            sample_keys
+        )
+        return scan_update(
+            model_dict,
+            num_qf_updates,
+            obss,
+            h_states,
+            acts,
+            rews,
+            terminateds,
+            next_obss,
+            next_h_states,
+            key,
+        )
+
+    return sample_and_scan_update
+
+
 class SAC(OffPolicyLearner):
     """
     Soft Actor Critic (SAC) algorithm. This extends `OffPolicyLearner`.
@@ -109,6 +424,20 @@ class SAC(OffPolicyLearner):
         self.polyak_average = polyak_average_generator(config.tau)
         self.update_target_model = jax.jit(self.make_update_target_model())
 
+        self._utd_ratio = getattr(config, CONST_UTD_RATIO, 1)
+        scan_update = make_scan_update(
+            self.qf_step,
+            self.pi_step,
+            self.temp_step if self._target_entropy is not None else None,
+            self.update_target_model,
+            self._actor_update_frequency,
+            self._target_update_frequency,
+        )
+        self.scan_update = jax.jit(scan_update)
+        self.sample_and_scan_update = jax.jit(
+            make_sample_and_scan_update(scan_update, self._batch_size)
+        )
+
     @property
     def policy(self):
         """
@@ -273,6 +602,7 @@ class SAC(OffPolicyLearner):
             next_obss: chex.Array,
             next_h_states: chex.Array,
             keys: Sequence[jrandom.PRNGKey],
+            importance_weights: Optional[chex.Array] = None,
             *args,
             **kwargs,
         ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
@@ -288,6 +618,7 @@ class SAC(OffPolicyLearner):
             :param next_obss: next observations
             :param next_h_states: next hidden states
             :param keys: random keys for sampling next actions
+            :param importance_weights: the importance sampling weights of the samples
             :param *args:
             :param **kwargs:
             :type model_dict: Dict[str, Any]
@@ -299,6 +630,7 @@ class SAC(OffPolicyLearner):
             :type next_obss: chex.Array
             :type next_h_states: chex.Array
             :type keys: Sequence[jrandom.PRNGKey]
+            :type importance_weights: Optional[chex.Array]:  (Default value = None)
             :return: the updated critic state, the corresponding updated
                      optimizer state, and auxiliary information
             :rtype: Tuple[Dict[str, Any], Dict[str, Any]]
@@ -318,6 +650,7 @@ class SAC(OffPolicyLearner):
                 next_h_states,
                 self._gamma,
                 keys,
+                importance_weights,
             )
 
             aux[CONST_AGG_LOSS] = agg_loss
@@ -464,6 +797,83 @@ class SAC(OffPolicyLearner):
 
         return _temp_step
 
+    def _scan_update(self) -> Tuple[Dict[str, Any], float, float]:
+        """
+        Samples ``utd_ratio`` minibatches and updates the models with a single scanned update.
+        The minibatches are sampled on device if the buffer is on device.
+
+        :return: the auxiliary information averaged over the updates,
+                 the sampling time, and the update time
+        :rtype: Tuple[Dict[str, Any], float, float]
+
+        """
+        tic = timeit.default_timer()
+        self._learning_key, sample_key, update_key = jrandom.split(
+            self._learning_key, num=3
+        )
+        if isinstance(self._buffer, NextStateJAXBuffer) and not self.obs_rms:
+            sampling_time = timeit.default_timer() - tic
+
+            tic = timeit.default_timer()
+            self._model_dict, aux = self.sample_and_scan_update(
+                self._model_dict,
+                self._num_qf_updates,
+                self._buffer.buffer_state,
+                jrandom.split(sample_key, num=self._utd_ratio),
+                update_key,
+            )
+        else:
+            (
+                obss,
+                h_states,
+                acts,
+                rews,
+                _,
+                terminateds,
+                _,
+                next_obss,
+                next_h_states,
+                infos,
+                lengths,
+                sample_idxes,
+            ) = self._buffer.sample_with_next_obs(
+                batch_size=self._batch_size * self._utd_ratio
+            )
+            obss = self.update_obs_rms_and_normalize(obss, lengths)
+            importance_weights = infos.get(IMPORTANCE_WEIGHTS, None)
+            if importance_weights is not None:
+                importance_weights = importance_weights.reshape(
+                    (self._utd_ratio, self._batch_size)
+                )
+            sampling_time = timeit.default_timer() - tic
+
+            tic = timeit.default_timer()
+            self._model_dict, aux = self.scan_update(
+                self._model_dict,
+                self._num_qf_updates,
+                *[
+                    x.reshape((self._utd_ratio, self._batch_size, *x.shape[1:]))
+                    for x in (
+                        obss,
+                        h_states,
+                        acts,
+                        rews,
+                        terminateds,
+                        next_obss,
+                        next_h_states,
+                    )
+                ],
+                update_key,
+                importance_weights,
+            )
+            if isinstance(self._buffer, PrioritizedReplayBuffer):
+                self._buffer.update_priorities(
+                    sample_idxes, jax.device_get(aux[CONST_TD_ERROR])
+                )
+        aux = jax.device_get(aux)
+        self._num_qf_updates += self._utd_ratio
+        return aux, sampling_time, timeit.default_timer() - tic
+
     def update(self, *args, **kwargs) -> Dict[str, Any]:
         """
         Updates the actor and the critic.
@@ -528,7 +938,31 @@ class SAC(OffPolicyLearner):
             self._global_step += step_count
             total_rollout_time += timeit.default_timer() - tic
 
-            # TODO: Extend this to higher UTD ratio
+            if self._utd_ratio > 1:
+                utd_aux, sampling_time, update_time = self._scan_update()
+                total_sampling_time += sampling_time
+                total_qf_update_time += update_time
+
+                for model_key in [CONST_QF, CONST_POLICY, CONST_TEMPERATURE]:
+                    if model_key in utd_aux:
+                        assert np.isfinite(
+                            utd_aux[model_key][CONST_AGG_LOSS]
+                        ), f"Loss became NaN\n{model_key}_aux: {utd_aux[model_key]}"
+
+                qf_auxes[-1] = utd_aux[CONST_QF]
+                qf_auxes[-1][CONST_ACTION] = {
+                    i: {
+                        CONST_SATURATION: utd_aux[CONST_ACTION][CONST_SATURATION][i],
+                        CONST_MEAN: utd_aux[CONST_ACTION][CONST_MEAN][i],
+                    }
+                    for i in range(len(utd_aux[CONST_ACTION][CONST_MEAN]))
+                }
+                if utd_aux[CONST_UPDATES] > 0:
+                    pi_auxes.append(utd_aux[CONST_POLICY])
+                    if CONST_TEMPERATURE in utd_aux:
+                        temp_auxes.append(utd_aux[CONST_TEMPERATURE])
+                continue
+
             tic = timeit.default_timer()
             (
                 obss,
@@ -540,9 +974,9 @@ class SAC(OffPolicyLearner):
                 _,
                 next_obss,
                 next_h_states,
-                _,
+                infos,
                 lengths,
-                _,
+                sample_idxes,
             ) = self._buffer.sample_with_next_obs(batch_size=self._batch_size)
             obss = self.update_obs_rms_and_normalize(obss, lengths)
             total_sampling_time += timeit.default_timer() - tic
@@ -561,12 +995,17 @@ class SAC(OffPolicyLearner):
                 next_obss,
                 next_h_states,
                 qf_keys,
+                infos.get(IMPORTANCE_WEIGHTS, None),
             )
             self._model_dict[CONST_MODEL][CONST_QF] = qf_model_dict[CONST_MODEL]
             self._model_dict[CONST_OPT_STATE][CONST_QF] = qf_model_dict[CONST_OPT_STATE]
             assert np.isfinite(
                 qf_aux[CONST_AGG_LOSS]
             ), f"Loss became NaN\nqf_aux: {qf_aux}"
+            if isinstance(self._buffer, PrioritizedReplayBuffer):
+                self._buffer.update_priorities(
+                    sample_idxes, jax.device_get(qf_aux.pop(CONST_TD_ERROR))
+                )
             self._num_qf_updates += 1
             total_qf_update_time += timeit.default_timer() - tic
 
@@ -655,7 +1094,7 @@ class SAC(OffPolicyLearner):
                 self.model_dict[CONST_MODEL][CONST_TARGET_QF]
             ).item()
 
-            for act_i in range(acts.shape[-1]):
+            for act_i in range(len(qf_auxes[CONST_ACTION])):
                 aux[CONST_LOG][
                     f"{CONST_ACTION}/{CONST_ACTION}_{act_i}_{CONST_SATURATION}"
                 ] = qf_auxes[CONST_ACTION][act_i][CONST_SATURATION]
@@ -735,6 +1174,20 @@ class CrossQSAC(OffPolicyLearner):
         self.pi_step = jax.jit(self.make_pi_step())
         self.temp_step = jax.jit(self.make_temp_step())
 
+        self._utd_ratio = getattr(config, CONST_UTD_RATIO, 1)
+        scan_update = make_scan_update(
+            self.qf_step,
+            self.pi_step,
+            self.temp_step if self._target_entropy is not None else None,
+            None,
+            self._actor_update_frequency,
+            1,
+        )
+        self.scan_update = jax.jit(scan_update)
+        self.sample_and_scan_update = jax.jit(
+            make_sample_and_scan_update(scan_update, self._batch_size)
+        )
+
     def _initialize_model_and_opt(self, input_dim: chex.Array, output_dim: chex.Array):
         """
         Construct the actor and critic, and their corresponding optimizers.
@@ -870,6 +1323,7 @@ class CrossQSAC(OffPolicyLearner):
             next_obss: chex.Array,
             next_h_states: chex.Array,
             keys: Sequence[jrandom.PRNGKey],
+            importance_weights: Optional[chex.Array] = None,
             *args,
             **kwargs,
         ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
@@ -885,6 +1339,7 @@ class CrossQSAC(OffPolicyLearner):
             :param next_obss: next observations
             :param next_h_states: next hidden states
             :param keys: random keys for sampling next actions
+            :param importance_weights: the importance sampling weights of the samples
             :param *args:
             :param **kwargs:
             :type model_dict: Dict[str, Any]
@@ -896,6 +1351,7 @@ class CrossQSAC(OffPolicyLearner):
             :type next_obss: chex.Array
             :type next_h_states: chex.Array
             :type keys: Sequence[jrandom.PRNGKey]
+            :type importance_weights: Optional[chex.Array]:  (Default value = None)
             :return: the updated critic state, the corresponding updated
                      optimizer state, and auxiliary information
             :rtype: Tuple[Dict[str, Any], Dict[str, Any]]
@@ -914,6 +1370,7 @@ class CrossQSAC(OffPolicyLearner):
                 next_h_states,
                 self._gamma,
                 keys,
+                importance_weights,
             )
 
             aux[CONST_AGG_LOSS] = agg_loss
@@ -1060,6 +1517,83 @@ class CrossQSAC(OffPolicyLearner):
 
         return _temp_step
 
+    def _scan_update(self) -> Tuple[Dict[str, Any], float, float]:
+        """
+        Samples ``utd_ratio`` minibatches and updates the models with a single scanned update.
+        The minibatches are sampled on device if the buffer is on device.
+
+        :return: the auxiliary information averaged over the updates,
+                 the sampling time, and the update time
+        :rtype: Tuple[Dict[str, Any], float, float]
+
+        """
+        tic = timeit.default_timer()
+        self._learning_key, sample_key, update_key = jrandom.split(
+            self._learning_key, num=3
+        )
+        if isinstance(self._buffer, NextStateJAXBuffer) and not self.obs_rms:
+            sampling_time = timeit.default_timer() - tic
+
+            tic = timeit.default_timer()
+            self._model_dict, aux = self.sample_and_scan_update(
+                self._model_dict,
+                self._num_qf_updates,
+                self._buffer.buffer_state,
+                jrandom.split(sample_key, num=self._utd_ratio),
+                update_key,
+            )
+        else:
+            (
+                obss,
+                h_states,
+                acts,
+                rews,
+                _,
+                terminateds,
+                _,
+                next_obss,
+                next_h_states,
+                infos,
+                lengths,
+                sample_idxes,
+            ) = self._buffer.sample_with_next_obs(
+                batch_size=self._batch_size * self._utd_ratio
+            )
+            obss = self.update_obs_rms_and_normalize(obss, lengths)
+            importance_weights = infos.get(IMPORTANCE_WEIGHTS, None)
+            if importance_weights is not None:
+                importance_weights = importance_weights.reshape(
+                    (self._utd_ratio, self._batch_size)
+                )
+            sampling_time = timeit.default_timer() - tic
+
+            tic = timeit.default_timer()
+            self._model_dict, aux = self.scan_update(
+                self._model_dict,
+                self._num_qf_updates,
+                *[
+                    x.reshape((self._utd_ratio, self._batch_size, *x.shape[1:]))
+                    for x in (
+                        obss,
+                        h_states,
+                        acts,
+                        rews,
+                        terminateds,
+                        next_obss,
+                        next_h_states,
+                    )
+                ],
+                update_key,
+                importance_weights,
+            )
+            if isinstance(self._buffer, PrioritizedReplayBuffer):
+                self._buffer.update_priorities(
+                    sample_idxes, jax.device_get(aux[CONST_TD_ERROR])
+                )
+        aux = jax.device_get(aux)
+        self._num_qf_updates += self._utd_ratio
+        return aux, sampling_time, timeit.default_timer() - tic
+
     def update(self, *args, **kwargs) -> Dict[str, Any]:
         """
         Updates the actor and the critic.
@@ -1123,7 +1657,31 @@ class CrossQSAC(OffPolicyLearner):
             self._global_step += step_count
             total_rollout_time += timeit.default_timer() - tic
 
-            # TODO: Extend this to higher UTD ratio
+            if self._utd_ratio > 1:
+                utd_aux, sampling_time, update_time = self._scan_update()
+                total_sampling_time += sampling_time
+                total_qf_update_time += update_time
+
+                for model_key in [CONST_QF, CONST_POLICY, CONST_TEMPERATURE]:
+                    if model_key in utd_aux:
+                        assert np.isfinite(
+                            utd_aux[model_key][CONST_AGG_LOSS]
+                        ), f"Loss became NaN\n{model_key}_aux: {utd_aux[model_key]}"
+
+                qf_auxes[-1] = utd_aux[CONST_QF]
+                qf_auxes[-1][CONST_ACTION] = {
+                    i: {
+                        CONST_SATURATION: utd_aux[CONST_ACTION][CONST_SATURATION][i],
+                        CONST_MEAN: utd_aux[CONST_ACTION][CONST_MEAN][i],
+                    }
+                    for i in range(len(utd_aux[CONST_ACTION][CONST_MEAN]))
+                }
+                if utd_aux[CONST_UPDATES] > 0:
+                    pi_auxes.append(utd_aux[CONST_POLICY])
+                    if CONST_TEMPERATURE in utd_aux:
+                        temp_auxes.append(utd_aux[CONST_TEMPERATURE])
+                continue
+
             tic = timeit.default_timer()
             (
                 obss,
@@ -1135,9 +1693,9 @@ class CrossQSAC(OffPolicyLearner):
                 _,
                 next_obss,
                 next_h_states,
-                _,
+                infos,
                 lengths,
-                _,
+                sample_idxes,
             ) = self._buffer.sample_with_next_obs(batch_size=self._batch_size)
             obss = self.update_obs_rms_and_normalize(obss, lengths)
             total_sampling_time += timeit.default_timer() - tic
@@ -1156,12 +1714,17 @@ class CrossQSAC(OffPolicyLearner):
                 next_obss,
                 next_h_states,
                 qf_keys,
+                infos.get(IMPORTANCE_WEIGHTS, None),
             )
             self._model_dict[CONST_MODEL][CONST_QF] = qf_model_dict[CONST_MODEL]
             self._model_dict[CONST_OPT_STATE][CONST_QF] = qf_model_dict[CONST_OPT_STATE]
             assert np.isfinite(
                 qf_aux[CONST_AGG_LOSS]
             ), f"Loss became NaN\nqf_aux: {qf_aux}"
+            if isinstance(self._buffer, PrioritizedReplayBuffer):
+                self._buffer.update_priorities(
+                    sample_idxes, jax.device_get(qf_aux.pop(CONST_TD_ERROR))
+                )
             self._num_qf_updates += 1
             total_qf_update_time += timeit.default_timer() - tic
 
@@ -1240,7 +1803,7 @@ class CrossQSAC(OffPolicyLearner):
                 self.model_dict[CONST_MODEL][CONST_QF]
             ).item()
 
-            for act_i in range(acts.shape[-1]):
+            for act_i in range(len(qf_auxes[CONST_ACTION])):
                 aux[CONST_LOG][
                     f"{CONST_ACTION}/{CONST_ACTION}_{act_i}_{CONST_SATURATION}"
                 ] = qf_auxes[CONST_ACTION][act_i][CONST_SATURATION]
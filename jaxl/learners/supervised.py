@@ -59,7 +59,7 @@ class SupervisedLearner(OfflineLearner):
         self.sample = sample
 
         self._initialize_losses()
-        self.train_step = jax.jit(self.make_train_step())
+        self.train_step = self._jit_train_step(self.make_train_step())
 
     def _initialize_model_and_opt(self, input_dim: chex.Array, output_dim: chex.Array):
         """
@@ -186,7 +186,7 @@ class SupervisedLearner(OfflineLearner):
             inputs, carries, outputs = self.sample()
 
             self.model_dict, aux = self.train_step(
-                self._model_dict, inputs, carries, outputs
+                self._model_dict, *self._shard_batch(inputs, carries, outputs)
             )
             total_update_time += timeit.default_timer() - tic
             assert np.isfinite(aux[CONST_AGG_LOSS]), f"Loss became NaN\naux: {aux}"
@@ -1,4 +1,4 @@
-import dill
+import logging
 import math
 import os
 import tqdm
@@ -6,13 +6,16 @@ import tqdm
 from torch.utils.tensorboard import SummaryWriter
 from types import SimpleNamespace
 
+from jaxl.checkpoint_utils import save_checkpoint
 from jaxl.constants import *
 from jaxl.learners import Learner
 from jaxl.plot_utils import icl_image_grid
-from jaxl.utils import DummySummaryWriter
+from jaxl.utils import AsyncCheckpointWriter, DummySummaryWriter
 
 import jaxl.learners as jaxl_learners
 
+log = logging.getLogger(__name__)
+
 
 """
 Getter for the learner.
@@ -92,6 +95,11 @@ def train(
 
     true_epoch = 0
     summary_writer = DummySummaryWriter()
+
+    # Checkpoints are written in the background so that training does not wait on disk
+    checkpoint_writer = AsyncCheckpointWriter(
+        getattr(logging_config, "max_in_flight_checkpoints", 2)
+    )
     try:
         if save_path:
             os.makedirs(os.path.join(save_path, "models"), exist_ok=True)
@@ -102,12 +110,10 @@ def train(
                 hyperparameter_str,
             )
             learner.save_env_config(os.path.join(save_path, "env_config.dill"))
-            dill.dump(
+            checkpoint_writer.save(
                 learner.checkpoint(),
-                open(
-                    os.path.join(save_path, "models", "{}.dill".format(pad_string(0))),
-                    "wb",
-                ),
+                os.path.join(save_path, "models", pad_string(0)),
+                save_checkpoint,
             )
 
         for epoch in tqdm.tqdm(range(train_config.num_epochs)):
@@ -129,11 +135,10 @@ def train(
                 and logging_config.checkpoint_interval
                 and (true_epoch % logging_config.checkpoint_interval == 0)
             ):
-                with open(
+                checkpoint_writer.save(
+                    train_aux,
                     os.path.join(save_path, "auxes", f"auxes-{true_epoch}.dill"),
-                    "wb",
-                ) as f:
-                    dill.dump(train_aux, f)
+                )
 
                 if CONST_DATA in train_aux and getattr(
                     config.logging_config, "image_data", False
@@ -146,26 +151,29 @@ def train(
                             save_path, "imgs/train_{}.png".format(true_epoch)
                         ),
                     )
-                dill.dump(
+                checkpoint_writer.save(
                     learner.checkpoint(),
-                    open(
-                        os.path.join(
-                            save_path,
-                            "models",
-                            "{}.dill".format(pad_string(true_epoch)),
-                        ),
-                        "wb",
-                    ),
+                    os.path.join(save_path, "models", pad_string(true_epoch)),
+                    save_checkpoint,
                 )
     except KeyboardInterrupt:
         pass
-    if save_path:
-        dill.dump(
-            learner.checkpoint(final=True),
-            open(
-                os.path.join(
-                    save_path, "models", "{}.dill".format(pad_string(true_epoch))
-                ),
-                "wb",
-            ),
-        )
+    except Exception:
+        # Keep the checkpoints that are already queued without masking the training error
+        for close in (learner.close, checkpoint_writer.close):
+            try:
+                close()
+            except Exception:
+                log.exception(f"{close.__qualname__} failed after a training error")
+        raise
+
+    try:
+        if save_path:
+            checkpoint_writer.save(
+                learner.checkpoint(final=True),
+                os.path.join(save_path, "models", pad_string(true_epoch)),
+                save_checkpoint,
+            )
+        checkpoint_writer.close()
+    finally:
+        learner.close()
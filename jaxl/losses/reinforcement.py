@@ -1,5 +1,5 @@
 from types import SimpleNamespace
-from typing import Any, Callable, Dict, Union, Tuple, Sequence
+from typing import Any, Callable, Dict, Optional, Union, Tuple, Sequence
 
 import chex
 import jax
@@ -481,6 +481,7 @@ def make_sac_qf_loss(
         next_h_states: chex.Array,
         gamma: chex.Array,
         keys: Sequence[jrandom.PRNGKey],
+        importance_weights: Optional[chex.Array] = None,
     ) -> Tuple[chex.Array, Dict]:
         """
         SAC critic loss.
@@ -498,6 +499,7 @@ def make_sac_qf_loss(
         :param next_h_states: next hidden states
         :param gamma: discount factor
         :param keys: random keys for sampling next actions
+        :param importance_weights: the importance sampling weights of the samples
         :type qf_params: Union[optax.Params, Dict[str, Any]]
         :type target_qf_params: Union[optax.Params, Dict[str, Any]]
         :type pi_params: Union[optax.Params, Dict[str, Any]]
@@ -511,6 +513,7 @@ def make_sac_qf_loss(
         :type next_h_states: chex.Array
         :type gamma: chex.Array
         :type keys: Sequence[jrandom.PRNGKey]
+        :type importance_weights: Optional[chex.Array]:  (Default value = None)
         :return: the loss and auxiliary information
         :rtype: Tuple[chex.Array, Dict]
 
@@ -540,7 +543,10 @@ def make_sac_qf_loss(
         next_vs = next_q_preds_min - temp * next_lprobs
         curr_q_targets = rews + gamma * (1 - terminateds) * next_vs
         td_errors = (curr_q_preds - curr_q_targets[None]) ** 2
-        loss = reduction(td_errors)
+        if importance_weights is None:
+            loss = reduction(td_errors)
+        else:
+            loss = reduction(importance_weights.reshape((1, -1, 1)) * td_errors)
 
         return loss, {
             "mean_var_q": jnp.mean(jnp.var(curr_q_preds, axis=0)),
@@ -558,6 +564,9 @@ def make_sac_qf_loss(
             "min_q_log_prob": jnp.min(next_lprobs),
             "mean_q_log_prob": jnp.mean(next_lprobs),
             "curr_q_targets": curr_q_targets,
+            CONST_TD_ERROR: jnp.mean(
+                jnp.abs(curr_q_preds - curr_q_targets[None]), axis=(0, 2)
+            ),
             CONST_UPDATES: updates,
         }
 
@@ -602,6 +611,7 @@ def make_cross_q_sac_qf_loss(
         next_h_states: chex.Array,
         gamma: chex.Array,
         keys: Sequence[jrandom.PRNGKey],
+        importance_weights: Optional[chex.Array] = None,
     ) -> Tuple[chex.Array, Dict]:
         """
         CrossQ SAC critic loss.
@@ -618,6 +628,7 @@ def make_cross_q_sac_qf_loss(
         :param next_h_states: next hidden states
         :param gamma: discount factor
         :param keys: random keys for sampling next actions
+        :param importance_weights: the importance sampling weights of the samples
         :type qf_params: Union[optax.Params, Dict[str, Any]]
         :type pi_params: Union[optax.Params, Dict[str, Any]]
         :type temp_params: Union[optax.Params, Dict[str, Any]]
@@ -630,6 +641,7 @@ def make_cross_q_sac_qf_loss(
         :type next_h_states: chex.Array
         :type gamma: chex.Array
         :type keys: Sequence[jrandom.PRNGKey]
+        :type importance_weights: Optional[chex.Array]:  (Default value = None)
         :return: the loss and auxiliary information
         :rtype: Tuple[chex.Array, Dict]
 
@@ -667,7 +679,10 @@ def make_cross_q_sac_qf_loss(
         next_vs = next_q_preds_min - temp * next_lprobs
         curr_q_targets = rews + gamma * (1 - terminateds) * next_vs
         td_errors = (curr_q_preds - curr_q_targets[None]) ** 2
-        loss = reduction(td_errors)
+        if importance_weights is None:
+            loss = reduction(td_errors)
+        else:
+            loss = reduction(importance_weights.reshape((1, -1, 1)) * td_errors)
 
         return loss, {
             "mean_var_q": jnp.mean(jnp.var(curr_q_preds, axis=0)),
@@ -685,6 +700,9 @@ def make_cross_q_sac_qf_loss(
             "min_q_log_prob": jnp.min(next_lprobs),
             "mean_q_log_prob": jnp.mean(next_lprobs),
             "curr_q_targets": curr_q_targets,
+            CONST_TD_ERROR: jnp.mean(
+                jnp.abs(curr_q_preds - curr_q_targets[None]), axis=(0, 2)
+            ),
             CONST_UPDATES: updates,
         }
 
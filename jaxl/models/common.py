@@ -15,6 +15,22 @@ from jaxl.constants import *
 from jaxl.models.modules import MLPModule, CNNModule, ResNetV1Module
 
 
+def get_dtype(dtype: str) -> jnp.dtype:
+    """
+    Gets a computation dtype
+
+    :param dtype: the dtype name
+    :type dtype: str
+    :return: a computation dtype
+    :rtype: jnp.dtype
+
+    """
+    assert (
+        dtype in VALID_COMPUTE_DTYPE
+    ), f"{dtype} is not supported (one of {VALID_COMPUTE_DTYPE})"
+    return jnp.dtype(dtype)
+
+
 def get_activation(activation: str) -> Callable:
     """
     Gets an activation function
@@ -423,6 +439,7 @@ class MLP(Model):
         use_batch_norm: bool = False,
         use_bias: bool = True,
         flatten: bool = False,
+        dtype: str = CONST_FLOAT32,
     ) -> None:
         self.use_batch_norm = use_batch_norm
         self.model = MLPModule(
@@ -432,6 +449,7 @@ class MLP(Model):
             use_batch_norm,
             use_bias,
             flatten,
+            get_dtype(dtype),
         )
         self.forward = jax.jit(self.make_forward(), static_argnames=[CONST_EVAL])
 
@@ -506,7 +524,7 @@ class MLP(Model):
                 eval,
                 mutable=[CONST_BATCH_STATS],
             )
-            return out, carry, updates
+            return out.astype(jnp.float32), carry, updates
 
         return forward
 
@@ -529,6 +547,7 @@ class CNN(Model):
         activation: str = CONST_RELU,
         output_activation: str = CONST_IDENTITY,
         use_batch_norm: bool = False,
+        dtype: str = CONST_FLOAT32,
     ) -> None:
         self.use_batch_norm = use_batch_norm
         if isinstance(features[0], Iterable):
@@ -536,13 +555,19 @@ class CNN(Model):
         else:
             self.spatial_dim = 1
         self.conv = CNNModule(
-            features, kernel_sizes, get_activation(activation), use_batch_norm
+            features,
+            kernel_sizes,
+            get_activation(activation),
+            use_batch_norm,
+            get_dtype(dtype),
         )
         self.mlp = MLPModule(
             layers,
             get_activation(activation),
             get_activation(output_activation),
             False,
+            True,
+            dtype=get_dtype(dtype),
         )
         self.forward = jax.jit(self.make_forward(), static_argnames=[CONST_EVAL])
 
@@ -639,7 +664,7 @@ class CNN(Model):
                 mutable=[CONST_BATCH_STATS],
             )
             return (
-                out,
+                out.astype(jnp.float32),
                 carry,
                 {
                     CONST_CNN: conv_updates,
@@ -670,6 +695,7 @@ class ResNetV1(Model):
         use_projection: Sequence[bool],
         use_bottleneck: bool,
         use_batch_norm: bool = True,
+        dtype: str = CONST_FLOAT32,
     ) -> None:
         self.use_batch_norm = use_batch_norm
         self.resnet = ResNetV1Module(
@@ -679,6 +705,7 @@ class ResNetV1(Model):
             use_projection=use_projection,
             use_bottleneck=use_bottleneck,
             use_batch_norm=use_batch_norm,
+            dtype=get_dtype(dtype),
         )
         self.forward = jax.jit(self.make_forward(), static_argnames=[CONST_EVAL])
 
@@ -756,7 +783,7 @@ class ResNetV1(Model):
                 eval,
                 mutable=[CONST_BATCH_STATS],
             )
-            return out, carry, updates
+            return out.astype(jnp.float32), carry, updates
 
         return forward
 
@@ -3,6 +3,7 @@ from types import SimpleNamespace
 from typing import Dict, Any, Sequence, Tuple
 
 import chex
+import jax
 import jax.numpy as jnp
 import math
 import numpy as np
@@ -39,8 +40,8 @@ class PositionalEncoding(nn.Module):
         pe[:, half_dim:] = np.cos(position * div_term)
         self.pe = pe[None]
 
-    def __call__(self, x: chex.Array, **kwargs):
-        x = x + self.pe[:, : x.shape[1]]
+    def __call__(self, x: chex.Array, offset: int = 0, **kwargs):
+        x = x + jax.lax.dynamic_slice_in_dim(self.pe, offset, x.shape[1], axis=1)
         return x
 
 
@@ -77,7 +77,9 @@ class FixedSquashedGaussianPolicy(Policy):
             :rtype: Tuple[chex.Array, chex.Array]
 
             """
-            act = Normal.sample(self._means, self._stds, key)
+            act = Normal.sample(
+                self._means[..., 0], self._stds[..., 0], key, num_samples=len(obs)
+            )
             act = TanhTransform.transform(act)
             return act, h_state
 
@@ -1,13 +1,21 @@
 from flax import linen as nn
 from flax.linen.initializers import zeros
-from typing import Callable, Sequence
+from typing import Any, Callable, Sequence
 
 import chex
 import jax
 import jax.numpy as jnp
 import math
 
-from jaxl.constants import CONST_SAME_PADDING
+from jaxl.constants import (
+    CONST_BLOCKWISE_ATTENTION,
+    CONST_CACHE,
+    CONST_CACHED_KEY,
+    CONST_CACHED_VALUE,
+    CONST_DENSE_ATTENTION,
+    CONST_SAME_PADDING,
+    DEFAULT_ATTENTION_BLOCK_SIZE,
+)
 
 
 class MLPModule(nn.Module):
@@ -21,13 +29,16 @@ class MLPModule(nn.Module):
     use_bias: bool
     flatten: bool = False
 
+    # The computation dtype, where the parameters are kept in float32
+    dtype: Any = jnp.float32
+
     @nn.compact
     def __call__(self, x: chex.Array, eval: bool, **kwargs) -> chex.Array:
         idx = -1
         if self.flatten:
             x = x.reshape((len(x), -1))
         for idx, layer in enumerate(self.layers[:-1]):
-            x = self.activation(nn.Dense(layer)(x))
+            x = self.activation(nn.Dense(layer, dtype=self.dtype)(x))
             if self.use_batch_norm:
                 x = nn.BatchNorm(
                     momentum=0.9,
@@ -35,9 +46,12 @@ class MLPModule(nn.Module):
                     use_bias=self.use_bias,
                     use_scale=True,
                     use_fast_variance=False,
+                    dtype=self.dtype,
                 )(x, eval)
             # self.sow("mlp_latents", "mlp_{}".format(idx), x)
-        x = self.output_activation(nn.Dense(self.layers[-1], use_bias=self.use_bias)(x))
+        x = self.output_activation(
+            nn.Dense(self.layers[-1], use_bias=self.use_bias, dtype=self.dtype)(x)
+        )
         # self.sow("mlp_latents", "mlp_{}".format(idx + 1), x)
         return x
 
@@ -55,12 +69,15 @@ class CNNModule(nn.Module):
     activation: Callable
     use_batch_norm: bool
 
+    # The computation dtype, where the parameters are kept in float32
+    dtype: Any = jnp.float32
+
     @nn.compact
     def __call__(self, x: chex.Array, eval: bool, **kwargs) -> chex.Array:
         for idx, (feature, kernel_size) in enumerate(
             zip(self.features, self.kernel_sizes)
         ):
-            x = self.activation(nn.Conv(feature, kernel_size)(x))
+            x = self.activation(nn.Conv(feature, kernel_size, dtype=self.dtype)(x))
             if self.use_batch_norm:
                 x = nn.BatchNorm(
                     momentum=0.9,
@@ -68,19 +85,128 @@ class CNNModule(nn.Module):
                     use_bias=True,
                     use_scale=True,
                     use_fast_variance=False,
+                    dtype=self.dtype,
                 )(x, eval)
             # self.sow("cnn_latents", "cnn_{}".format(idx), x)
         return x
 
 
+def blockwise_causal_attention(
+    q: chex.Array, k: chex.Array, v: chex.Array, block_size: int
+) -> chex.Array:
+    """
+    Computes causal attention over blocks of queries and keys with an online softmax,
+    such that the full attention matrix is never materialized.
+    Key blocks that are entirely in the future of a query block are skipped.
+    Each query block is rematerialized in the backward pass, thus the peak memory
+    is linear in the sequence length.
+
+    :param q: the scaled queries with shape (batch, time, heads, head_dim)
+    :param k: the keys with shape (batch, time, heads, head_dim)
+    :param v: the values with shape (batch, time, heads, head_dim)
+    :param block_size: the number of queries and keys per block
+    :type q: chex.Array
+    :type k: chex.Array
+    :type v: chex.Array
+    :type block_size: int
+    :return: the attended values with shape (batch, time, heads, head_dim)
+    :rtype: chex.Array
+
+    """
+    batch, time, num_heads, head_dim = q.shape
+    num_blocks = -(-time // block_size)
+    padding = ((0, 0), (0, num_blocks * block_size - time), (0, 0), (0, 0))
+
+    def to_blocks(x):
+        return jnp.swapaxes(
+            jnp.pad(x, padding).reshape(
+                (batch, num_blocks, block_size, num_heads, head_dim)
+            ),
+            0,
+            1,
+        )
+
+    q_blocks, k_blocks, v_blocks = to_blocks(q), to_blocks(k), to_blocks(v)
+    block_idxes = jnp.arange(num_blocks)
+    positions = jnp.arange(block_size)
+
+    @jax.checkpoint
+    def attend_query_block(q_block, q_block_i):
+        q_positions = q_block_i * block_size + positions
+
+        def attend_key_block(carry, key_block):
+            k_block, v_block, k_block_i = key_block
+
+            def update(carry):
+                max_logits, denominators, numerators = carry
+                logits = jnp.einsum("bthd,bThd->bhtT", q_block, k_block).astype(
+                    jnp.float32
+                )
+                mask = q_positions[:, None] >= (k_block_i * block_size + positions)
+                logits = jnp.where(mask, logits, -1e10)
+
+                next_max_logits = jnp.maximum(max_logits, jnp.max(logits, axis=-1))
+                correction = jnp.exp(max_logits - next_max_logits)
+                probs = jnp.exp(logits - next_max_logits[..., None])
+                denominators = denominators * correction + jnp.sum(probs, axis=-1)
+                numerators = numerators * correction[..., None] + jnp.einsum(
+                    "bhtT,bThd->bhtd", probs, v_block.astype(jnp.float32)
+                )
+                return next_max_logits, denominators, numerators
+
+            carry = jax.lax.cond(
+                k_block_i <= q_block_i, update, lambda carry: carry, carry
+            )
+            return carry, None
+
+        # The softmax statistics are accumulated in float32
+        (_, denominators, numerators), _ = jax.lax.scan(
+            attend_key_block,
+            (
+                jnp.full((batch, num_heads, block_size), -jnp.inf, dtype=jnp.float32),
+                jnp.zeros((batch, num_heads, block_size), dtype=jnp.float32),
+                jnp.zeros((batch, num_heads, block_size, head_dim), dtype=jnp.float32),
+            ),
+            (k_blocks, v_blocks, block_idxes),
+        )
+        return jnp.einsum("bhtd->bthd", numerators / denominators[..., None]).astype(
+            q.dtype
+        )
+
+    summed = jax.lax.map(
+        lambda query_block: attend_query_block(*query_block),
+        (q_blocks, block_idxes),
+    )
+    return jnp.swapaxes(summed, 0, 1).reshape(
+        (batch, num_blocks * block_size, num_heads, head_dim)
+    )[:, :time]
+
+
 class SelfAttentionModule(nn.Module):
-    """Self-Attention layer."""
+    """
+    Self-Attention layer.
+    If ``cache_index`` is provided, the keys and values are written into the ``cache``
+    collection starting at ``cache_index``, and the queries attend causally to every
+    cached entry before them.
+    The blockwise attention assumes the mask to be causal.
+    The softmax is computed in float32 regardless of the computation dtype.
+    """
 
     num_heads: int
     qkv_features: int = None
+    attention: str = CONST_DENSE_ATTENTION
+    block_size: int = DEFAULT_ATTENTION_BLOCK_SIZE
+    dtype: Any = jnp.float32
 
     @nn.compact
-    def __call__(self, x: chex.Array, eval: bool, mask=None, **kwargs) -> chex.Array:
+    def __call__(
+        self,
+        x: chex.Array,
+        eval: bool,
+        mask=None,
+        cache_index: chex.Array = None,
+        **kwargs,
+    ) -> chex.Array:
         in_dim = x.shape[-1]
 
         if self.qkv_features is not None:
@@ -88,9 +214,9 @@ class SelfAttentionModule(nn.Module):
         else:
             qkv_hiddens = in_dim
 
-        q = nn.Dense(qkv_hiddens)(x)
-        k = nn.Dense(qkv_hiddens)(x)
-        v = nn.Dense(qkv_hiddens)(x)
+        q = nn.Dense(qkv_hiddens, dtype=self.dtype)(x)
+        k = nn.Dense(qkv_hiddens, dtype=self.dtype)(x)
+        v = nn.Dense(qkv_hiddens, dtype=self.dtype)(x)
 
         batch, q_time, _ = q.shape
         _, kv_time, _ = k.shape
@@ -99,18 +225,47 @@ class SelfAttentionModule(nn.Module):
         k = jnp.reshape(k, [batch, kv_time, self.num_heads, head_dim])
         v = jnp.reshape(v, [batch, kv_time, self.num_heads, head_dim])
 
+        if cache_index is not None:
+            is_initialized = self.has_variable(CONST_CACHE, CONST_CACHED_KEY)
+            cached_key = self.variable(
+                CONST_CACHE, CONST_CACHED_KEY, jnp.zeros, k.shape, k.dtype
+            )
+            cached_value = self.variable(
+                CONST_CACHE, CONST_CACHED_VALUE, jnp.zeros, v.shape, v.dtype
+            )
+            if is_initialized:
+                k = jax.lax.dynamic_update_slice(
+                    cached_key.value,
+                    k.astype(cached_key.value.dtype),
+                    (0, cache_index, 0, 0),
+                )
+                v = jax.lax.dynamic_update_slice(
+                    cached_value.value,
+                    v.astype(cached_value.value.dtype),
+                    (0, cache_index, 0, 0),
+                )
+                cached_key.value = k
+                cached_value.value = v
+                mask = (
+                    jnp.arange(k.shape[1])[None, :]
+                    <= cache_index + jnp.arange(q_time)[:, None]
+                )[None, None].astype(q.dtype)
+
         # attend
         hiddens = self.num_heads * head_dim
         scale = 1.0 / math.sqrt(head_dim)
-        attention = jnp.einsum("bthd,bThd->bhtT", q, k)
-        attention *= scale
-        if mask is not None:
-            attention = attention * mask - 1e10 * (1 - mask)
-        normalized = jax.nn.softmax(attention)
-        summed = jnp.einsum("bhtT,bThd->bthd", normalized, v)
+        if self.attention == CONST_BLOCKWISE_ATTENTION and cache_index is None:
+            summed = blockwise_causal_attention(q * scale, k, v, self.block_size)
+        else:
+            attention = jnp.einsum("bthd,bThd->bhtT", q, k).astype(jnp.float32)
+            attention *= scale
+            if mask is not None:
+                attention = attention * mask - 1e10 * (1 - mask)
+            normalized = jax.nn.softmax(attention).astype(v.dtype)
+            summed = jnp.einsum("bhtT,bThd->bthd", normalized, v)
         out = jnp.reshape(summed, [batch, q_time, hiddens])
 
-        return nn.Dense(qkv_hiddens)(out)
+        return nn.Dense(qkv_hiddens, dtype=self.dtype)(out)
 
 
 class ResNetV1Block(nn.Module):
@@ -133,6 +288,9 @@ class ResNetV1Block(nn.Module):
 
     use_batch_norm: bool
 
+    # The computation dtype, where the parameters are kept in float32
+    dtype: Any = jnp.float32
+
     def setup(self):
         assert (
             not self.use_bottleneck or self.features >= 4 and self.features % 4 == 0
@@ -146,6 +304,7 @@ class ResNetV1Block(nn.Module):
                 strides=self.stride,
                 use_bias=False,
                 padding=CONST_SAME_PADDING,
+                dtype=self.dtype,
             )
             if self.use_batch_norm:
                 self.projection_batchnorm = nn.BatchNorm(
@@ -154,6 +313,7 @@ class ResNetV1Block(nn.Module):
                     use_bias=True,
                     use_scale=True,
                     use_fast_variance=False,
+                    dtype=self.dtype,
                 )
 
         conv_features = self.features
@@ -172,6 +332,7 @@ class ResNetV1Block(nn.Module):
             strides=conv_0_stride,
             use_bias=False,
             padding=CONST_SAME_PADDING,
+            dtype=self.dtype,
         )
 
         if self.use_batch_norm:
@@ -181,6 +342,7 @@ class ResNetV1Block(nn.Module):
                 use_bias=True,
                 use_scale=True,
                 use_fast_variance=False,
+                dtype=self.dtype,
             )
 
         self.conv_1 = nn.Conv(
@@ -189,6 +351,7 @@ class ResNetV1Block(nn.Module):
             strides=conv_1_stride,
             use_bias=False,
             padding=CONST_SAME_PADDING,
+            dtype=self.dtype,
         )
 
         if self.use_batch_norm:
@@ -198,6 +361,7 @@ class ResNetV1Block(nn.Module):
                 use_bias=True,
                 use_scale=True,
                 use_fast_variance=False,
+                dtype=self.dtype,
             )
 
         if self.use_batch_norm:
@@ -215,6 +379,7 @@ class ResNetV1Block(nn.Module):
                 strides=1,
                 use_bias=False,
                 padding=CONST_SAME_PADDING,
+                dtype=self.dtype,
             )
             if self.use_batch_norm:
                 self.batch_norm_2 = nn.BatchNorm(
@@ -224,6 +389,7 @@ class ResNetV1Block(nn.Module):
                     use_scale=True,
                     scale_init=zeros,
                     use_fast_variance=False,
+                    dtype=self.dtype,
                 )
                 layers.append((self.conv_2, self.batch_norm_2))
             else:
@@ -279,6 +445,9 @@ class ResNetV1BlockGroup(nn.Module):
 
     use_batch_norm: bool
 
+    # The computation dtype, where the parameters are kept in float32
+    dtype: Any = jnp.float32
+
     @nn.compact
     def __call__(self, x: chex.Array, eval: bool, **kwargs) -> chex.Array:
         for block_i in range(self.num_blocks):
@@ -288,6 +457,7 @@ class ResNetV1BlockGroup(nn.Module):
                 block_i == 0 and self.use_projection,
                 self.use_bottleneck,
                 self.use_batch_norm,
+                self.dtype,
             )(x, eval)
             # self.sow(
             #     "resnet_v1_block_group_latents", "resnet_v1_{}".format(block_i + 1), x
@@ -313,6 +483,9 @@ class ResNetV1Module(nn.Module):
 
     use_batch_norm: bool
 
+    # The computation dtype, where the parameters are kept in float32
+    dtype: Any = jnp.float32
+
     @nn.compact
     def __call__(self, x: chex.Array, eval: bool, **kwargs) -> chex.Array:
         x = nn.Conv(
@@ -321,6 +494,7 @@ class ResNetV1Module(nn.Module):
             strides=2,
             use_bias=False,
             padding=CONST_SAME_PADDING,
+            dtype=self.dtype,
         )(x)
 
         if self.use_batch_norm:
@@ -330,6 +504,7 @@ class ResNetV1Module(nn.Module):
                 use_bias=True,
                 use_scale=True,
                 use_fast_variance=False,
+                dtype=self.dtype,
             )(x, eval)
         x = jax.nn.relu(x)
         x = nn.max_pool(
@@ -355,6 +530,7 @@ class ResNetV1Module(nn.Module):
                 curr_projection,
                 self.use_bottleneck,
                 self.use_batch_norm,
+                self.dtype,
             )(x, eval)
         return jnp.mean(x, axis=(-3, -2))
 
@@ -371,18 +547,39 @@ class GPTBlock(nn.Module):
     # : Widening dimension
     widening_factor: int
 
+    # : The attention implementation
+    attention: str = CONST_DENSE_ATTENTION
+
+    # : The number of queries and keys per block for blockwise attention
+    attention_block_size: int = DEFAULT_ATTENTION_BLOCK_SIZE
+
+    # : The computation dtype, where the parameters are kept in float32
+    dtype: Any = jnp.float32
+
     @nn.compact
     def __call__(self, x: chex.Array, eval: bool, **kwargs) -> chex.Array:
-        mask = nn.make_causal_mask(x[..., 0])
-        x = x + SelfAttentionModule(self.num_heads, self.embed_dim)(
-            nn.LayerNorm(epsilon=1e-5, use_fast_variance=False)(x), eval, mask=mask
+        # The blockwise attention applies the causal mask per block
+        mask = None
+        if self.attention == CONST_DENSE_ATTENTION:
+            mask = nn.make_causal_mask(x[..., 0])
+        x = x + SelfAttentionModule(
+            self.num_heads,
+            self.embed_dim,
+            self.attention,
+            self.attention_block_size,
+            self.dtype,
+        )(
+            nn.LayerNorm(epsilon=1e-5, use_fast_variance=False, dtype=self.dtype)(x),
+            eval,
+            mask=mask,
+            **kwargs,
         )
         normed_x = nn.gelu(
-            nn.Dense(self.embed_dim * self.widening_factor)(
-                nn.LayerNorm(epsilon=1e-5, use_fast_variance=False)(x)
+            nn.Dense(self.embed_dim * self.widening_factor, dtype=self.dtype)(
+                nn.LayerNorm(epsilon=1e-5, use_fast_variance=False, dtype=self.dtype)(x)
             )
         )
-        x = x + nn.Dense(self.embed_dim)(normed_x)
+        x = x + nn.Dense(self.embed_dim, dtype=self.dtype)(normed_x)
         return x
 
 
@@ -401,12 +598,28 @@ class GPTModule(nn.Module):
     # : Widening dimension
     widening_factor: int
 
+    # : The attention implementation
+    attention: str = CONST_DENSE_ATTENTION
+
+    # : The number of queries and keys per block for blockwise attention
+    attention_block_size: int = DEFAULT_ATTENTION_BLOCK_SIZE
+
+    # : The computation dtype, where the parameters are kept in float32
+    dtype: Any = jnp.float32
+
     @nn.compact
     def __call__(self, x: chex.Array, eval: bool, **kwargs) -> chex.Array:
         for idx, _ in enumerate(range(self.num_blocks)):
-            x = GPTBlock(self.num_heads, self.embed_dim, self.widening_factor)(x, eval)
+            x = GPTBlock(
+                self.num_heads,
+                self.embed_dim,
+                self.widening_factor,
+                self.attention,
+                self.attention_block_size,
+                self.dtype,
+            )(x, eval, **kwargs)
             # self.sow("gpt_latents", "gpt_{}".format(idx), x)
-        x = nn.LayerNorm(epsilon=1e-5, use_fast_variance=False)(x)
+        x = nn.LayerNorm(epsilon=1e-5, use_fast_variance=False, dtype=self.dtype)(x)
         # self.sow("gpt_latents", "gpt_{}".format(idx + 1), x)
         return x
 
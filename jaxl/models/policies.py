@@ -1,6 +1,6 @@
 from abc import ABC
 from types import SimpleNamespace
-from typing import Any, Callable, Dict, Union, Tuple
+from typing import Any, Callable, Dict, Optional, Union, Tuple
 
 import chex
 import jax
@@ -12,6 +12,7 @@ from jaxl.constants import *
 from jaxl.distributions import Bernoulli, Normal, Softmax, get_transform
 from jaxl.distributions.transforms import TanhTransform
 from jaxl.models.common import Model
+from jaxl.utils import normalize_with_running_mean_std
 
 
 class Policy(ABC):
@@ -36,6 +37,12 @@ class Policy(ABC):
 
     def __init__(self, model: Model) -> None:
         self.reset = jax.jit(self.make_reset(model))
+        self._step_action = jax.jit(
+            self.make_step_action(deterministic=False), static_argnames=["batched"]
+        )
+        self._deterministic_step_action = jax.jit(
+            self.make_step_action(deterministic=True), static_argnames=["batched"]
+        )
 
     def make_reset(self, model: Model) -> Callable[..., chex.Array]:
         """
@@ -59,6 +66,172 @@ class Policy(ABC):
 
         return _reset
 
+    def make_step_action(self, deterministic: bool) -> Callable[
+        [
+            Union[optax.Params, Dict[str, Any]],
+            chex.Array,
+            chex.Array,
+            jrandom.PRNGKey,
+            Optional[Dict[str, chex.Array]],
+            Optional[Tuple[chex.Array, chex.Array]],
+        ],
+        Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey],
+    ]:
+        """
+        Makes the function that takes a single environment step worth of inference.
+        The observation normalization, the action computation, the action clipping,
+        and the random number generator key update are fused into one function.
+        The action function is looked up when the function is traced,
+        such that subclasses can define it after calling this constructor.
+
+        :param deterministic: whether or not to use ``deterministic_action``
+        :type deterministic: bool
+        :return: a function for taking a single environment step worth of inference
+        :rtype: Callable[
+            [
+                Union[optax.Params, Dict[str, Any]],
+                chex.Array,
+                chex.Array,
+                jrandom.PRNGKey,
+                Optional[Dict[str, chex.Array]],
+                Optional[Tuple[chex.Array, chex.Array]],
+            ],
+            Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey],
+        ]
+
+        """
+
+        def step_action(
+            params: Union[optax.Params, Dict[str, Any]],
+            obs: chex.Array,
+            h_state: chex.Array,
+            key: jrandom.PRNGKey,
+            obs_rms_state: Optional[Dict[str, chex.Array]] = None,
+            action_bounds: Optional[Tuple[chex.Array, chex.Array]] = None,
+            batched: bool = False,
+            **kwargs,
+        ) -> Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey]:
+            """
+            Computes the action to take in the environment from a raw observation.
+
+            :param params: the model parameters
+            :param obs: the raw observation
+            :param h_state: the hidden state
+            :param key: the random number generator key for sampling
+            :param obs_rms_state: the running statistics for observations
+            :param action_bounds: the lower and upper bounds of the environment action
+            :param batched: whether or not the observation and the hidden state are batched
+            :type params: Union[optax.Params, Dict[str, Any]]
+            :type obs: chex.Array
+            :type h_state: chex.Array
+            :type key: jrandom.PRNGKey
+            :type obs_rms_state: Optional[Dict[str, chex.Array]]:  (Default value = None)
+            :type action_bounds: Optional[Tuple[chex.Array, chex.Array]]:  (Default value = None)
+            :type batched: bool:  (Default value = False)
+            :return: the clipped environment action, the action, the next hidden state,
+                and the next random number generator key
+            :rtype: Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey]
+
+            """
+            if not batched:
+                obs = obs[None]
+                h_state = h_state[None]
+            if obs_rms_state is not None:
+                obs = normalize_with_running_mean_std(obs_rms_state, obs)
+
+            if deterministic:
+                act, next_h_state = self.deterministic_action(
+                    params, obs, h_state, **kwargs
+                )
+            else:
+                act, next_h_state = self.compute_action(
+                    params, obs, h_state, key, **kwargs
+                )
+            if not batched:
+                act = act[0]
+                next_h_state = next_h_state[0]
+
+            env_act = act
+            if action_bounds is not None:
+                env_act = jnp.clip(act, *action_bounds)
+            return env_act, act, next_h_state, jrandom.split(key, 1)[0]
+
+        return step_action
+
+    def step_action(
+        self,
+        params: Union[optax.Params, Dict[str, Any]],
+        obs: chex.Array,
+        h_state: chex.Array,
+        key: jrandom.PRNGKey,
+        obs_rms_state: Optional[Dict[str, chex.Array]] = None,
+        action_bounds: Optional[Tuple[chex.Array, chex.Array]] = None,
+        batched: bool = False,
+    ) -> Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey]:
+        """
+        Computes the action to take in the environment from a raw observation
+        using ``compute_action``.
+
+        :param params: the model parameters
+        :param obs: the raw observation
+        :param h_state: the hidden state
+        :param key: the random number generator key for sampling
+        :param obs_rms_state: the running statistics for observations
+        :param action_bounds: the lower and upper bounds of the environment action
+        :param batched: whether or not the observation and the hidden state are batched
+        :type params: Union[optax.Params, Dict[str, Any]]
+        :type obs: chex.Array
+        :type h_state: chex.Array
+        :type key: jrandom.PRNGKey
+        :type obs_rms_state: Optional[Dict[str, chex.Array]]:  (Default value = None)
+        :type action_bounds: Optional[Tuple[chex.Array, chex.Array]]:  (Default value = None)
+        :type batched: bool:  (Default value = False)
+        :return: the clipped environment action, the action, the next hidden state,
+            and the next random number generator key
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey]
+
+        """
+        return self._step_action(
+            params, obs, h_state, key, obs_rms_state, action_bounds, batched=batched
+        )
+
+    def deterministic_step_action(
+        self,
+        params: Union[optax.Params, Dict[str, Any]],
+        obs: chex.Array,
+        h_state: chex.Array,
+        key: jrandom.PRNGKey,
+        obs_rms_state: Optional[Dict[str, chex.Array]] = None,
+        action_bounds: Optional[Tuple[chex.Array, chex.Array]] = None,
+        batched: bool = False,
+    ) -> Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey]:
+        """
+        Computes the action to take in the environment from a raw observation
+        using ``deterministic_action``.
+
+        :param params: the model parameters
+        :param obs: the raw observation
+        :param h_state: the hidden state
+        :param key: the random number generator key, which is only updated
+        :param obs_rms_state: the running statistics for observations
+        :param action_bounds: the lower and upper bounds of the environment action
+        :param batched: whether or not the observation and the hidden state are batched
+        :type params: Union[optax.Params, Dict[str, Any]]
+        :type obs: chex.Array
+        :type h_state: chex.Array
+        :type key: jrandom.PRNGKey
+        :type obs_rms_state: Optional[Dict[str, chex.Array]]:  (Default value = None)
+        :type action_bounds: Optional[Tuple[chex.Array, chex.Array]]:  (Default value = None)
+        :type batched: bool:  (Default value = False)
+        :return: the clipped environment action, the action, the next hidden state,
+            and the next random number generator key
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey]
+
+        """
+        return self._deterministic_step_action(
+            params, obs, h_state, key, obs_rms_state, action_bounds, batched=batched
+        )
+
 
 class StochasticPolicy(Policy):
     """Abstract stochastic policy class that extends ``Policy``."""
@@ -122,6 +295,7 @@ class MultitaskPolicy(Policy):
         obs: chex.Array,
         h_state: chex.Array,
         key: jrandom.PRNGKey,
+        policy_head: Optional[int] = None,
         **kwargs,
     ) -> Tuple[chex.Array, chex.Array]:
         """
@@ -131,22 +305,27 @@ class MultitaskPolicy(Policy):
         :param obs: the observation
         :param h_state: the hidden state
         :param key: the random number generator key for sampling
+        :param policy_head: the policy head index, defaults to ``policy_head``
         :type params: Union[optax.Params, Dict[str, Any]]
         :type obs: chex.Array
         :type h_state: chex.Array
         :type key: jrandom.PRNGKey
+        :type policy_head: Optional[int]:  (Default value = None)
         :return: an action and the next hidden state
         :rtype: Tuple[chex.Array, chex.Array]
 
         """
         acts, h_states = self.policy.compute_action(params, obs, h_state, key, **kwargs)
-        return acts[self.policy_head], h_states[self.policy_head]
+        if policy_head is None:
+            policy_head = self.policy_head
+        return acts[policy_head], h_states[policy_head]
 
     def deterministic_action(
         self,
         params: Union[optax.Params, Dict[str, Any]],
         obs: chex.Array,
         h_state: chex.Array,
+        policy_head: Optional[int] = None,
         **kwargs,
     ) -> Tuple[chex.Array, chex.Array]:
         """
@@ -155,9 +334,11 @@ class MultitaskPolicy(Policy):
         :param params: the model parameters
         :param obs: the observation
         :param h_state: the hidden state
+        :param policy_head: the policy head index, defaults to ``policy_head``
         :type params: Union[optax.Params, Dict[str, Any]]
         :type obs: chex.Array
         :type h_state: chex.Array
+        :type policy_head: Optional[int]:  (Default value = None)
         :return: an action and the next hidden state
         :rtype: Tuple[chex.Array, chex.Array]
 
@@ -165,7 +346,9 @@ class MultitaskPolicy(Policy):
         acts, h_states = self.policy.deterministic_action(
             params, obs, h_state, **kwargs
         )
-        return acts[self.policy_head], h_states[self.policy_head]
+        if policy_head is None:
+            policy_head = self.policy_head
+        return acts[policy_head], h_states[policy_head]
 
     def random_action(
         self,
@@ -173,6 +356,7 @@ class MultitaskPolicy(Policy):
         obs: chex.Array,
         h_state: chex.Array,
         key: jrandom.PRNGKey,
+        policy_head: Optional[int] = None,
         **kwargs,
     ) -> Tuple[chex.Array, chex.Array]:
         """
@@ -182,16 +366,112 @@ class MultitaskPolicy(Policy):
         :param obs: the observation
         :param h_state: the hidden state
         :param key: the random number generator key for sampling
+        :param policy_head: the policy head index, defaults to ``policy_head``
         :type params: Union[optax.Params, Dict[str, Any]]
         :type obs: chex.Array
         :type h_state: chex.Array
         :type key: jrandom.PRNGKey
+        :type policy_head: Optional[int]:  (Default value = None)
         :return: an action and the next hidden state
         :rtype: Tuple[chex.Array, chex.Array]
 
         """
         acts, h_states = self.policy.random_action(params, obs, h_state, key, **kwargs)
-        return acts[self.policy_head], h_states[self.policy_head]
+        if policy_head is None:
+            policy_head = self.policy_head
+        return acts[policy_head], h_states[policy_head]
+
+    def step_action(
+        self,
+        params: Union[optax.Params, Dict[str, Any]],
+        obs: chex.Array,
+        h_state: chex.Array,
+        key: jrandom.PRNGKey,
+        obs_rms_state: Optional[Dict[str, chex.Array]] = None,
+        action_bounds: Optional[Tuple[chex.Array, chex.Array]] = None,
+        batched: bool = False,
+    ) -> Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey]:
+        """
+        Computes the action to take in the environment from a raw observation
+        using ``compute_action``.
+        The policy head is passed as an argument, such that changing it does not
+        require recompilation.
+
+        :param params: the model parameters
+        :param obs: the raw observation
+        :param h_state: the hidden state
+        :param key: the random number generator key for sampling
+        :param obs_rms_state: the running statistics for observations
+        :param action_bounds: the lower and upper bounds of the environment action
+        :param batched: whether or not the observation and the hidden state are batched
+        :type params: Union[optax.Params, Dict[str, Any]]
+        :type obs: chex.Array
+        :type h_state: chex.Array
+        :type key: jrandom.PRNGKey
+        :type obs_rms_state: Optional[Dict[str, chex.Array]]:  (Default value = None)
+        :type action_bounds: Optional[Tuple[chex.Array, chex.Array]]:  (Default value = None)
+        :type batched: bool:  (Default value = False)
+        :return: the clipped environment action, the action, the next hidden state,
+            and the next random number generator key
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey]
+
+        """
+        return self._step_action(
+            params,
+            obs,
+            h_state,
+            key,
+            obs_rms_state,
+            action_bounds,
+            batched=batched,
+            policy_head=self.policy_head,
+        )
+
+    def deterministic_step_action(
+        self,
+        params: Union[optax.Params, Dict[str, Any]],
+        obs: chex.Array,
+        h_state: chex.Array,
+        key: jrandom.PRNGKey,
+        obs_rms_state: Optional[Dict[str, chex.Array]] = None,
+        action_bounds: Optional[Tuple[chex.Array, chex.Array]] = None,
+        batched: bool = False,
+    ) -> Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey]:
+        """
+        Computes the action to take in the environment from a raw observation
+        using ``deterministic_action``.
+        The policy head is passed as an argument, such that changing it does not
+        require recompilation.
+
+        :param params: the model parameters
+        :param obs: the raw observation
+        :param h_state: the hidden state
+        :param key: the random number generator key, which is only updated
+        :param obs_rms_state: the running statistics for observations
+        :param action_bounds: the lower and upper bounds of the environment action
+        :param batched: whether or not the observation and the hidden state are batched
+        :type params: Union[optax.Params, Dict[str, Any]]
+        :type obs: chex.Array
+        :type h_state: chex.Array
+        :type key: jrandom.PRNGKey
+        :type obs_rms_state: Optional[Dict[str, chex.Array]]:  (Default value = None)
+        :type action_bounds: Optional[Tuple[chex.Array, chex.Array]]:  (Default value = None)
+        :type batched: bool:  (Default value = False)
+        :return: the clipped environment action, the action, the next hidden state,
+            and the next random number generator key
+        :rtype: Tuple[chex.Array, chex.Array, chex.Array, jrandom.PRNGKey]
+
+        """
+        return self._deterministic_step_action(
+            params,
+            obs,
+            h_state,
+            key,
+            obs_rms_state,
+            action_bounds,
+            batched=batched,
+            policy_head=self.policy_head,
+        )
 
 
 class DeterministicPolicy(Policy):
@@ -15,6 +15,7 @@ from jaxl.models.common import (
     CNN,
     MLP,
     ResNetV1,
+    get_dtype,
 )
 from jaxl.models.encodings import get_positional_encoding
 from jaxl.models.modules import GPTModule
@@ -34,15 +35,21 @@ class InContextSupervisedTransformer(Model):
         positional_encoding: SimpleNamespace,
         query_pred_only: bool = False,
         input_output_same_encoding: bool = True,
+        attention: str = CONST_DENSE_ATTENTION,
+        attention_block_size: int = DEFAULT_ATTENTION_BLOCK_SIZE,
+        dtype: str = CONST_FLOAT32,
     ) -> None:
         self.gpt = GPTModule(
             num_blocks=num_blocks,
             num_heads=num_heads,
             embed_dim=embed_dim,
             widening_factor=widening_factor,
+            attention=attention,
+            attention_block_size=attention_block_size,
+            dtype=get_dtype(dtype),
         )
-        self.input_tokenizer = nn.Dense(embed_dim)
-        self.output_tokenizer = nn.Dense(embed_dim)
+        self.input_tokenizer = nn.Dense(embed_dim, dtype=get_dtype(dtype))
+        self.output_tokenizer = nn.Dense(embed_dim, dtype=get_dtype(dtype))
         self.predictor = nn.Dense(int(np.product(output_dim)))
         self.positional_encoding = get_positional_encoding(positional_encoding)
         self.num_tokens = num_contexts * 2 + 1
@@ -54,6 +61,8 @@ class InContextSupervisedTransformer(Model):
         self.tokenize = jax.jit(self.make_tokenize())
         self.get_latent = jax.jit(self.make_get_latent())
         self.forward = jax.jit(self.make_forward(query_pred_only))
+        self.forward_with_cache = jax.jit(self.make_forward_with_cache())
+        self.forward_prefixes = jax.jit(self.make_forward_prefixes())
 
     def _make_get_positional_encoding(
         self, input_output_same_encoding: bool
@@ -61,12 +70,18 @@ class InContextSupervisedTransformer(Model):
         if input_output_same_encoding:
 
             def apply_positional_encoding(
-                params, queries, input_embedding, context_output_embedding, **kwargs
+                params,
+                queries,
+                input_embedding,
+                context_output_embedding,
+                context_offset=0,
+                **kwargs,
             ):
                 # Treat input-output pair with same position
                 input_embedding = self.positional_encoding.apply(
                     params[CONST_POSITIONAL_ENCODING],
                     input_embedding,
+                    offset=context_offset,
                     **kwargs,
                 )
 
@@ -77,6 +92,7 @@ class InContextSupervisedTransformer(Model):
                 context_output_embedding = self.positional_encoding.apply(
                     params[CONST_POSITIONAL_ENCODING],
                     context_output_embedding,
+                    offset=context_offset,
                     **kwargs,
                 )
 
@@ -92,7 +108,12 @@ class InContextSupervisedTransformer(Model):
         else:
 
             def apply_positional_encoding(
-                params, queries, input_embedding, context_output_embedding, **kwargs
+                params,
+                queries,
+                input_embedding,
+                context_output_embedding,
+                context_offset=0,
+                **kwargs,
             ):
                 # Treat each token separately position
                 context_input_embedding, query_embedding = (
@@ -116,6 +137,7 @@ class InContextSupervisedTransformer(Model):
                 stacked_inputs = self.positional_encoding.apply(
                     params[CONST_POSITIONAL_ENCODING],
                     stacked_inputs,
+                    offset=2 * context_offset,
                     **kwargs,
                 )
                 return stacked_inputs
@@ -189,6 +211,7 @@ class InContextSupervisedTransformer(Model):
             queries: chex.Array,
             contexts: Dict[str, chex.Array],
             eval: bool = False,
+            context_offset: int = 0,
             **kwargs,
         ) -> Tuple[chex.Array, chex.Array]:
             """
@@ -197,9 +220,11 @@ class InContextSupervisedTransformer(Model):
             :param params: the model parameters
             :param queries: the queries
             :param contexts: the context with keys `context_input` and `context_output`
+            :param context_offset: the number of context pairs preceding the contexts
             :type params: Union[optax.Params, Dict[str, Any]]
             :type queries: chex.Array
             :type contexts: Dict[str, chex.Array]
+            :type context_offset: int:  (Default value = 0)
             :return: the output and a pass-through carry
             :rtype: Tuple[chex.Array, chex.Array]
 
@@ -228,7 +253,12 @@ class InContextSupervisedTransformer(Model):
             )
 
             stacked_inputs = self.apply_positional_encoding(
-                params, queries, input_embedding, context_output_embedding, **kwargs
+                params,
+                queries,
+                input_embedding,
+                context_output_embedding,
+                context_offset,
+                **kwargs,
             )
 
             return (
@@ -375,13 +405,199 @@ class InContextSupervisedTransformer(Model):
 
         return forward
 
+    def init_cache(self, batch_size: int) -> Dict[str, Any]:
+        """
+        Initializes an empty key-value cache for incremental inference.
+        The cache holds up to ``num_contexts`` context pairs.
+
+        :param batch_size: the number of sequences
+        :type batch_size: int
+        :return: the empty cache
+        :rtype: Dict[str, Any]
+
+        """
+        cache_shapes = jax.eval_shape(
+            lambda: self.gpt.init(
+                jrandom.PRNGKey(0),
+                jnp.zeros((batch_size, self.num_tokens, self.embed_dim)),
+                eval=True,
+                cache_index=0,
+            )[CONST_CACHE]
+        )
+        return {
+            CONST_GPT: jax.tree_util.tree_map(
+                lambda x: jnp.zeros(x.shape, x.dtype), cache_shapes
+            ),
+            CONST_NUM_CACHED_CONTEXTS: jnp.zeros((), dtype=jnp.int32),
+        }
+
+    def make_forward_with_cache(self) -> Callable[
+        [
+            Union[optax.Params, Dict[str, Any]],
+            Dict[str, Any],
+            chex.Array,
+            Dict[str, chex.Array],
+            bool,
+        ],
+        Tuple[chex.Array, chex.Array, Dict[str, Any]],
+    ]:
+        """
+        Makes the incremental forward call of the ICL model.
+
+        :return: the incremental forward call.
+        :rtype: Callable[
+            [
+                Union[optax.Params, Dict[str, Any]],
+                Dict[str, Any],
+                chex.Array,
+                Dict[str, chex.Array],
+                bool,
+            ],
+            Tuple[chex.Array, chex.Array, Dict[str, Any]],
+        ]
+        """
+
+        def forward_with_cache(
+            params: Union[optax.Params, Dict[str, Any]],
+            cache: Dict[str, Any],
+            queries: chex.Array,
+            contexts: Dict[str, chex.Array],
+            eval: bool = True,
+            **kwargs,
+        ) -> Tuple[chex.Array, chex.Array, Dict[str, Any]]:
+            """
+            Appends the new context pairs to the cache and predicts the queries
+            given every cached context pair.
+            Only the new tokens are passed through the GPT, where the query token is
+            not kept in the cache.
+
+            :param params: the model parameters
+            :param cache: the key-value cache from ``init_cache`` or a previous call
+            :param queries: the queries
+            :param contexts: the new context pairs with keys `context_input` and `context_output`
+            :param eval: whether or not to run in evaluation mode
+            :type params: Union[optax.Params, Dict[str, Any]]
+            :type cache: Dict[str, Any]
+            :type queries: chex.Array
+            :type contexts: Dict[str, chex.Array]
+            :type eval: bool:  (Default value = True)
+            :return: the query predictions, a pass-through carry, and the updated cache
+            :rtype: Tuple[chex.Array, chex.Array, Dict[str, Any]]
+
+            """
+            num_cached_contexts = cache[CONST_NUM_CACHED_CONTEXTS]
+            stacked_inputs, _, _ = self.tokenize(
+                params, queries, contexts, eval, num_cached_contexts, **kwargs
+            )
+            (repr, gpt_updates) = self.gpt.apply(
+                {**params[CONST_GPT], CONST_CACHE: cache[CONST_GPT]},
+                stacked_inputs,
+                eval,
+                cache_index=2 * num_cached_contexts,
+                mutable=[CONST_CACHE],
+            )
+            outputs = self.predictor.apply(
+                params[CONST_PREDICTOR],
+                repr[:, -1],
+            )
+
+            return (
+                outputs,
+                None,
+                {
+                    CONST_GPT: gpt_updates[CONST_CACHE],
+                    CONST_NUM_CACHED_CONTEXTS: num_cached_contexts
+                    + contexts[CONST_CONTEXT_INPUT].shape[1],
+                },
+            )
+
+        return forward_with_cache
+
+    def make_forward_prefixes(self) -> Callable[
+        [
+            Union[optax.Params, Dict[str, Any]],
+            chex.Array,
+            Dict[str, chex.Array],
+            bool,
+        ],
+        chex.Array,
+    ]:
+        """
+        Makes the forward call of the ICL model over every prefix of the context.
+
+        :return: the forward call over the prefixes.
+        :rtype: Callable[
+            [
+                Union[optax.Params, Dict[str, Any]],
+                chex.Array,
+                Dict[str, chex.Array],
+                bool,
+            ],
+            chex.Array,
+        ]
+        """
+
+        def forward_prefixes(
+            params: Union[optax.Params, Dict[str, Any]],
+            queries: chex.Array,
+            contexts: Dict[str, chex.Array],
+            eval: bool = True,
+            **kwargs,
+        ) -> chex.Array:
+            """
+            Predicts the queries given the first 1, 2, ..., context length context pairs,
+            by appending one context pair to the key-value cache at a time.
+
+            :param params: the model parameters
+            :param queries: the queries
+            :param contexts: the context with keys `context_input` and `context_output`
+            :param eval: whether or not to run in evaluation mode
+            :type params: Union[optax.Params, Dict[str, Any]]
+            :type queries: chex.Array
+            :type contexts: Dict[str, chex.Array]
+            :type eval: bool:  (Default value = True)
+            :return: the query predictions for each context length
+            :rtype: chex.Array
+
+            """
+
+            def append_context(cache, context):
+                context_input, context_output = context
+                outputs, _, cache = self.forward_with_cache(
+                    params,
+                    cache,
+                    queries,
+                    {
+                        **contexts,
+                        CONST_CONTEXT_INPUT: context_input[:, None],
+                        CONST_CONTEXT_OUTPUT: context_output[:, None],
+                    },
+                    eval,
+                    **kwargs,
+                )
+                return cache, outputs
+
+            _, outputs = jax.lax.scan(
+                append_context,
+                self.init_cache(len(queries)),
+                (
+                    jnp.swapaxes(contexts[CONST_CONTEXT_INPUT], 0, 1),
+                    jnp.swapaxes(contexts[CONST_CONTEXT_OUTPUT], 0, 1),
+                ),
+            )
+            return jnp.swapaxes(outputs, 0, 1)
+
+        return forward_prefixes
+
     def update_batch_stats(
         self, params: Dict[str, Any], batch_stats: Any
     ) -> Dict[str, Any]:
-        params[CONST_INPUT_TOKENIZER] = self.input_tokenizer.update_batch_stats(
-            params[CONST_INPUT_TOKENIZER],
-            batch_stats[CONST_INPUT_TOKENIZER],
-        )
+        # The input tokenizer is skipped when the input embeddings are precomputed
+        if batch_stats[CONST_INPUT_TOKENIZER] is not None:
+            params[CONST_INPUT_TOKENIZER] = self.input_tokenizer.update_batch_stats(
+                params[CONST_INPUT_TOKENIZER],
+                batch_stats[CONST_INPUT_TOKENIZER],
+            )
         params[CONST_OUTPUT_TOKENIZER] = self.output_tokenizer.update_batch_stats(
             params[CONST_OUTPUT_TOKENIZER],
             batch_stats[CONST_OUTPUT_TOKENIZER],
@@ -393,14 +609,18 @@ class InContextSupervisedTransformer(Model):
         return params
 
 
-def get_tokenizer(tokenizer_config: SimpleNamespace, embed_dim: int) -> Model:
+def get_tokenizer(
+    tokenizer_config: SimpleNamespace, embed_dim: int, dtype: str = CONST_FLOAT32
+) -> Model:
     """
     Get tokenizer.
 
     :param tokenizer_config: the tokenizer configuration
     :param embed_dim: the embedding dimension
+    :param dtype: the computation dtype
     :type tokenizer_config: SimpleNameSpace
     :type embed_dim: int
+    :type dtype: str:  (Default value = CONST_FLOAT32)
     :return: a tokenizer
     :rtype: Model
     """
@@ -418,6 +638,7 @@ def get_tokenizer(tokenizer_config: SimpleNamespace, embed_dim: int) -> Model:
             ),
             use_batch_norm=getattr(tokenizer_kwargs, "use_batch_norm", False),
             use_bias=getattr(tokenizer_kwargs, "use_bias", False),
+            dtype=dtype,
         )
     elif tokenizer_config.type == CONST_CNN:
         return CNN(
@@ -429,6 +650,7 @@ def get_tokenizer(tokenizer_config: SimpleNamespace, embed_dim: int) -> Model:
                 tokenizer_kwargs, "output_activation", CONST_IDENTITY
             ),
             use_batch_norm=getattr(tokenizer_kwargs, "use_batch_norm", False),
+            dtype=dtype,
         )
     elif tokenizer_config.type == CONST_RESNET:
         return ResNetV1(
@@ -438,6 +660,7 @@ def get_tokenizer(tokenizer_config: SimpleNamespace, embed_dim: int) -> Model:
             use_projection=tokenizer_kwargs.use_projection,
             use_bottleneck=tokenizer_kwargs.use_bottleneck,
             use_batch_norm=getattr(tokenizer_kwargs, "use_batch_norm", True),
+            dtype=dtype,
         )
     else:
         raise ValueError(
@@ -461,15 +684,21 @@ class CustomTokenizerICSupervisedTransformer(InContextSupervisedTransformer):
         output_tokenizer_config: SimpleNamespace,
         query_pred_only: bool = False,
         input_output_same_encoding: bool = True,
+        attention: str = CONST_DENSE_ATTENTION,
+        attention_block_size: int = DEFAULT_ATTENTION_BLOCK_SIZE,
+        dtype: str = CONST_FLOAT32,
     ) -> None:
         self.gpt = GPTModule(
             num_blocks=num_blocks,
             num_heads=num_heads,
             embed_dim=embed_dim,
             widening_factor=widening_factor,
+            attention=attention,
+            attention_block_size=attention_block_size,
+            dtype=get_dtype(dtype),
         )
-        self.input_tokenizer = get_tokenizer(input_tokenizer_config, embed_dim)
-        self.output_tokenizer = get_tokenizer(output_tokenizer_config, embed_dim)
+        self.input_tokenizer = get_tokenizer(input_tokenizer_config, embed_dim, dtype)
+        self.output_tokenizer = get_tokenizer(output_tokenizer_config, embed_dim, dtype)
         self.predictor = nn.Dense(int(np.product(output_dim)))
         self.positional_encoding = get_positional_encoding(positional_encoding)
         self.num_tokens = num_contexts * 2 + 1
@@ -483,6 +712,12 @@ class CustomTokenizerICSupervisedTransformer(InContextSupervisedTransformer):
         self.forward = jax.jit(
             self.make_forward(query_pred_only), static_argnames=[CONST_EVAL]
         )
+        self.forward_with_cache = jax.jit(
+            self.make_forward_with_cache(), static_argnames=[CONST_EVAL]
+        )
+        self.forward_prefixes = jax.jit(
+            self.make_forward_prefixes(), static_argnames=[CONST_EVAL]
+        )
 
     def make_tokenize(
         self,
@@ -516,6 +751,7 @@ class CustomTokenizerICSupervisedTransformer(InContextSupervisedTransformer):
             queries: chex.Array,
             contexts: Dict[str, chex.Array],
             eval: bool = False,
+            context_offset: int = 0,
             **kwargs,
         ) -> Tuple[chex.Array, chex.Array, Any]:
             """
@@ -524,26 +760,35 @@ class CustomTokenizerICSupervisedTransformer(InContextSupervisedTransformer):
             :param params: the model parameters
             :param queries: the queries
             :param contexts: the context with keys `context_input` and `context_output`
+            :param context_offset: the number of context pairs preceding the contexts
             :type params: Union[optax.Params, Dict[str, Any]]
             :type queries: chex.Array
             :type contexts: Dict[str, chex.Array]
+            :type context_offset: int:  (Default value = 0)
             :return: the output and a pass-through carry
             :rtype: Tuple[chex.Array, chex.Array, Any]
 
             """
-            input_embedding, _, input_updates = self.input_tokenizer.forward(
-                params[CONST_INPUT_TOKENIZER],
-                jnp.concatenate(
-                    (
-                        contexts[CONST_CONTEXT_INPUT],
-                        queries,
+            if CONST_INPUT_EMBEDDINGS in contexts:
+                # The inputs are exemplar indices into the precomputed embeddings
+                input_embedding = contexts[CONST_INPUT_EMBEDDINGS][
+                    jnp.concatenate((contexts[CONST_CONTEXT_INPUT], queries), axis=1)
+                ]
+                input_updates = None
+            else:
+                input_embedding, _, input_updates = self.input_tokenizer.forward(
+                    params[CONST_INPUT_TOKENIZER],
+                    jnp.concatenate(
+                        (
+                            contexts[CONST_CONTEXT_INPUT],
+                            queries,
+                        ),
+                        axis=1,
                     ),
-                    axis=1,
-                ),
-                None,
-                eval,
-                **kwargs,
-            )
+                    None,
+                    eval,
+                    **kwargs,
+                )
             context_output_embedding, _, output_updates = self.output_tokenizer.forward(
                 params[CONST_OUTPUT_TOKENIZER],
                 contexts[CONST_CONTEXT_OUTPUT],
@@ -553,7 +798,12 @@ class CustomTokenizerICSupervisedTransformer(InContextSupervisedTransformer):
             )
 
             stacked_inputs = self.apply_positional_encoding(
-                params, queries, input_embedding, context_output_embedding, **kwargs
+                params,
+                queries,
+                input_embedding,
+                context_output_embedding,
+                context_offset,
+                **kwargs,
             )
 
             return (
@@ -584,15 +834,21 @@ class AsyncCustomTokenizerICSupervisedTransformer(InContextSupervisedTransformer
         output_tokenizer_config: SimpleNamespace,
         query_pred_only: bool = False,
         input_output_same_encoding: bool = True,
+        attention: str = CONST_DENSE_ATTENTION,
+        attention_block_size: int = DEFAULT_ATTENTION_BLOCK_SIZE,
+        dtype: str = CONST_FLOAT32,
     ) -> None:
         self.gpt = GPTModule(
             num_blocks=num_blocks,
             num_heads=num_heads,
             embed_dim=embed_dim,
             widening_factor=widening_factor,
+            attention=attention,
+            attention_block_size=attention_block_size,
+            dtype=get_dtype(dtype),
         )
-        self.input_tokenizer = get_tokenizer(input_tokenizer_config, embed_dim)
-        self.output_tokenizer = get_tokenizer(output_tokenizer_config, embed_dim)
+        self.input_tokenizer = get_tokenizer(input_tokenizer_config, embed_dim, dtype)
+        self.output_tokenizer = get_tokenizer(output_tokenizer_config, embed_dim, dtype)
         self.predictor = nn.Dense(int(np.product(output_dim)))
         self.positional_encoding = get_positional_encoding(positional_encoding)
         self.num_tokens = num_contexts * 2 + 1
@@ -606,6 +862,12 @@ class AsyncCustomTokenizerICSupervisedTransformer(InContextSupervisedTransformer
         self.forward = jax.jit(
             self.make_forward(query_pred_only), static_argnames=[CONST_EVAL]
         )
+        self.forward_with_cache = jax.jit(
+            self.make_forward_with_cache(), static_argnames=[CONST_EVAL]
+        )
+        self.forward_prefixes = jax.jit(
+            self.make_forward_prefixes(), static_argnames=[CONST_EVAL]
+        )
 
     def make_tokenize(
         self,
@@ -639,6 +901,7 @@ class AsyncCustomTokenizerICSupervisedTransformer(InContextSupervisedTransformer
             queries: chex.Array,
             contexts: Dict[str, chex.Array],
             eval: bool = False,
+            context_offset: int = 0,
             **kwargs,
         ) -> Tuple[chex.Array, chex.Array, Any]:
             """
@@ -647,31 +910,40 @@ class AsyncCustomTokenizerICSupervisedTransformer(InContextSupervisedTransformer
             :param params: the model parameters
             :param queries: the queries
             :param contexts: the context with keys `context_input` and `context_output`
+            :param context_offset: the number of context pairs preceding the contexts
             :type params: Union[optax.Params, Dict[str, Any]]
             :type queries: chex.Array
             :type contexts: Dict[str, chex.Array]
+            :type context_offset: int:  (Default value = 0)
             :return: the output and a pass-through carry
             :rtype: Tuple[chex.Array, chex.Array, Any]
 
             """
-            input_embedding, _, input_updates = jax.vmap(
-                self.input_tokenizer.forward, in_axes=[None, 0, None, None]
-            )(
-                params[CONST_INPUT_TOKENIZER],
-                jnp.concatenate(
-                    (
-                        contexts[CONST_CONTEXT_INPUT],
-                        queries,
+            if CONST_INPUT_EMBEDDINGS in contexts:
+                # The inputs are exemplar indices into the precomputed embeddings
+                input_embedding = contexts[CONST_INPUT_EMBEDDINGS][
+                    jnp.concatenate((contexts[CONST_CONTEXT_INPUT], queries), axis=1)
+                ]
+                input_updates = None
+            else:
+                input_embedding, _, input_updates = jax.vmap(
+                    self.input_tokenizer.forward, in_axes=[None, 0, None, None]
+                )(
+                    params[CONST_INPUT_TOKENIZER],
+                    jnp.concatenate(
+                        (
+                            contexts[CONST_CONTEXT_INPUT],
+                            queries,
+                        ),
+                        axis=1,
                     ),
-                    axis=1,
-                ),
-                None,
-                eval,
-                **kwargs,
-            )
+                    None,
+                    eval,
+                    **kwargs,
+                )
 
-            # Only take the first update
-            input_updates = jax.tree_util.tree_map(lambda x: x[0], input_updates)
+                # Only take the first update
+                input_updates = jax.tree_util.tree_map(lambda x: x[0], input_updates)
             context_output_embedding, _, output_updates = self.output_tokenizer.forward(
                 params[CONST_OUTPUT_TOKENIZER],
                 contexts[CONST_CONTEXT_OUTPUT],
@@ -681,7 +953,12 @@ class AsyncCustomTokenizerICSupervisedTransformer(InContextSupervisedTransformer
             )
 
             stacked_inputs = self.apply_positional_encoding(
-                params, queries, input_embedding, context_output_embedding, **kwargs
+                params,
+                queries,
+                input_embedding,
+                context_output_embedding,
+                context_offset,
+                **kwargs,
             )
 
             return (
@@ -712,15 +989,21 @@ class NoTokenizerICSupervisedTransformer(InContextSupervisedTransformer):
         output_tokenizer_config: SimpleNamespace,
         query_pred_only: bool = False,
         input_output_same_encoding: bool = True,
+        attention: str = CONST_DENSE_ATTENTION,
+        attention_block_size: int = DEFAULT_ATTENTION_BLOCK_SIZE,
+        dtype: str = CONST_FLOAT32,
     ) -> None:
         self.gpt = GPTModule(
             num_blocks=num_blocks,
             num_heads=num_heads,
             embed_dim=embed_dim,
             widening_factor=widening_factor,
+            attention=attention,
+            attention_block_size=attention_block_size,
+            dtype=get_dtype(dtype),
         )
-        self.input_tokenizer = get_tokenizer(input_tokenizer_config, embed_dim)
-        self.output_tokenizer = get_tokenizer(output_tokenizer_config, embed_dim)
+        self.input_tokenizer = get_tokenizer(input_tokenizer_config, embed_dim, dtype)
+        self.output_tokenizer = get_tokenizer(output_tokenizer_config, embed_dim, dtype)
         self.predictor = nn.Dense(int(np.product(output_dim)))
         self.positional_encoding = get_positional_encoding(positional_encoding)
         self.num_tokens = num_contexts * 2 + 1
@@ -734,6 +1017,12 @@ class NoTokenizerICSupervisedTransformer(InContextSupervisedTransformer):
         self.forward = jax.jit(
             self.make_forward(query_pred_only), static_argnames=[CONST_EVAL]
         )
+        self.forward_with_cache = jax.jit(
+            self.make_forward_with_cache(), static_argnames=[CONST_EVAL]
+        )
+        self.forward_prefixes = jax.jit(
+            self.make_forward_prefixes(), static_argnames=[CONST_EVAL]
+        )
 
     def make_tokenize(
         self,
@@ -767,6 +1056,7 @@ class NoTokenizerICSupervisedTransformer(InContextSupervisedTransformer):
             queries: chex.Array,
             contexts: Dict[str, chex.Array],
             eval: bool = False,
+            context_offset: int = 0,
             **kwargs,
         ) -> Tuple[chex.Array, chex.Array, Any]:
             """
@@ -775,9 +1065,11 @@ class NoTokenizerICSupervisedTransformer(InContextSupervisedTransformer):
             :param params: the model parameters
             :param queries: the queries
             :param contexts: the context with keys `context_input` and `context_output`
+            :param context_offset: the number of context pairs preceding the contexts
             :type params: Union[optax.Params, Dict[str, Any]]
             :type queries: chex.Array
             :type contexts: Dict[str, chex.Array]
+            :type context_offset: int:  (Default value = 0)
             :return: the output and a pass-through carry
             :rtype: Tuple[chex.Array, chex.Array, Any]
 
@@ -800,7 +1092,12 @@ class NoTokenizerICSupervisedTransformer(InContextSupervisedTransformer):
             )
 
             stacked_inputs = self.apply_positional_encoding(
-                params, queries, input_embedding, context_output_embedding, **kwargs
+                params,
+                queries,
+                input_embedding,
+                context_output_embedding,
+                context_offset,
+                **kwargs,
             )
 
             return (
@@ -813,3 +1110,108 @@ class NoTokenizerICSupervisedTransformer(InContextSupervisedTransformer):
             )
 
         return tokenize
+
+
+class InputEmbeddingCache:
+    """
+    Precomputed input tokenizer embeddings of a fixed set of exemplars.
+    When the contexts include ``CONST_INPUT_EMBEDDINGS``, the custom tokenizer ICL models
+    gather the embeddings by exemplar index instead of running the input tokenizer.
+    The last row is the embedding of the padding input, such that index -1 corresponds
+    to the padded context positions.
+    XXX: The embeddings are computed in evaluation mode, so the cache is only valid
+         for a frozen input tokenizer with deterministic inputs.
+    """
+
+    def __init__(
+        self,
+        model: InContextSupervisedTransformer,
+        get_inputs: Callable[[chex.Array], chex.Array],
+        num_inputs: int,
+        batch_size: int = 1024,
+    ):
+        self._model = model
+        self._get_inputs = get_inputs
+        self._num_inputs = num_inputs
+        self._batch_size = batch_size
+        self._embeddings = None
+        self._version = None
+        self.embed = jax.jit(self.make_embed())
+
+    def make_embed(
+        self,
+    ) -> Callable[[Union[optax.Params, Dict[str, Any]], chex.Array], chex.Array]:
+        """
+        Makes the embed call of the input tokenizer.
+
+        :return: the embed call.
+        :rtype: Callable[[Union[optax.Params, Dict[str, Any]], chex.Array], chex.Array]
+        """
+
+        def embed(
+            params: Union[optax.Params, Dict[str, Any]],
+            inputs: chex.Array,
+        ) -> chex.Array:
+            """
+            Embeds the inputs with the input tokenizer in evaluation mode.
+
+            :param params: the ICL model parameters
+            :param inputs: the inputs
+            :type params: Union[optax.Params, Dict[str, Any]]
+            :type inputs: chex.Array
+            :return: the embeddings
+            :rtype: chex.Array
+
+            """
+            embeddings, _, _ = self._model.input_tokenizer.forward(
+                params[CONST_INPUT_TOKENIZER], inputs, None, True
+            )
+            return embeddings
+
+        return embed
+
+    @property
+    def num_inputs(self) -> int:
+        """The number of exemplars."""
+        return self._num_inputs
+
+    def compute_embeddings(
+        self, params: Union[optax.Params, Dict[str, Any]]
+    ) -> chex.Array:
+        """
+        Computes the embeddings of every exemplar in batches.
+
+        :param params: the ICL model parameters
+        :type params: Union[optax.Params, Dict[str, Any]]
+        :return: the embeddings, followed by the embedding of the padding input
+        :rtype: chex.Array
+
+        """
+        embeddings = []
+        for start_i in range(0, self._num_inputs, self._batch_size):
+            idxes = np.arange(
+                start_i, min(start_i + self._batch_size, self._num_inputs)
+            )
+            embeddings.append(self.embed(params, self._get_inputs(idxes)))
+        embeddings.append(self.embed(params, self._get_inputs(np.array([-1]))))
+        return jnp.concatenate(embeddings)
+
+    def get_embeddings(
+        self, params: Union[optax.Params, Dict[str, Any]], version: Any = None
+    ) -> chex.Array:
+        """
+        Gets the embeddings of every exemplar.
+        The embeddings are only recomputed when the parameter version changes.
+
+        :param params: the ICL model parameters
+        :param version: the version of the parameters (e.g. the checkpoint step)
+        :type params: Union[optax.Params, Dict[str, Any]]
+        :type version: Any:  (Default value = None)
+        :return: the embeddings, followed by the embedding of the padding input
+        :rtype: chex.Array
+
+        """
+        if self._embeddings is None or version != self._version:
+            self._embeddings = self.compute_embeddings(params)
+            self._version = version
+        return self._embeddings
@@ -1,13 +1,17 @@
 from types import SimpleNamespace
-from typing import Any, Dict, Tuple, Union, Sequence, Iterable
+from typing import Any, Dict, Optional, Tuple, Union, Sequence, Iterable
 
 import chex
-import dill
 import json
 import numpy as np
 import optax
 import os
 
+from jaxl.checkpoint_utils import (
+    get_checkpoint_step,
+    list_checkpoints,
+    load_checkpoint,
+)
 from jaxl.constants import *
 from jaxl.models.common import (
     CNN,
@@ -61,6 +65,7 @@ def get_model(
             getattr(model_config, "use_batch_norm", False),
             getattr(model_config, "use_bias", True),
             getattr(model_config, "flatten", False),
+            getattr(model_config, "dtype", CONST_FLOAT32),
         )
     elif model_config.architecture == CONST_CNN:
         return CNN(
@@ -70,6 +75,7 @@ def get_model(
             getattr(model_config, "activation", CONST_RELU),
             getattr(model_config, "output_activation", CONST_IDENTITY),
             getattr(model_config, "use_batch_norm", False),
+            getattr(model_config, "dtype", CONST_FLOAT32),
         )
     elif model_config.architecture == CONST_ENCODER_PREDICTOR:
         encoder = get_model(input_dim, model_config.encoder_dim, model_config.encoder)
@@ -90,6 +96,14 @@ def get_model(
             model, model_config.num_models, getattr(model_config, "vmap_all", True)
         )
     elif model_config.architecture == CONST_ICL_GPT:
+        attention = getattr(model_config, "attention", CONST_DENSE_ATTENTION)
+        assert (
+            attention in VALID_ATTENTION
+        ), f"{attention} is not supported (one of {VALID_ATTENTION})"
+        attention_block_size = getattr(
+            model_config, "attention_block_size", DEFAULT_ATTENTION_BLOCK_SIZE
+        )
+        dtype = getattr(model_config, "dtype", CONST_FLOAT32)
         if hasattr(model_config, CONST_INPUT_TOKENIZER) and hasattr(
             model_config, CONST_OUTPUT_TOKENIZER
         ):
@@ -111,6 +125,9 @@ def get_model(
                 model_config.output_tokenizer,
                 getattr(model_config, "query_pred_only", False),
                 getattr(model_config, "input_output_same_encoding", True),
+                attention,
+                attention_block_size,
+                dtype,
             )
         return InContextSupervisedTransformer(
             output_dim,
@@ -122,6 +139,9 @@ def get_model(
             model_config.positional_encoding,
             getattr(model_config, "query_pred_only", False),
             getattr(model_config, "input_output_same_encoding", True),
+            attention,
+            attention_block_size,
+            dtype,
         )
     else:
         raise NotImplementedError
@@ -253,12 +273,10 @@ def load_model(
 
     model = get_model(input_dim, output_dim, config.model_config)
 
-    all_steps = sorted(os.listdir(os.path.join(learner_path, "models")))
+    all_steps = list_checkpoints(os.path.join(learner_path, "models"))
     to_load = min(len(all_steps) - 1, checkpoint_i)
     print("Loading checkpoint: {}".format(all_steps[to_load]))
-    params = dill.load(
-        open(os.path.join(learner_path, "models", all_steps[to_load]), "rb")
-    )
+    params = load_checkpoint(os.path.join(learner_path, "models", all_steps[to_load]))
 
     return params, model
 
@@ -267,6 +285,7 @@ def iterate_models(
     input_dim: Sequence[int],
     output_dim: Sequence[int],
     learner_path: str,
+    keys: Optional[Sequence[str]] = None,
 ) -> Iterable[Tuple[Dict, Model, int]]:
     """
     An iterator that yields the model and the each checkpointed parameters
@@ -274,9 +293,11 @@ def iterate_models(
     :param input_dim: the input dimensionality
     :param output_dim: the output dimensionality
     :param learner_path: the path that stores the experiment configuation
+    :param keys: the paths of the checkpoint subtrees to load, loads everything if None
     :type input_dim: Sequence[int]
     :type output_dim: Sequence[int]
     :type learner_path: str
+    :type keys: Optional[Sequence[str]]:  (Default value = None)
     :return: an iterable of the model, the parameters, and the i'th checkpoint
     :rtype: Iterable[Tuple[Dict, Model, int]]
     """
@@ -287,7 +308,7 @@ def iterate_models(
 
     model = get_model(input_dim, output_dim, config.model_config)
 
-    all_steps = sorted(os.listdir(os.path.join(learner_path, "models")))
+    all_steps = list_checkpoints(os.path.join(learner_path, "models"))
     for step in all_steps:
-        params = dill.load(open(os.path.join(learner_path, "models", step), "rb"))
-        yield params, model, int(step.split(".dill")[0])
+        params = load_checkpoint(os.path.join(learner_path, "models", step), keys)
+        yield params, model, get_checkpoint_step(step)
@@ -1,12 +1,15 @@
 from types import SimpleNamespace
-from typing import Any, Callable, Dict, Iterable, Iterator, Sequence, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
 
 import chex
+import dill
 import jax
 import jax.numpy as jnp
 import numpy as np
 import os
+import queue
 import random
+import threading
 import torch
 
 from jaxl.constants import *
@@ -20,6 +23,14 @@ def get_device(device):
     (device_name, *device_ids) = device.split(":")
     if device_name == CONST_CPU:
         os.environ["CUDA_VISIBLE_DEVICES"] = ""
+        if len(device_ids) > 0:
+            # Splits the host into multiple CPU devices for data-parallel training
+            os.environ["XLA_FLAGS"] = " ".join(
+                (
+                    os.environ.get("XLA_FLAGS", ""),
+                    f"--xla_force_host_platform_device_count={device_ids[0]}",
+                )
+            ).strip()
     elif device_name == CONST_GPU:
         assert (
             len(device_ids) > 0
@@ -239,18 +250,245 @@ class DummySummaryWriter:
         pass
 
 
+class AsyncCheckpointWriter:
+    """
+    Writes checkpoints on a background thread.
+    The checkpoint is snapshotted on the calling thread, then serialized
+    and written atomically through a temporary path.
+    """
+
+    def __init__(self, max_in_flight: int = 2):
+        assert (
+            max_in_flight > 0
+        ), f"max_in_flight needs to be at least 1, got {max_in_flight}"
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def _write_loop(self):
+        """Writes the queued checkpoints until the writer is closed."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+
+            obj, save_path, save_fn = item
+            try:
+                save_fn(obj, save_path)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._in_flight.release()
+                self._queue.task_done()
+
+    @staticmethod
+    def _save_dill(obj: Any, save_path: str):
+        """
+        Writes the object with dill atomically.
+
+        :param obj: the object to write
+        :param save_path: the file path to write the object to
+        :type obj: Any
+        :type save_path: str
+
+        """
+        tmp_path = f"{save_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            dill.dump(obj, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, save_path)
+
+    def _raise_error(self):
+        """Raises the error from the background thread, if any."""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def save(
+        self,
+        obj: Any,
+        save_path: str,
+        save_fn: Optional[Callable[[Any, str], None]] = None,
+    ):
+        """
+        Snapshots the object and queues it to be written.
+        This only blocks when there are too many checkpoints in flight.
+
+        :param obj: the object to checkpoint
+        :param save_path: the path to write the object to
+        :param save_fn: the function that writes the object, defaults to dill
+        :type obj: Any
+        :type save_path: str
+        :type save_fn: Optional[Callable[[Any, str], None]]:  (Default value = None)
+
+        """
+        if save_fn is None:
+            save_fn = self._save_dill
+        self._raise_error()
+        obj = jax.tree_util.tree_map(
+            lambda x: np.array(x) if isinstance(x, (np.ndarray, jax.Array)) else x,
+            obj,
+        )
+        self._in_flight.acquire()
+        self._queue.put((obj, save_path, save_fn))
+
+    def flush(self):
+        """Waits until all queued checkpoints are written."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Flushes the queued checkpoints and stops the background thread."""
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+
+def init_running_mean_std(
+    shape: Sequence[int] = (),
+    epsilon: float = 1e-4,
+    a_min: float = -5.0,
+    a_max: float = 5.0,
+) -> Dict[str, chex.Array]:
+    """
+    Initializes the running statistics as a PyTree.
+    The running statistics can be passed to jitted functions and is
+    updated functionally using ``update_running_mean_std``.
+    The count is a 32-bit integer, which is exact up to 2^31 - 1 inputs and then
+    saturates, such that the later batches are weighted as if that many inputs were seen.
+
+    :param shape: the shape of a single input
+    :param epsilon: the constant for numerical stability
+    :param a_min: the minimum value of the normalized data
+    :param a_max: the maximum value of the normalized data
+    :type shape: Sequence[int]:  (Default value = ())
+    :type epsilon: float:  (Default value = 1e-4)
+    :type a_min: float:  (Default value = -5.0)
+    :type a_max: float:  (Default value = 5.0)
+    :return: the running statistics
+    :rtype: Dict[str, chex.Array]
+
+    """
+    assert epsilon > 0.0, f"epsilon needs to be positive, got {epsilon}"
+    return {
+        CONST_MEAN: jnp.zeros(shape),
+        CONST_VAR: jnp.ones(shape),
+        CONST_COUNT: jnp.zeros((), dtype=jnp.int32),
+        CONST_EPSILON: jnp.asarray(epsilon, dtype=jnp.float32),
+        CONST_A_MIN: jnp.asarray(a_min, dtype=jnp.float32),
+        CONST_A_MAX: jnp.asarray(a_max, dtype=jnp.float32),
+    }
+
+
+def update_running_mean_std(
+    rms_state: Dict[str, chex.Array], x: chex.Array
+) -> Dict[str, chex.Array]:
+    """
+    Updates the running statistics with a batch of data.
+    The batch size is static, hence an empty batch leaves the statistics unchanged.
+
+    :param rms_state: the running statistics
+    :param x: the data
+    :type rms_state: Dict[str, chex.Array]
+    :type x: chex.Array
+    :return: the updated running statistics
+    :rtype: Dict[str, chex.Array]
+
+    """
+    mean = rms_state[CONST_MEAN]
+    x = x.reshape(-1, *mean.shape)
+    batch_count = x.shape[0]
+    if batch_count == 0:
+        return rms_state
+
+    batch_mean = jnp.mean(x, axis=0)
+    batch_var = jnp.var(x, axis=0)
+    count = rms_state[CONST_COUNT]
+
+    # The statistics are combined through the batch proportion to avoid overflowing the count
+    # The count saturates instead of wrapping around
+    delta = batch_mean - mean
+    count = jnp.minimum(count, jnp.iinfo(jnp.int32).max - batch_count)
+    tot_count = count + batch_count
+    batch_ratio = batch_count / tot_count
+    count_ratio = count / tot_count
+    return {
+        **rms_state,
+        CONST_MEAN: mean + delta * batch_ratio,
+        CONST_VAR: rms_state[CONST_VAR] * count_ratio
+        + batch_var * batch_ratio
+        + (delta**2) * count_ratio * batch_ratio,
+        CONST_COUNT: tot_count,
+    }
+
+
+def normalize_with_running_mean_std(
+    rms_state: Dict[str, chex.Array], x: chex.Array
+) -> chex.Array:
+    """
+    Normalizes the data using running statistics.
+    The normalized data is clipped and NaNs are replaced with zeros.
+
+    :param rms_state: the running statistics
+    :param x: the data
+    :type rms_state: Dict[str, chex.Array]
+    :type x: chex.Array
+    :return: the normalized data
+    :rtype: chex.Array
+
+    """
+    mean = rms_state[CONST_MEAN]
+    normalized_x = jnp.clip(
+        (x.reshape(-1, *mean.shape) - mean)
+        / jnp.sqrt(rms_state[CONST_VAR] + rms_state[CONST_EPSILON]),
+        rms_state[CONST_A_MIN],
+        rms_state[CONST_A_MAX],
+    )
+    normalized_x = jnp.where(jnp.isnan(normalized_x), 0.0, normalized_x)
+    return normalized_x.reshape(x.shape)
+
+
+def unnormalize_with_running_mean_std(
+    rms_state: Dict[str, chex.Array], x: chex.Array
+) -> chex.Array:
+    """
+    Unnormalizes the data using running statistics.
+
+    :param rms_state: the running statistics
+    :param x: the normalized data
+    :type rms_state: Dict[str, chex.Array]
+    :type x: chex.Array
+    :return: the unnormalized data
+    :rtype: chex.Array
+
+    """
+    mean = rms_state[CONST_MEAN]
+    return (
+        x.reshape(-1, *mean.shape)
+        * jnp.sqrt(rms_state[CONST_VAR] + rms_state[CONST_EPSILON])
+        + mean
+    ).reshape(x.shape)
+
+
 class RunningMeanStd:
     """
     This keeps track of the running mean and standard deviation.
     Modified from Baseline.
     Assumes shape to be (number of inputs, input_shape).
+    The statistics are kept on device as a PyTree, see ``rms_state``,
+    and are updated through the jitted functional implementation.
     """
 
-    #: The running mean
-    mean: chex.Array
+    #: The running statistics
+    rms_state: Dict[str, chex.Array]
 
-    #: The running variance
-    var: chex.Array
+    _update = staticmethod(jax.jit(update_running_mean_std))
+    _normalize = staticmethod(jax.jit(normalize_with_running_mean_std))
+    _unnormalize = staticmethod(jax.jit(unnormalize_with_running_mean_std))
 
     def __init__(
         self,
@@ -259,14 +497,23 @@ class RunningMeanStd:
         a_min: float = -5.0,
         a_max: float = 5.0,
     ):
-        assert epsilon > 0.0
         self.shape = shape
-        self.mean = np.zeros(shape, dtype=float)
-        self.var = np.ones(shape, dtype=float)
-        self.epsilon = epsilon
-        self.count = 0
-        self.a_min = a_min
-        self.a_max = a_max
+        self.rms_state = init_running_mean_std(shape, epsilon, a_min, a_max)
+
+    @property
+    def mean(self) -> np.ndarray:
+        """The running mean."""
+        return np.asarray(self.rms_state[CONST_MEAN])
+
+    @property
+    def var(self) -> np.ndarray:
+        """The running variance."""
+        return np.asarray(self.rms_state[CONST_VAR])
+
+    @property
+    def count(self) -> int:
+        """The amount of data seen."""
+        return self.rms_state[CONST_COUNT].item()
 
     def get_state(self) -> Dict[str, Any]:
         """
@@ -280,10 +527,10 @@ class RunningMeanStd:
             CONST_SHAPE: self.shape,
             CONST_MEAN: self.mean,
             CONST_VAR: self.var,
-            CONST_EPSILON: self.epsilon,
+            CONST_EPSILON: self.rms_state[CONST_EPSILON].item(),
             CONST_COUNT: self.count,
-            CONST_A_MIN: self.a_min,
-            CONST_A_MAX: self.a_max,
+            CONST_A_MIN: self.rms_state[CONST_A_MIN].item(),
+            CONST_A_MAX: self.rms_state[CONST_A_MAX].item(),
         }
 
     def set_state(self, state: Dict[str, Any]):
@@ -294,8 +541,11 @@ class RunningMeanStd:
         :type state: Dict[str, Any]
 
         """
-        for k, v in state.items():
-            setattr(self, k, v)
+        self.shape = state.get(CONST_SHAPE, self.shape)
+        self.rms_state = {
+            k: jnp.asarray(state.get(k, v), dtype=v.dtype)
+            for k, v in self.rms_state.items()
+        }
 
     def update(self, x: chex.Array):
         """
@@ -305,44 +555,7 @@ class RunningMeanStd:
         :type x: chex.Array
 
         """
-        x = x.reshape(-1, *self.shape)
-        batch_mean = np.mean(x, axis=0)
-        batch_var = np.var(x, axis=0)
-        batch_count = len(x)
-
-        if batch_count == 0:
-            return
-        elif batch_count == 1:
-            batch_var.fill(0.0)
-        self.update_from_moments(batch_mean, batch_var, batch_count)
-
-    def update_from_moments(
-        self, batch_mean: chex.Array, batch_var: chex.Array, batch_count: int
-    ):
-        """
-        Updates from the moments
-
-        :param batch_mean: the mean of the current batch
-        :param batch_var: the variance of the current batch
-        :param batch_count: the amount of data in the current batch
-        :type batch_mean: chex.Array
-        :type batch_var: chex.Array
-        :type batch_count: chex.Array
-
-        """
-        delta = batch_mean - self.mean
-        tot_count = self.count + batch_count
-
-        new_mean = self.mean + delta * batch_count / tot_count
-        m_a = self.var * self.count
-        m_b = batch_var * batch_count
-        M2 = m_a + m_b + (delta**2) * self.count * batch_count / tot_count
-        new_var = M2 / tot_count
-        new_count = tot_count
-
-        self.mean = new_mean
-        self.var = new_var
-        self.count = new_count
+        self.rms_state = self._update(self.rms_state, x)
 
     def normalize(self, x: chex.Array) -> chex.Array:
         """
@@ -354,16 +567,7 @@ class RunningMeanStd:
         :rtype: chex.Array
 
         """
-        x_shape = x.shape
-        x = x.reshape(-1, *self.shape)
-        normalized_x = np.clip(
-            (x - self.mean) / np.sqrt(self.var + self.epsilon),
-            a_min=self.a_min,
-            a_max=self.a_max,
-        )
-        normalized_x[normalized_x != normalized_x] = 0.0
-        normalized_x = normalized_x.reshape(x_shape)
-        return normalized_x
+        return self._normalize(self.rms_state, x)
 
     def unnormalize(self, x: chex.Array) -> chex.Array:
         """
@@ -375,6 +579,4 @@ class RunningMeanStd:
         :rtype: chex.Array
 
         """
-        x_shape = x.shape
-        x = x.reshape(-1, *self.shape)
-        return (x * np.sqrt(self.var + self.epsilon) + self.mean).reshape(x_shape)
+        return self._unnormalize(self.rms_state, x)
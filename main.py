@@ -26,7 +26,7 @@ flags.DEFINE_integer("run_seed", default=0, help="Seed for the run", required=Fa
 flags.DEFINE_string(
     "device",
     default=CONST_CPU,
-    help="JAX device to use. To specify specific GPU device, do gpu:<device_ids>",
+    help="JAX device to use. To specify specific GPU device, do gpu:<device_ids>. To split the host into multiple CPU devices, do cpu:<num_devices>",
     required=False,
 )
 
@@ -45,7 +45,7 @@ def main(config_path: str, run_seed: int = None, device: str = CONST_CPU):
 
     :param config_path: the experiment configuration file path
     :param run_seed: the seed to initialize the random number generators
-    :param device: the JAX device to use, supports [`cpu`, `gpu:<device_ids>`]
+    :param device: the JAX device to use, supports [`cpu`, `cpu:<num_devices>`, `gpu:<device_ids>`]
     :type config_path: str
     :type run_seed: int: (Default value = None)
     :type device: str: (Default value = cpu)